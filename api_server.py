@@ -0,0 +1,254 @@
+"""
+Headless HTTP API for crop recommendation and plant disease detection.
+
+A small ASGI app (Starlette + uvicorn) for clients that do not need the
+Streamlit UI, such as the mobile app and the SMS gateway. Models are loaded
+once per worker at startup; inference runs in the thread pool so the event
+loop keeps accepting requests.
+
+Endpoints:
+  GET  /health              liveness
+  GET  /ready               503 until the models are loaded
+  POST /recommend           {"N": 90, ..., "rainfall": 200, "k": 3, "explain": false}
+  POST /recommend/batch     {"samples": [{...}, ...], "k": 3}
+  POST /disease             multipart, one file field "image"
+  POST /disease/batch       multipart, one or more file fields "images"
+
+Usage:
+  python api_server.py --port 8000 --workers 2
+  python prefork_server.py --port 8000 --workers 4   (models shared between workers)
+"""
+
+import argparse
+import contextlib
+import math
+import os
+import time
+from pathlib import Path
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from crop_predictor import FEATURES, ForestExplainer, load_model, recommend_topk, recommend_topk_batch
+from diseases_prediction import get_disease_service
+
+EXPORT_DIR = Path("export_model")
+MODEL_PATH = EXPORT_DIR / "crop_recommender_rf.joblib"
+DEFAULT_K = 3
+MAX_K = 22
+MAX_BATCH = 256
+MAX_IMAGES = 32
+
+
+class APIError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Models:
+    """
+    Per-worker model holder, filled by the startup hook. prefork_server.py
+    fills it in the parent before forking; the hook keeps what is already set.
+    """
+
+    crop = None
+    crop_error = None
+    explainer = None
+    disease = None
+    started = time.time()
+
+
+def _load_crop_model():
+    try:
+        model = load_model(MODEL_PATH.as_posix())
+    except Exception as e:
+        Models.crop_error = str(e)
+        return
+    # requests already run in parallel; per-call tree parallelism only adds thread overhead
+    estimator = model.steps[-1][1] if hasattr(model, "steps") else model
+    if hasattr(estimator, "n_jobs"):
+        estimator.n_jobs = 1
+    Models.crop = model
+
+
+def _explain(sample, topk):
+    if Models.explainer is None:
+        Models.explainer = ForestExplainer.from_model(Models.crop)
+    row = [sample[f] for f in FEATURES]
+    explained = Models.explainer.explain_crops(row, [crop for crop, _ in topk])
+    return {crop: {f: round(v, 6) for f, v in contributions.items()} for crop, contributions in explained.items()}
+
+
+async def lifespan(app):
+    if Models.disease is None:
+        Models.disease = get_disease_service()
+    if Models.crop is None:
+        await run_in_threadpool(_load_crop_model)
+    await run_in_threadpool(Models.disease.load)
+    yield
+
+
+# -------------------------------
+# Request parsing
+# -------------------------------
+def _parse_k(value):
+    try:
+        k = int(value if value is not None else DEFAULT_K)
+    except (TypeError, ValueError):
+        raise APIError("k must be an integer")
+    if not 1 <= k <= MAX_K:
+        raise APIError(f"k must be between 1 and {MAX_K}")
+    return k
+
+
+def _parse_sample(sample):
+    if not isinstance(sample, dict):
+        raise APIError("each sample must be a JSON object")
+    missing = [f for f in FEATURES if f not in sample]
+    if missing:
+        raise APIError(f"missing features: {', '.join(missing)}", 422)
+    values = {}
+    for f in FEATURES:
+        try:
+            values[f] = float(sample[f])
+        except (TypeError, ValueError):
+            raise APIError(f"{f} must be a number", 422)
+        if not math.isfinite(values[f]):
+            raise APIError(f"{f} must be finite", 422)
+    return values
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise APIError("request body must be JSON")
+
+
+def _require_crop_model():
+    if Models.crop is None:
+        raise APIError(f"crop model not loaded: {Models.crop_error or 'starting'}", 503)
+
+
+def _require_disease_model():
+    if Models.disease is None or not Models.disease.ready:
+        error = Models.disease.error if Models.disease is not None else None
+        raise APIError(f"disease model not loaded: {error or 'starting'}", 503)
+
+
+def _topk_json(topk):
+    return [{"crop": crop, "score": round(score, 6)} for crop, score in topk]
+
+
+# -------------------------------
+# Endpoints
+# -------------------------------
+async def health(request):
+    return JSONResponse({"status": "ok", "pid": os.getpid(), "uptime_s": round(time.time() - Models.started, 1)})
+
+
+async def ready(request):
+    disease_ready = Models.disease is not None and Models.disease.ready
+    body = {"crop_model": Models.crop is not None, "disease_model": disease_ready}
+    return JSONResponse(body, status_code=200 if all(body.values()) else 503)
+
+
+async def recommend(request):
+    _require_crop_model()
+    body = await _json_body(request)
+    if not isinstance(body, dict):
+        raise APIError("request body must be a JSON object")
+    sample, k = _parse_sample(body), _parse_k(body.get("k"))
+    topk, _, _ = await run_in_threadpool(recommend_topk, Models.crop, **sample, k=k)
+    result = {"topk": _topk_json(topk)}
+    if body.get("explain"):
+        result["contributions"] = await run_in_threadpool(_explain, sample, topk)
+    return JSONResponse(result)
+
+
+async def recommend_batch(request):
+    _require_crop_model()
+    body = await _json_body(request)
+    samples = body.get("samples") if isinstance(body, dict) else None
+    if not isinstance(samples, list) or not samples:
+        raise APIError('body must be {"samples": [...]} with at least one sample')
+    if len(samples) > MAX_BATCH:
+        raise APIError(f"at most {MAX_BATCH} samples per request", 413)
+    rows, k = [_parse_sample(s) for s in samples], _parse_k(body.get("k"))
+    results = await run_in_threadpool(recommend_topk_batch, Models.crop, rows, k)
+    return JSONResponse({"results": [{"topk": _topk_json(topk)} for topk in results]})
+
+
+async def _read_images(request, field, limit):
+    form = await request.form(max_files=limit + 1)
+    uploads = [f for f in form.getlist(field) if hasattr(f, "read")]
+    if not uploads:
+        raise APIError(f'multipart field "{field}" with an image file is required')
+    if len(uploads) > limit:
+        raise APIError(f"at most {limit} images per request", 413)
+    return [await f.read() for f in uploads], [f.filename for f in uploads]
+
+
+def _diagnoses(probs, filenames):
+    labels = Models.disease.class_labels
+    results = []
+    for p, name in zip(probs, filenames):
+        index = int(p.argmax())
+        results.append({"filename": name, "label": labels[index], "confidence": round(float(p[index]) * 100, 2)})
+    return results
+
+
+async def disease(request):
+    _require_disease_model()
+    images, filenames = await _read_images(request, "image", 1)
+    try:
+        probs = await run_in_threadpool(Models.disease.predict_batch, images)
+    except OSError:
+        raise APIError("could not decode the image", 422)
+    return JSONResponse(_diagnoses(probs, filenames)[0])
+
+
+async def disease_batch(request):
+    _require_disease_model()
+    images, filenames = await _read_images(request, "images", MAX_IMAGES)
+    try:
+        probs = await run_in_threadpool(Models.disease.predict_batch, images)
+    except OSError:
+        raise APIError("could not decode one of the images", 422)
+    return JSONResponse({"results": _diagnoses(probs, filenames)})
+
+
+async def api_error(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=exc.status_code)
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/ready", ready),
+        Route("/recommend", recommend, methods=["POST"]),
+        Route("/recommend/batch", recommend_batch, methods=["POST"]),
+        Route("/disease", disease, methods=["POST"]),
+        Route("/disease/batch", disease_batch, methods=["POST"]),
+    ],
+    exception_handlers={APIError: api_error},
+    lifespan=contextlib.asynccontextmanager(lifespan),
+)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="AgriBot prediction API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, each with its own models")
+    args = parser.parse_args()
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
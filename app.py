@@ -2,12 +2,17 @@ import streamlit as st
 from pathlib import Path
 import pandas as pd
 import altair as alt
+import numpy as np
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from requests.exceptions import ConnectionError as RequestsConnectionError
-from crop_predictor import FEATURES, load_model, recommend_topk, load_metadata
+from crop_predictor import (
+    FEATURES, load_model, recommend_topk, load_metadata, StateReranker, ForestExplainer, load_neighbor_index,
+    ScenarioEngine, NutrientPlanner,
+)
 import time
+import threading
 import sys, socket
 import streamlit.components.v1 as components
 
@@ -21,6 +26,7 @@ if "model" not in st.session_state:
 EXPORT_DIR = Path("export_model")
 MODEL_PATH = EXPORT_DIR / "crop_recommender_rf.joblib"
 META_PATH = EXPORT_DIR / "model_metadata.json"
+NEIGHBORS_PATH = EXPORT_DIR / "crop_neighbors.joblib"
 NPK_CSV_PATH = "state_npk.csv"
 
 # -------------------------------
@@ -190,18 +196,79 @@ def get_soil_data(lat, lon):
     except Exception as e:
         return default_soil, str(e)
 
+# -------------------------------
+# Memoized API calls (widget changes must not refetch)
+# -------------------------------
+WEATHER_TTL = 10 * 60
+SOIL_TTL = 24 * 60 * 60
+SOIL_MIN_INTERVAL = 12  # SoilGrids allows 5 calls/minute
+
+class FetchError(Exception):
+    """
+    Raised from the cached fetchers so failed calls are retried, not memoized.
+    """
+
+@st.cache_resource
+def soil_rate_limit():
+    return {"last_call": 0.0, "lock": threading.Lock()}
+
+@st.cache_data(ttl=WEATHER_TTL, show_spinner=False)
+def fetch_weather(location):
+    weather_data, error = get_weather_data(location)
+    if error:
+        raise FetchError(error)
+    return weather_data
+
+@st.cache_data(ttl=SOIL_TTL, show_spinner=False)
+def fetch_soil(lat, lon):
+    limit = soil_rate_limit()
+    with limit["lock"]:
+        wait = SOIL_MIN_INTERVAL - (time.time() - limit["last_call"])
+        if wait > 0:
+            time.sleep(wait)
+        limit["last_call"] = time.time()
+    soil_data, error = get_soil_data(lat, lon)
+    if error:
+        raise FetchError(error)
+    return soil_data
+
 # -------------------------------
 # Load Model & Metadata
 # -------------------------------
-with st.spinner("Loading model..."):
-    try:
-        model = load_model(MODEL_PATH.as_posix())
-    except Exception as e:
-        st.error(f"Failed to load model: {e}")
-        model = None
+@st.cache_resource(show_spinner="Loading model...")
+def get_crop_model():
+    return load_model(MODEL_PATH.as_posix())
+
+@st.cache_resource
+def get_explainer(_model):
+    return ForestExplainer.from_model(_model)
+
+@st.cache_resource
+def get_neighbor_index():
+    # written by train_model.py; older exports do not have it
+    return load_neighbor_index(NEIGHBORS_PATH.as_posix()) if NEIGHBORS_PATH.exists() else None
+
+@st.cache_resource
+def get_scenario_engine(_model):
+    return ScenarioEngine(_model)
+
+@st.cache_resource
+def get_nutrient_planner(_model):
+    # scores candidates on the flattened forest: same probabilities, no per-call thread pool
+    return NutrientPlanner(get_explainer(_model).forest)
+
+@st.cache_data
+def get_metadata():
+    return load_metadata(META_PATH.as_posix())
 
 try:
-    metadata = load_metadata(META_PATH.as_posix())
+    model = get_crop_model()
+except Exception as e:
+    st.error(f"Failed to load model: {e}")
+    model = None
+
+try:
+    metadata = get_metadata()
 except Exception as e:
     st.error(f"Failed to load metadata: {e}")
     metadata = {}
@@ -209,12 +276,17 @@ except Exception as e:
 # -------------------------------
 # Load NPK CSV
 # -------------------------------
+npks_column = "NPKS - Availability from 01-04-2024 to 26-03-2025"
+
+@st.cache_data
+def load_state_npk(path):
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.strip()
+    df = df[df["State/UT"] != "All India"]
+    return df, ["Select a State"] + sorted(df["State/UT"].astype(str).str.strip().unique())
+
 try:
-    df_npk = pd.read_csv(NPK_CSV_PATH)
-    df_npk.columns = df_npk.columns.str.strip()
-    df_npk = df_npk[df_npk["State/UT"] != "All India"]
-    npks_column = "NPKS - Availability from 01-04-2024 to 26-03-2025"
-    states = ["Select a State"] + sorted(df_npk["State/UT"].astype(str).str.strip().unique())
+    df_npk, states = load_state_npk(NPK_CSV_PATH)
 except Exception as e:
     st.error(f"Failed to load state-wise NPK data: {e}")
     df_npk = pd.DataFrame(columns=["State/UT"])
@@ -245,7 +317,23 @@ trans = {
         "probabilities": "📊 Prediction Probabilities",
         "no_state": "Please select a valid state.",
         "model_not_loaded": "Model is not loaded. Cannot make predictions.",
-        "fetch_soil_button": "🌱 Fetch Soil Data"
+        "fetch_soil_button": "🌱 Fetch Soil Data",
+        "why": "🔍 Why these crops? (contribution of each input to the crop's probability)",
+        "similar_farms": "🧭 Most similar farms in the training data",
+        "ood_warning": "⚠️ These inputs are unlike any farm the model was trained on (distance score {score:.1f}). Treat the recommendations with caution and check the values.",
+        "whatif": "🔀 What if? See how the recommendations shift",
+        "whatif_x": "Vary",
+        "whatif_y": "Together with",
+        "whatif_none": "(nothing else)",
+        "whatif_crop": "Crop",
+        "whatif_caption": "{n} scenarios around your inputs: {spans}",
+        "plan": "🎯 What would it take to grow a different crop?",
+        "plan_crop": "Target crop",
+        "plan_button": "Find the smallest soil change",
+        "plan_result": "{crop} probability {prob:.0%}, top crop: {top}",
+        "plan_none": "No change of N, P, K or pH within range makes {crop} the top crop. Closest: {changes} ({prob:.0%}).",
+        "plan_caption": "{n} inputs evaluated in {ms:.0f} ms",
+        "plan_spinner": "Searching for soil changes..."
     },
     "हिंदी": {
         "hero_title": "स्थायी भविष्य के लिए स्मार्ट खेती 🌍",
@@ -268,7 +356,23 @@ trans = {
         "probabilities": "📊 भविष्यवाणी संभावनाएँ",
         "no_state": "कृपया एक मान्य राज्य चुनें।",
         "model_not_loaded": "मॉडल लोड नहीं हुआ। भविष्यवाणियाँ नहीं की जा सकतीं।",
-        "fetch_soil_button": "🌱 मिट्टी डेटा प्राप्त करें"
+        "fetch_soil_button": "🌱 मिट्टी डेटा प्राप्त करें",
+        "why": "🔍 ये फसलें क्यों? (हर इनपुट का फसल की संभावना में योगदान)",
+        "similar_farms": "🧭 प्रशिक्षण डेटा में सबसे मिलते-जुलते खेत",
+        "ood_warning": "⚠️ ये इनपुट मॉडल के प्रशिक्षण डेटा के किसी भी खेत से मेल नहीं खाते (दूरी स्कोर {score:.1f})। सुझावों को सावधानी से लें और मान जाँचें।",
+        "whatif": "🔀 क्या होगा अगर? देखें सुझाव कैसे बदलते हैं",
+        "whatif_x": "बदलें",
+        "whatif_y": "साथ में",
+        "whatif_none": "(और कुछ नहीं)",
+        "whatif_crop": "फसल",
+        "whatif_caption": "आपके इनपुट के आसपास {n} स्थितियाँ: {spans}",
+        "plan": "🎯 दूसरी फसल उगाने के लिए क्या बदलना होगा?",
+        "plan_crop": "लक्षित फसल",
+        "plan_button": "मिट्टी में सबसे छोटा बदलाव खोजें",
+        "plan_result": "{crop} की संभावना {prob:.0%}, शीर्ष फसल: {top}",
+        "plan_none": "सीमा के भीतर N, P, K या pH का कोई बदलाव {crop} को शीर्ष फसल नहीं बनाता। सबसे नज़दीक: {changes} ({prob:.0%})।",
+        "plan_caption": "{ms:.0f} ms में {n} इनपुट जाँचे गए",
+        "plan_spinner": "मिट्टी में बदलाव खोजे जा रहे हैं..."
     }
 }
 
@@ -290,8 +394,6 @@ if "weather_data" not in st.session_state:
     st.session_state.weather_data = None
 if "soil_data" not in st.session_state:
     st.session_state.soil_data = None
-if "last_soil_call" not in st.session_state:
-    st.session_state.last_soil_call = 0
 
 # -------------------------------
 # Language Selector + Hyperlink Buttons (Same Button Style)
@@ -414,119 +516,39 @@ if state != "Select a State" and not df_npk.empty:
 else:
     st.warning(t["no_state"])
 
-# Fetch weather data
+# Fetch weather data; cached per location, so other widget changes do not call the API again
+@st.fragment
+def soil_panel(weather_data):
+    if st.button(t["fetch_soil_button"], key="fetch_soil_button"):
+        with st.spinner("Fetching soil data from SoilGrids..."):
+            lat, lon = weather_data["coord"]["lat"], weather_data["coord"]["lon"]
+            try:
+                soil_data = fetch_soil(round(lat, 2), round(lon, 2))
+            except FetchError as e:
+                st.error(str(e))
+                return
+        st.session_state.soil_data = soil_data
+        # N and pH defaults below depend on the soil data
+        st.rerun(scope="app")
+    if st.session_state.soil_data:
+        st.success(f"✅ {t['fetch_soil']}")
+        st.json(st.session_state.soil_data)
+
 with col2:
     if location:
         with st.spinner("Fetching weather data..."):
-            weather_data, error = get_weather_data(location)
-            if error:
-                st.error(error)
-            else:
-                st.session_state.weather_data = weather_data
-                st.success(f"✅ {t['fetch_weather']} for {location}")
-                st.json(weather_data)
-                st.write("Debug: Weather data stored in session state")
-
-                if st.button(t["fetch_soil_button"], key="fetch_soil_button"):
-                    with st.spinner("Fetching soil data from SoilGrids..."):
-                        # Respect rate limit (5 calls/minute ~ 12s delay)
-                        now = time.time()
-                        if now - st.session_state.last_soil_call < 12:
-                            time.sleep(12 - (now - st.session_state.last_soil_call))
-                        st.session_state.last_soil_call = time.time()
-                        
-                        lat, lon = weather_data["coord"]["lat"], weather_data["coord"]["lon"]
-                        soil_data, s_err = get_soil_data(lat, lon)
-                        if s_err:
-                            st.error(s_err)
-                        else:
-                            st.session_state.soil_data = soil_data
-                            st.success(f"✅ {t['fetch_soil']}")
-                            st.json(soil_data)
-                            st.write("Debug: Soil data stored in session state")
-
-# Use session state for soil and weather data
-weather_data = st.session_state.weather_data
-soil_data = st.session_state.soil_data
-
-# -------------------------------
-# Soil and Environmental Inputs
-# -------------------------------
-st.markdown(f"### {t['enter_soil']}")
-colN, colP, colK, colPH = st.columns(4)
-with colN:
-    N = st.number_input(
-        f"{t['Nitrogen']} (mg/kg)",
-        min_value=0.0,
-        max_value=1000.0,
-        value=soil_data["N"] if soil_data and soil_data["N"] is not None else 50.0,
-        step=0.1,
-        format="%.2f",
-        key="nitrogen_input"
-    )
-with colP:
-    P = st.number_input(
-        f"{t['Phosphorus']} (mg/kg)",
-        min_value=0.0,
-        max_value=1000.0,
-        value=P_default,
-        step=0.1,
-        format="%.2f",
-        key="phosphorus_input"
-    )
-with colK:
-    K = st.number_input(
-        f"{t['Potassium']} (mg/kg)",
-        min_value=0.0,
-        max_value=1000.0,
-        value=K_default,
-        step=0.1,
-        format="%.2f",
-        key="potassium_input"
-    )
-with colPH:
-    pH = st.number_input(
-        f"{t['pH']} (unitless)",
-        min_value=0.0,
-        max_value=14.0,
-        value=soil_data["pH"] if soil_data and soil_data["pH"] is not None else 6.5,
-        step=0.01,
-        format="%.2f",
-        key="ph_input"
-    )
-
-colT, colH, colR = st.columns(3)
-with colT:
-    temperature = st.number_input(
-        f"{t['Temperature']}",
-        min_value=-10.0,
-        max_value=100.0,
-        value=weather_data["temperature"] if weather_data else 25.0,
-        step=0.1,
-        format="%.1f",
-        key="temperature_input"
-    )
-with colH:
-    humidity = st.number_input(
-        f"{t['Humidity']}",
-        min_value=0.0,
-        max_value=100.0,
-        value=float(weather_data["humidity"]) if weather_data else 70.0,
-        step=0.1,
-        format="%.1f",
-        key="humidity_input"
-    )
-with colR:
-    rainfall = st.number_input(
-        f"{t['Rainfall']}",
-        min_value=0.0,
-        max_value=1000.0,
-        value=float(weather_data["rainfall"]) if weather_data else 100.0,
-        step=0.1,
-        format="%.1f",
-        key="rainfall_input"
-    )
-
+            try:
+                weather_data, error = fetch_weather(location.strip()), None
+            except FetchError as e:
+                weather_data, error = None, str(e)
+        if error:
+            st.error(error)
+        else:
+            st.session_state.weather_data = weather_data
+            st.success(f"✅ {t['fetch_weather']} for {location}")
+            st.json(weather_data)
+            st.write("Debug: Weather data stored in session state")
+            soil_panel(weather_data)
 
 # -------------------------------
 # Crop Recommendation (State-aware)
@@ -567,69 +589,259 @@ state_crop_map = {
     "Andaman & Nicobar": ["coconut", "banana", "rice"]
 }
 
-top_k = st.slider(t["top_k"], min_value=1, max_value=10, value=3, key="top_k_slider")
+@st.cache_resource
+def get_state_reranker(classes):
+    # built once per model; crops the model does not know are reported here
+    return StateReranker(classes, state_crop_map)
 
-if st.button(t["recommend"], key="recommend_button"):
-    if model is None:
-        st.error(t["model_not_loaded"])
-    elif state == "Select a State":
-        st.error(t["no_state"])
-    else:
-        with st.spinner("Generating crop recommendations..."):
-            try:
-                # Get model predictions
-                topk, proba, labels = recommend_topk(
-                    model,
-                    N=N, P=P, K=K,
-                    temperature=temperature,
-                    humidity=humidity,
-                    ph=pH,
-                    rainfall=rainfall,
-                    k=top_k*2  # get extra crops to filter later
-                )
-
-                # Prioritize state-preferred crops
-                preferred_crops = state_crop_map.get(state, [])
-                topk_sorted = sorted(
-                    topk,
-                    key=lambda x: (0 if x[0] in preferred_crops else 1, -x[1])
-                )
-
-                # Show only top_k
-                topk_sorted = topk_sorted[:top_k]
-
-                st.subheader(t["top_crops"])
-                for crop, score in topk_sorted:
-                    display_crop = crop_trans[crop] if lang == "हिंदी" and crop in crop_trans else crop
-                    st.markdown(f"- {display_crop}")
-
-                st.subheader(t["probabilities"])
-                df_proba = pd.DataFrame({"Crop": labels, "Probability": proba})
-                df_top = df_proba.sort_values("Probability", ascending=False).head(top_k)
-                if lang == "हिंदी":
-                    df_top["Crop"] = df_top["Crop"].apply(lambda c: crop_trans[c] if c in crop_trans else c)
-
-                chart = (
-                    alt.Chart(df_top)
-                    .mark_bar()
-                    .encode(
-                        x=alt.X("Probability:Q", title="Probability", axis=alt.Axis(format="%", titleColor="#ffffff")),
-                        y=alt.Y("Crop:N", title="Crop", sort="-x"),
-                        color=alt.ColorValue("#aaff00"),
-                        tooltip=[
-                            alt.Tooltip("Crop:N", title="Crop"),
-                            alt.Tooltip("Probability:Q", title="Probability", format=".2%")
-                        ]
+# -------------------------------
+# What-if Scenarios
+# -------------------------------
+# span swept on each side of the current value: nutrients in kg, climate mostly in percent
+WHATIF_SPANS = {
+    "N": ("add", 40), "P": ("add", 40), "K": ("add", 40), "temperature": ("add", 5),
+    "humidity": ("percent", 30), "ph": ("add", 1), "rainfall": ("percent", 30),
+}
+WHATIF_STEPS = 13
+
+def whatif_axis(feature):
+    mode, span = WHATIF_SPANS[feature]
+    label = f"{feature} ±{span}{'%' if mode == 'percent' else ''}"
+    return (mode, np.linspace(-span, span, WHATIF_STEPS)), label
+
+# Nested in the recommendation section: new inputs redraw it, its own controls rerun only this panel
+@st.fragment
+def whatif_panel(base):
+    with st.expander(t["whatif"]):
+        colX, colY = st.columns(2)
+        x_feature = colX.selectbox(t["whatif_x"], FEATURES, index=FEATURES.index("N"), key="whatif_x")
+        y_options = [t["whatif_none"]] + [f for f in FEATURES if f != x_feature]
+        y_feature = colY.selectbox(t["whatif_y"], y_options, index=y_options.index("rainfall") if x_feature != "rainfall" else 0, key="whatif_y")
+
+        axes, spans = {}, []
+        for feature in [x_feature, y_feature]:
+            if feature in FEATURES:
+                axes[feature], label = whatif_axis(feature)
+                spans.append(label)
+        result = get_scenario_engine(model).sweep(base, axes)
+        show = (lambda c: crop_trans.get(c, c)) if lang == "हिंदी" else (lambda c: c)
+
+        if len(axes) == 1:
+            df_sweep = result.to_frame(result.top_crops(5))
+            df_sweep["crop"] = df_sweep["crop"].map(show)
+            chart = alt.Chart(df_sweep).mark_line(point=True).encode(
+                x=alt.X(f"{x_feature}:Q", title=x_feature),
+                y=alt.Y("probability:Q", title="Probability", axis=alt.Axis(format="%")),
+                color=alt.Color("crop:N", title=t["whatif_crop"]),
+                tooltip=["crop:N", alt.Tooltip(f"{x_feature}:Q", format=".1f"), alt.Tooltip("probability:Q", format=".1%")],
+            )
+        else:
+            crop = st.selectbox(t["whatif_crop"], result.top_crops(10), format_func=show, key="whatif_crop")
+            df_sweep = result.to_frame([crop])
+            chart = alt.Chart(df_sweep).mark_rect().encode(
+                x=alt.X(f"{x_feature}:O", title=x_feature, axis=alt.Axis(format=".1f")),
+                y=alt.Y(f"{y_feature}:O", title=y_feature, sort="descending", axis=alt.Axis(format=".1f")),
+                color=alt.Color("probability:Q", title="Probability", scale=alt.Scale(scheme="greens", domain=[0, 1])),
+                tooltip=[alt.Tooltip(f"{x_feature}:Q", format=".1f"), alt.Tooltip(f"{y_feature}:Q", format=".1f"),
+                         alt.Tooltip("probability:Q", format=".1%")],
+            )
+        st.altair_chart(chart.configure_axis(labelColor="#ffffff", titleColor="#ffffff"), use_container_width=True)
+        st.caption(t["whatif_caption"].format(n=result.n_scenarios, spans=", ".join(spans)))
+
+# -------------------------------
+# Inverse Search: soil change for a target crop
+# -------------------------------
+def format_changes(changes):
+    return ", ".join(f"{f} {old:g} → {new:g} ({new - old:+.4g})" for f, (old, new) in changes.items())
+
+@st.fragment
+def plan_panel(base):
+    show = (lambda c: crop_trans.get(c, c)) if lang == "हिंदी" else (lambda c: c)
+    with st.expander(t["plan"]):
+        planner = get_nutrient_planner(model)
+        crop = st.selectbox(t["plan_crop"], list(planner.classes), format_func=show, key="plan_crop")
+        if st.button(t["plan_button"], key="plan_button"):
+            with st.spinner(t["plan_spinner"]):
+                result = planner.plan(base, crop, budget_s=1.0)
+            if result["plans"]:
+                for i, plan in enumerate(result["plans"], 1):
+                    st.markdown(f"{i}. **{format_changes(plan['changes']) or '–'}** — "
+                                + t["plan_result"].format(crop=show(crop), prob=plan["probability"], top=show(plan["top_crop"])))
+            else:
+                closest = result["closest"]
+                st.warning(t["plan_none"].format(crop=show(crop), changes=format_changes(closest["changes"]) or "–",
+                                                 prob=closest["probability"]))
+            st.caption(t["plan_caption"].format(n=result["evaluated"], ms=result["elapsed_s"] * 1000))
+
+# Inputs, slider and results rerun on their own: nudging N or top-k does not rerun the location section
+@st.fragment
+def recommendation_section(state, P_default, K_default):
+    # Use session state for soil and weather data
+    weather_data = st.session_state.weather_data
+    soil_data = st.session_state.soil_data
+
+    # -------------------------------
+    # Soil and Environmental Inputs
+    # -------------------------------
+    st.markdown(f"### {t['enter_soil']}")
+    colN, colP, colK, colPH = st.columns(4)
+    with colN:
+        N = st.number_input(
+            f"{t['Nitrogen']} (mg/kg)",
+            min_value=0.0,
+            max_value=1000.0,
+            value=soil_data["N"] if soil_data and soil_data["N"] is not None else 50.0,
+            step=0.1,
+            format="%.2f",
+            key="nitrogen_input"
+        )
+    with colP:
+        P = st.number_input(
+            f"{t['Phosphorus']} (mg/kg)",
+            min_value=0.0,
+            max_value=1000.0,
+            value=P_default,
+            step=0.1,
+            format="%.2f",
+            key="phosphorus_input"
+        )
+    with colK:
+        K = st.number_input(
+            f"{t['Potassium']} (mg/kg)",
+            min_value=0.0,
+            max_value=1000.0,
+            value=K_default,
+            step=0.1,
+            format="%.2f",
+            key="potassium_input"
+        )
+    with colPH:
+        pH = st.number_input(
+            f"{t['pH']} (unitless)",
+            min_value=0.0,
+            max_value=14.0,
+            value=soil_data["pH"] if soil_data and soil_data["pH"] is not None else 6.5,
+            step=0.01,
+            format="%.2f",
+            key="ph_input"
+        )
+
+    colT, colH, colR = st.columns(3)
+    with colT:
+        temperature = st.number_input(
+            f"{t['Temperature']}",
+            min_value=-10.0,
+            max_value=100.0,
+            value=weather_data["temperature"] if weather_data else 25.0,
+            step=0.1,
+            format="%.1f",
+            key="temperature_input"
+        )
+    with colH:
+        humidity = st.number_input(
+            f"{t['Humidity']}",
+            min_value=0.0,
+            max_value=100.0,
+            value=float(weather_data["humidity"]) if weather_data else 70.0,
+            step=0.1,
+            format="%.1f",
+            key="humidity_input"
+        )
+    with colR:
+        rainfall = st.number_input(
+            f"{t['Rainfall']}",
+            min_value=0.0,
+            max_value=1000.0,
+            value=float(weather_data["rainfall"]) if weather_data else 100.0,
+            step=0.1,
+            format="%.1f",
+            key="rainfall_input"
+        )
+
+
+    top_k = st.slider(t["top_k"], min_value=1, max_value=10, value=3, key="top_k_slider")
+
+    if model is not None:
+        whatif_panel(dict(zip(FEATURES, [N, P, K, temperature, humidity, pH, rainfall])))
+        plan_panel(dict(zip(FEATURES, [N, P, K, temperature, humidity, pH, rainfall])))
+
+    if st.button(t["recommend"], key="recommend_button"):
+        if model is None:
+            st.error(t["model_not_loaded"])
+        elif state == "Select a State":
+            st.error(t["no_state"])
+        else:
+            with st.spinner("Generating crop recommendations..."):
+                try:
+                    # Get model predictions
+                    topk, proba, labels = recommend_topk(
+                        model,
+                        N=N, P=P, K=K,
+                        temperature=temperature,
+                        humidity=humidity,
+                        ph=pH,
+                        rainfall=rainfall,
+                        k=top_k
+                    )
+
+                    # Prioritize state-preferred crops over the full probability vector
+                    topk_sorted = get_state_reranker(tuple(labels)).topk(proba, state, top_k)
+
+                    st.subheader(t["top_crops"])
+                    for crop, score in topk_sorted:
+                        display_crop = crop_trans[crop] if lang == "हिंदी" and crop in crop_trans else crop
+                        st.markdown(f"- {display_crop}")
+
+                    # per-input contributions from the forest's decision paths
+                    explained = get_explainer(model).explain_crops(
+                        [N, P, K, temperature, humidity, pH, rainfall], [crop for crop, _ in topk_sorted]
                     )
-                    .configure_axis(
-                        labelColor="#ffffff",
-                        titleColor="#ffffff",
-                        gridColor="rgba(255, 255, 255, 0.2)"
+                    with st.expander(t["why"]):
+                        df_why = pd.DataFrame(explained)
+                        if lang == "हिंदी":
+                            df_why.columns = [crop_trans.get(c, c) for c in df_why.columns]
+                        st.dataframe(df_why.style.format("{:+.1%}"))
+
+                    neighbor_index = get_neighbor_index()
+                    if neighbor_index is not None:
+                        neighbours, ood_score = neighbor_index.similar([N, P, K, temperature, humidity, pH, rainfall])
+                        if ood_score > 1:
+                            st.warning(t["ood_warning"].format(score=ood_score))
+                        with st.expander(t["similar_farms"]):
+                            if lang == "हिंदी":
+                                neighbours["label"] = neighbours["label"].map(lambda c: crop_trans.get(c, c))
+                            st.dataframe(neighbours.round(2), hide_index=True)
+
+                    st.subheader(t["probabilities"])
+                    df_proba = pd.DataFrame({"Crop": labels, "Probability": proba})
+                    df_top = df_proba.sort_values("Probability", ascending=False).head(top_k)
+                    if lang == "हिंदी":
+                        df_top["Crop"] = df_top["Crop"].apply(lambda c: crop_trans[c] if c in crop_trans else c)
+
+                    chart = (
+                        alt.Chart(df_top)
+                        .mark_bar()
+                        .encode(
+                            x=alt.X("Probability:Q", title="Probability", axis=alt.Axis(format="%", titleColor="#ffffff")),
+                            y=alt.Y("Crop:N", title="Crop", sort="-x"),
+                            color=alt.ColorValue("#aaff00"),
+                            tooltip=[
+                                alt.Tooltip("Crop:N", title="Crop"),
+                                alt.Tooltip("Probability:Q", title="Probability", format=".2%")
+                            ]
+                        )
+                        .configure_axis(
+                            labelColor="#ffffff",
+                            titleColor="#ffffff",
+                            gridColor="rgba(255, 255, 255, 0.2)"
+                        )
+                        .configure_view(stroke=None)
                     )
-                    .configure_view(stroke=None)
-                )
-                st.altair_chart(chart, use_container_width=True)
+                    st.altair_chart(chart, use_container_width=True)
+
+                except Exception as e:
+                    st.error(f"Error generating recommendations: {str(e)}")
+                    st.write(f"Debug: Input values - N={N}, P={P}, K={K}, pH={pH}, Temp={temperature}, Humidity={humidity}, Rainfall={rainfall}")
+
 
-            except Exception as e:
-                st.error(f"Error generating recommendations: {str(e)}")
-                st.write(f"Debug: Input values - N={N}, P={P}, K={K}, pH={pH}, Temp={temperature}, Humidity={humidity}, Rainfall={rainfall}")
+recommendation_section(state, P_default, K_default)
@@ -0,0 +1,203 @@
+"""
+Build and calibrate the fast/full cascade used by diseases_prediction.
+
+The fast stage is the full model converted to TensorFlow Lite with
+post-training quantization (or any smaller model passed with --fast-model,
+e.g. plant_disease_mobilenet.keras trained at a lower --img-size). On the
+validation split the script picks the lowest top-1 confidence threshold at
+which "fast answer if confident, full model otherwise" still meets the
+accuracy target, then reports accuracy, escalation rate and latency on the
+test split and writes disease_cascade.json, which get_disease_service() picks up.
+
+Usage:
+  python build_disease_cascade.py [--full plant_disease_model.h5] [--quantize dynamic|float16|int8]
+  python build_disease_cascade.py --fast-model plant_disease_mobilenet.keras --max-drop 0.005
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from disease_data import load_split
+from diseases_prediction import CASCADE_PATH, DISEASE_MODEL_PATH, DiseaseService
+
+FAST_MODEL_PATH = "plant_disease_fast.tflite"
+# threshold above any softmax confidence: every image is escalated
+ALWAYS_ESCALATE = 1.01
+
+
+def as_float32(model):
+    """
+    Copy of a model with every layer computing in float32. Models trained with
+    --mixed-precision bf16 compute in bfloat16, which the TFLite converter rejects.
+    """
+    import tensorflow as tf
+
+    if all(layer.dtype_policy.compute_dtype == "float32" for layer in model.layers):
+        return model
+    clone = tf.keras.models.clone_model(
+        model, clone_function=lambda layer: layer.__class__.from_config({**layer.get_config(), "dtype": "float32"}))
+    clone.set_weights(model.get_weights())
+    return clone
+
+
+def quantize(full_path, out_path, mode="dynamic", representative_split="train", n_representative=200):
+    """
+    Convert the full Keras model to TFLite. "dynamic" stores int8 weights,
+    "float16" half-precision weights, "int8" also quantizes activations using
+    a few training images for calibration (input and output stay float).
+    """
+    import tensorflow as tf
+
+    model = as_float32(tf.keras.models.load_model(full_path, compile=False))
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == "int8":
+        img_size = tuple(int(d) for d in model.input_shape[1:3])
+        ds, _, _ = load_split(representative_split, img_size=img_size, batch_size=1)
+
+        def representative():
+            for x, _ in ds.take(n_representative):
+                yield [x]
+
+        converter.representative_dataset = representative
+    flatbuffer = converter.convert()
+    with open(out_path, "wb") as f:
+        f.write(flatbuffer)
+    return out_path
+
+
+def split_predictions(service, split, batch_size=32):
+    """
+    (probabilities, integer labels) of a model on a dataset split, in file order.
+    """
+    service.load()
+    if not service.ready:
+        raise RuntimeError(f"could not load {service.model_path}: {service.error}")
+    ds, _, _ = load_split(split, img_size=service.input_size, batch_size=batch_size)
+    probs, labels = [], []
+    for x, y in ds:
+        probs.append(service.predict_array(x.numpy()))
+        labels.append(y.numpy().argmax(axis=1))
+    return np.concatenate(probs), np.concatenate(labels)
+
+
+def calibrate_threshold(fast_probs, full_probs, labels, target_accuracy):
+    """
+    Lowest confidence threshold whose cascade accuracy is at least target_accuracy.
+
+    Accepting the fast answer for every image with confidence >= t is a prefix
+    of the images sorted by confidence, so the cascade accuracy of every
+    candidate threshold comes from two cumulative sums.
+    """
+    confidence = fast_probs.max(axis=1)
+    order = np.argsort(-confidence, kind="stable")
+    confidence = confidence[order]
+    fast_correct = (fast_probs.argmax(axis=1) == labels)[order]
+    full_correct = (full_probs.argmax(axis=1) == labels)[order]
+
+    accepted_correct = np.concatenate([[0], np.cumsum(fast_correct)])
+    escalated_correct = full_correct.sum() - np.concatenate([[0], np.cumsum(full_correct)])
+    accuracy = (accepted_correct + escalated_correct) / len(labels)
+    # a threshold cannot split tied confidences: only prefixes ending at a change of value
+    valid = np.concatenate([[True], np.append(confidence[:-1] > confidence[1:], True)])
+    ok = np.flatnonzero(valid & (accuracy >= target_accuracy - 1e-12))
+    n_accepted = int(ok.max()) if len(ok) else 0
+    return float(confidence[n_accepted - 1]) if n_accepted else ALWAYS_ESCALATE
+
+
+def cascade_metrics(fast_probs, full_probs, labels, threshold):
+    escalate = fast_probs.max(axis=1) < threshold
+    pred = np.where(escalate, full_probs.argmax(axis=1), fast_probs.argmax(axis=1))
+    return {
+        "fast_accuracy": float((fast_probs.argmax(axis=1) == labels).mean()),
+        "full_accuracy": float((full_probs.argmax(axis=1) == labels).mean()),
+        "cascade_accuracy": float((pred == labels).mean()),
+        "escalation_rate": float(escalate.mean()),
+    }
+
+
+def latency_ms(service, runs=30, warmup=3):
+    """
+    Median single-image latency of one stage in milliseconds.
+    """
+    x = np.random.default_rng(0).random((1,) + service.input_size + (3,), dtype=np.float32)
+    for _ in range(warmup):
+        service.predict_array(x)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        service.predict_array(x)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate a fast/full disease model cascade.")
+    parser.add_argument("--full", default=DISEASE_MODEL_PATH, help="full model served today")
+    parser.add_argument("--fast-model", default=None, help="existing fast model (.tflite/.keras/.h5); "
+                                                           "default: quantize --full")
+    parser.add_argument("--quantize", choices=["dynamic", "float16", "int8"], default="dynamic")
+    parser.add_argument("--fast-out", default=FAST_MODEL_PATH, help="where the quantized model is written")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--target-accuracy", type=float, default=None, help="cascade accuracy on validation")
+    target.add_argument("--max-drop", type=float, default=0.01,
+                        help="allowed validation accuracy loss vs the full model (default 0.01)")
+    parser.add_argument("--val-split", default="val")
+    parser.add_argument("--test-split", default="test")
+    parser.add_argument("--out", default=CASCADE_PATH)
+    args = parser.parse_args()
+
+    fast_path = args.fast_model
+    if fast_path is None:
+        start = time.perf_counter()
+        fast_path = quantize(args.full, args.fast_out, args.quantize)
+        print(f"Quantized {args.full} ({args.quantize}) to {fast_path} in {time.perf_counter() - start:.1f}s")
+    full, fast = DiseaseService(args.full), DiseaseService(fast_path)
+
+    full_val, labels = split_predictions(full, args.val_split)
+    fast_val, fast_labels = split_predictions(fast, args.val_split)
+    if fast_val.shape != full_val.shape or not np.array_equal(labels, fast_labels):
+        raise SystemExit("fast and full model disagree on the classes or image order of the validation split")
+    target_accuracy = args.target_accuracy
+    if target_accuracy is None:
+        target_accuracy = float((full_val.argmax(axis=1) == labels).mean()) - args.max_drop
+    threshold = calibrate_threshold(fast_val, full_val, labels, target_accuracy)
+
+    full_test, test_labels = split_predictions(full, args.test_split)
+    fast_test, _ = split_predictions(fast, args.test_split)
+    val = cascade_metrics(fast_val, full_val, labels, threshold)
+    test = cascade_metrics(fast_test, full_test, test_labels, threshold)
+    fast_ms, full_ms = latency_ms(fast), latency_ms(full)
+    # every image pays for the fast stage; escalated ones also for the full model
+    cascade_ms = fast_ms + test["escalation_rate"] * full_ms
+
+    print(f"\nThreshold {threshold:.4f} for validation accuracy >= {target_accuracy:.4f}\n")
+    print(f"{'split':<6} {'images':>7} {'full acc':>9} {'fast acc':>9} {'cascade acc':>12} {'escalated':>10}")
+    for name, m, n in [(args.val_split, val, len(labels)), (args.test_split, test, len(test_labels))]:
+        print(f"{name:<6} {n:>7} {m['full_accuracy']:>9.4f} {m['fast_accuracy']:>9.4f} "
+              f"{m['cascade_accuracy']:>12.4f} {m['escalation_rate']:>9.1%}")
+    print(f"\nLatency per image (batch 1): full {full_ms:.2f} ms, fast {fast_ms:.2f} ms, "
+          f"cascade {cascade_ms:.2f} ms on {args.test_split} -> {full_ms - cascade_ms:.2f} ms saved "
+          f"({1 - cascade_ms / full_ms:.0%})")
+
+    config = {
+        "full_model": args.full,
+        "fast_model": str(fast_path),
+        "threshold": threshold,
+        "target_accuracy": target_accuracy,
+        "validation": val,
+        "test": test,
+        "latency_ms": {"full": full_ms, "fast": fast_ms, "cascade": cascade_ms},
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    print(f"Saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
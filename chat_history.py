@@ -0,0 +1,168 @@
+"""
+Bounded chat history for AgriBot sessions.
+
+A session keeps only its most recent messages in memory, as compact
+ChatMessage records. Older ones are paged out to a SQLite archive shared by
+all sessions and summarised in a short line; the chat can page them back in
+with "load more".
+"""
+
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+HISTORY_DB_PATH = "agribot_chat_history.sqlite3"
+MEMORY_WINDOW = 40
+# user questions quoted in the summary of archived turns
+SUMMARY_TOPICS = 5
+SUMMARY_TOPIC_CHARS = 60
+
+
+class ChatMessage:
+    """
+    One chat turn. ts is integer epoch seconds; ttft is the LLM
+    time-to-first-token and audio the TTS key, both optional.
+    """
+
+    __slots__ = ("seq", "role", "content", "ts", "ttft", "audio")
+
+    def __init__(self, seq, role, content, ts=None, ttft=None, audio=None):
+        self.seq = seq
+        self.role = role
+        self.content = content
+        self.ts = int(time.time()) if ts is None else ts
+        self.ttft = ttft
+        self.audio = audio
+
+    @property
+    def timestamp(self):
+        return datetime.fromtimestamp(self.ts).strftime("%H:%M")
+
+    def __repr__(self):
+        return f"ChatMessage({self.seq}, {self.role!r}, {self.content[:30]!r})"
+
+
+class ChatArchive:
+    """
+    SQLite store for messages paged out of memory, keyed by session id.
+    """
+
+    def __init__(self, db_path=HISTORY_DB_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "session TEXT, seq INTEGER, role TEXT, content TEXT, ts INTEGER, ttft REAL, audio TEXT, "
+            "PRIMARY KEY (session, seq))"
+        )
+        self._db.commit()
+
+    def store(self, session_id, messages):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(session_id, m.seq, m.role, m.content, m.ts, m.ttft, m.audio) for m in messages],
+            )
+            self._db.commit()
+
+    def load(self, session_id, before_seq, limit):
+        """
+        Up to limit messages with seq < before_seq, oldest first.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, role, content, ts, ttft, audio FROM messages "
+                "WHERE session = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (session_id, before_seq, limit),
+            ).fetchall()
+        return [ChatMessage(*row) for row in reversed(rows)]
+
+    def delete(self, session_id):
+        with self._lock:
+            self._db.execute("DELETE FROM messages WHERE session = ?", (session_id,))
+            self._db.commit()
+
+
+class ChatHistory:
+    """
+    Rolling window of a session's messages. Messages beyond window are moved
+    to the archive (or dropped without one) and counted in the summary.
+    """
+
+    def __init__(self, archive=None, window=MEMORY_WINDOW, session_id=None):
+        self.archive = archive
+        self.window = window
+        self.session_id = session_id or uuid.uuid4().hex
+        self._recent = deque()
+        self._next_seq = 0
+        self.archived = 0
+        self._archived_since = None
+        self._topics = deque(maxlen=SUMMARY_TOPICS)
+
+    def __len__(self):
+        return self.archived + len(self._recent)
+
+    def __iter__(self):
+        return iter(self._recent)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        return self._recent[index]
+
+    def append(self, role, content, ts=None, ttft=None, audio=None):
+        message = ChatMessage(self._next_seq, role, content, ts, ttft, audio)
+        self._next_seq += 1
+        self._recent.append(message)
+        if len(self._recent) > self.window:
+            self._page_out(len(self._recent) - self.window)
+        return message
+
+    def _page_out(self, count):
+        old = [self._recent.popleft() for _ in range(count)]
+        if self.archive is not None:
+            self.archive.store(self.session_id, old)
+        if self._archived_since is None:
+            self._archived_since = old[0].ts
+        self.archived += count
+        for m in old:
+            if m.role == "user":
+                topic = " ".join(m.content.split())
+                if len(topic) > SUMMARY_TOPIC_CHARS:
+                    topic = topic[:SUMMARY_TOPIC_CHARS - 1] + "…"
+                self._topics.append(topic)
+
+    def summary(self):
+        """
+        One line about the archived messages, or "" when nothing was paged out.
+        """
+        if not self.archived:
+            return ""
+        since = datetime.fromtimestamp(self._archived_since).strftime("%H:%M")
+        line = f"{self.archived} earlier messages since {since}"
+        if self._topics:
+            line += ": " + " · ".join(f"“{topic}”" for topic in self._topics)
+        return line
+
+    def visible(self, count):
+        """
+        The last count messages, reading archived ones back if count exceeds the window.
+        """
+        recent = list(self._recent)[-count:] if count > 0 else []
+        missing = count - len(recent)
+        if missing > 0 and self.archive is not None and self.archived:
+            first_seq = self._recent[0].seq if self._recent else self._next_seq
+            recent = self.archive.load(self.session_id, first_seq, missing) + recent
+        return recent
+
+    def clear(self):
+        if self.archive is not None:
+            self.archive.delete(self.session_id)
+        self._recent.clear()
+        self.archived = 0
+        self._archived_since = None
+        self._topics.clear()
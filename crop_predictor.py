@@ -6,6 +6,9 @@ from joblib import load
 import numpy as np
 import pandas as pd
 import json
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 
 # Feature names (must match training pipeline)
@@ -56,3 +59,581 @@ def recommend_topk(model, N, P, K, temperature, humidity, ph, rainfall, k=5):
 
     topk = [(labels[i], float(proba[i])) for i in idx]
     return topk, proba, labels
+
+
+def recommend_topk_batch(model, rows, k=5):
+    """
+    Recommend top-k crops for many inputs with a single predict_proba call.
+    rows: list of dicts (or a DataFrame) with the FEATURES columns.
+    Returns one [(crop, score), ...] list per row.
+    """
+    x = pd.DataFrame(rows, columns=FEATURES)
+    proba = model.predict_proba(x)
+    labels = model.classes_
+    idx = np.argsort(proba, axis=1)[:, ::-1][:, :k]
+    return [[(labels[j], float(p[j])) for j in row_idx] for p, row_idx in zip(proba, idx)]
+
+
+class StateReranker:
+    """
+    Puts a state's preferred crops ahead of the rest, keeping probability order
+    within each group.
+
+    The preference lists are turned once into a (states x classes) mask aligned
+    with model.classes_, so reranking a single probability vector or a whole
+    batch is one argsort. Crop names the model does not know are reported when
+    the reranker is built instead of being silently ignored.
+    """
+
+    def __init__(self, classes, state_crops):
+        self.classes = np.asarray(classes)
+        class_index = {c: i for i, c in enumerate(self.classes)}
+        self.states = list(state_crops)
+        self._state_index = {s: i for i, s in enumerate(self.states)}
+        # extra all-False row for states without a preference list
+        self.mask = np.zeros((len(self.states) + 1, len(self.classes)), dtype=bool)
+        self.unknown = {}
+        for row, (state, crops) in enumerate(state_crops.items()):
+            for crop in crops:
+                if crop in class_index:
+                    self.mask[row, class_index[crop]] = True
+                else:
+                    self.unknown.setdefault(state, []).append(crop)
+        if self.unknown:
+            names = sorted({c for crops in self.unknown.values() for c in crops})
+            print(f"⚠️ Preferred crops not known to the model (ignored): {', '.join(names)}")
+
+    def state_mask(self, states):
+        """
+        Boolean preference mask, shape (classes,) for one state or (n, classes) for a list.
+        """
+        if isinstance(states, str):
+            return self.mask[self._state_index.get(states, -1)]
+        return self.mask[[self._state_index.get(s, -1) for s in states]]
+
+    def order(self, proba, states):
+        """
+        Class indices sorted preferred-first, then by probability; same shape as proba.
+        """
+        proba = np.asarray(proba)
+        # probabilities are at most 1, so +2 lifts every preferred crop above every other one
+        key = proba + 2.0 * self.state_mask(states)
+        return np.argsort(-key, axis=-1, kind="stable")
+
+    def topk(self, proba, state, k=5):
+        """
+        [(crop, probability), ...] for one probability vector.
+        """
+        idx = self.order(proba, state)[:k]
+        return [(self.classes[i], float(proba[i])) for i in idx]
+
+    def topk_batch(self, proba, states, k=5):
+        """
+        One [(crop, probability), ...] list per row of proba.
+        """
+        idx = self.order(proba, states)[:, :k]
+        return [[(self.classes[j], float(p[j])) for j in row] for p, row in zip(proba, idx)]
+
+
+class ForestExplainer:
+    """
+    Per-prediction feature contributions for the crop forest.
+
+    Path decomposition (Saabas): walking a tree from the root to the leaf, each
+    split changes the class probability from the parent's distribution to the
+    child's, and that change is credited to the split feature. Averaged over
+    the trees, the forest probability of a class is
+
+        bias (root distribution) + sum of the feature contributions.
+
+    Runs on the flat node arrays of flat_forest.FlatForest, advancing every
+    (row, tree) pair one level per step and dropping pairs that reached their
+    leaf, so a batch is explained with a few dozen array operations instead of
+    a Python loop per tree and row.
+    """
+
+    def __init__(self, forest):
+        self.forest = forest
+        self.features = list(forest.features)
+        self.classes = np.asarray(forest.classes_)
+        self._class_index = {c: i for i, c in enumerate(self.classes)}
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Explainer for a FlatForest or a fitted Pipeline (flattened in memory).
+        """
+        if not hasattr(model, "node_value"):
+            from flat_forest import flatten_forest
+            model = flatten_forest(model)
+        return cls(model)
+
+    def class_indices(self, crops):
+        return np.asarray([self._class_index[c] for c in crops])
+
+    def explain(self, X, classes=None, chunk_size=2048):
+        """
+        (bias, contributions) for one class per row.
+
+        X: DataFrame with the FEATURES columns, or an array in that order.
+        classes: class index per row (default: the predicted class).
+        Returns bias of shape (n,) and contributions of shape (n, features);
+        bias + contributions.sum(axis=1) equals the predicted probability.
+        """
+        f = self.forest
+        if classes is None:
+            classes = f.predict_proba(X).argmax(axis=1)
+        Xs = f.transform(X)
+        classes = np.broadcast_to(np.asarray(classes), (len(Xs),))
+        n_features = len(self.features)
+        bias = np.empty(len(Xs))
+        contributions = np.empty((len(Xs), n_features))
+        # chunks keep the (rows x trees) working arrays small
+        for start in range(0, len(Xs), chunk_size):
+            stop = min(start + chunk_size, len(Xs))
+            b, c = self._explain_chunk(Xs[start:stop], classes[start:stop], n_features)
+            bias[start:stop], contributions[start:stop] = b, c
+        return bias, contributions
+
+    def _explain_chunk(self, Xs, cls, n_features):
+        f = self.forest
+        n = len(Xs)
+        # one entry per (row, tree) pair still above its leaf
+        nodes = np.tile(f.roots, n)
+        rows = np.repeat(np.arange(n), f.n_trees)
+        cls = np.repeat(cls, f.n_trees)
+        bias = f.node_value[nodes, cls].astype(np.float64).reshape(n, f.n_trees).mean(axis=1)
+        totals = np.zeros(n * n_features)
+        while len(nodes):
+            feat = f.feature[nodes]
+            internal = feat >= 0
+            nodes, rows, cls, feat = nodes[internal], rows[internal], cls[internal], feat[internal]
+            go_left = Xs[rows, feat] <= f.threshold[nodes]
+            children = np.where(go_left, f.left[nodes], f.right[nodes])
+            delta = f.node_value[children, cls].astype(np.float64) - f.node_value[nodes, cls]
+            totals += np.bincount(rows * n_features + feat, weights=delta, minlength=n * n_features)
+            nodes = children
+        return bias, totals.reshape(n, n_features) / f.n_trees
+
+    def explain_crops(self, row, crops):
+        """
+        {crop: {feature: contribution}} for one input row and several crops.
+        """
+        X = pd.DataFrame([row] * len(crops), columns=FEATURES)
+        _, contributions = self.explain(X, self.class_indices(crops))
+        return {crop: dict(zip(self.features, c.tolist())) for crop, c in zip(crops, contributions)}
+
+
+def recommend_topk_explained(model, explainer, N, P, K, temperature, humidity, ph, rainfall, k=5):
+    """
+    recommend_topk plus {crop: {feature: contribution}} for the top-k crops.
+    """
+    topk, proba, labels = recommend_topk(model, N, P, K, temperature, humidity, ph, rainfall, k=k)
+    row = [N, P, K, temperature, humidity, ph, rainfall]
+    return topk, proba, labels, explainer.explain_crops(row, [crop for crop, _ in topk])
+
+
+class NeighborIndex:
+    """
+    "Similar farms": k nearest labelled samples in the model's scaled feature
+    space, backed by a KD-tree built at training time.
+
+    The out-of-distribution score of an input is its mean distance to the k
+    nearest samples divided by the 99th percentile of the same distance over
+    the training rows (each left out of its own query), so scores above 1 are
+    further from the data than almost every training sample.
+    """
+
+    def __init__(self, X, labels, mean, scale, k=5, quantile=0.99, leaf_size=40, threshold_rows=100_000):
+        from sklearn.neighbors import KDTree
+
+        self.X = np.asarray(X, dtype=np.float64)
+        self.labels = np.asarray(labels)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.k = k
+        self.tree = KDTree(self.transform(self.X), leaf_size=leaf_size)
+        # k + 1 because each training row is its own nearest neighbour; a sample is enough for a quantile
+        sample = self.X
+        if len(sample) > threshold_rows:
+            sample = sample[np.random.default_rng(0).choice(len(sample), threshold_rows, replace=False)]
+        dist, _ = self.tree.query(self.transform(sample), k=k + 1)
+        self.ood_threshold = float(np.quantile(dist[:, 1:].mean(axis=1), quantile))
+
+    @classmethod
+    def from_pipeline(cls, pipe, X, labels, **kwargs):
+        """
+        Index over X (FEATURES columns) scaled with the pipeline's StandardScaler.
+        """
+        scaler = pipe.named_steps["prep"].named_transformers_["num"]
+        return cls(pd.DataFrame(X, columns=FEATURES).to_numpy(), labels, scaler.mean_, scaler.scale_, **kwargs)
+
+    def transform(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X[FEATURES].to_numpy(dtype=np.float64)
+        return (np.atleast_2d(np.asarray(X, dtype=np.float64)) - self.mean) / self.scale
+
+    def query(self, X, k=None):
+        """
+        (distances, row indices), each of shape (n, k).
+        """
+        return self.tree.query(self.transform(X), k=k or self.k)
+
+    def ood_scores(self, X=None, dist=None):
+        """
+        Mean k-NN distance relative to the training threshold; > 1 means out of distribution.
+        """
+        if dist is None:
+            dist, _ = self.query(X, self.k)
+        return dist[:, :self.k].mean(axis=1) / self.ood_threshold
+
+    def similar(self, row, k=None):
+        """
+        (neighbours DataFrame with label and distance, OOD score) for one input row.
+        """
+        dist, idx = self.query([row], max(k or self.k, self.k))
+        neighbours = pd.DataFrame(self.X[idx[0]], columns=FEATURES)
+        neighbours.insert(0, "label", self.labels[idx[0]])
+        neighbours["distance"] = dist[0]
+        return neighbours.head(k or self.k), float(self.ood_scores(dist=dist)[0])
+
+    def similar_batch(self, X, k=None):
+        """
+        Per row: [(label, distance), ...] for the nearest samples, plus the OOD scores.
+        """
+        dist, idx = self.query(X, max(k or self.k, self.k))
+        scores = self.ood_scores(dist=dist)
+        kk = k or self.k
+        return [list(zip(self.labels[i[:kk]], d[:kk].tolist())) for i, d in zip(idx, dist)], scores
+
+
+def load_neighbor_index(path="crop_neighbors.joblib"):
+    """
+    Load the NeighborIndex written by train_model.py / update_model.py.
+    """
+    return load(path)
+
+
+# Physically valid range of each input; swept values are clipped to it
+FEATURE_LIMITS = {
+    "N": (0.0, 1000.0), "P": (0.0, 1000.0), "K": (0.0, 1000.0),
+    "temperature": (-10.0, 60.0), "humidity": (0.0, 100.0), "ph": (0.0, 14.0), "rainfall": (0.0, 5000.0),
+}
+
+
+class SweepResult:
+    """
+    Probabilities for a batch of what-if scenarios around one base input.
+
+    axes maps each swept feature to its (clipped, absolute) values; shape is
+    the grid shape, or (n,) for a list of scenarios. surfaces holds a float32
+    probability array of that shape for every crop that reaches min_probability
+    somewhere in the sweep; other crops are left out.
+    """
+
+    def __init__(self, base, axes, inputs, proba, classes, shape, min_probability):
+        self.base = base
+        self.axes = axes
+        self.inputs = inputs
+        self.shape = shape
+        keep = proba.max(axis=0) >= min_probability
+        self.surfaces = {c: proba[:, i].astype(np.float32).reshape(shape) for i, c in enumerate(classes) if keep[i]}
+        self.top1 = np.asarray(classes)[proba.argmax(axis=1)].reshape(shape)
+
+    @property
+    def n_scenarios(self):
+        return len(self.inputs)
+
+    def surface(self, crop):
+        return self.surfaces.get(crop, np.zeros(self.shape, dtype=np.float32))
+
+    def top_crops(self, n=5):
+        """
+        Crops ordered by their highest probability anywhere in the sweep.
+        """
+        return sorted(self.surfaces, key=lambda c: -float(self.surfaces[c].max()))[:n]
+
+    def to_frame(self, crops=None):
+        """
+        Long format (swept features, crop, probability) for charts.
+        """
+        crops = crops or self.top_crops()
+        frame = pd.DataFrame(self.inputs[list(self.axes)])
+        parts = [frame.assign(crop=c, probability=self.surface(c).ravel()) for c in crops]
+        return pd.concat(parts, ignore_index=True)
+
+
+class ScenarioEngine:
+    """
+    What-if sweeps for one crop model: expands a base input into a grid (or
+    list) of perturbations, scores all of them with a single predict_proba
+    call and keeps the last sweeps in an LRU cache.
+
+    An axis is a list of absolute values, or ("add", deltas), ("scale", factors)
+    or ("percent", changes) relative to the base value, e.g.
+        engine.sweep(base, {"N": ("add", [0, 10, 20]), "rainfall": ("percent", [-30, 0, 30])})
+    """
+
+    MODES = ("set", "add", "scale", "percent")
+
+    def __init__(self, model, cache_size=64, max_scenarios=20_000, min_probability=0.01):
+        self.model = model
+        self.cache_size = cache_size
+        self.max_scenarios = max_scenarios
+        self.min_probability = min_probability
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"sweeps": 0, "cache_hits": 0, "scenarios_scored": 0}
+
+    def _normalize_axis(self, feature, spec):
+        if feature not in FEATURE_LIMITS:
+            raise ValueError(f"unknown feature {feature!r}; expected one of {FEATURES}")
+        mode, values = spec if isinstance(spec, tuple) else ("set", spec)
+        if mode not in self.MODES:
+            raise ValueError(f"axis mode must be one of {self.MODES}, got {mode!r}")
+        return mode, tuple(float(v) for v in np.ravel(values))
+
+    @staticmethod
+    def _axis_values(feature, base_value, mode, values):
+        values = np.asarray(values, dtype=np.float64)
+        if mode == "add":
+            values = base_value + values
+        elif mode == "scale":
+            values = base_value * values
+        elif mode == "percent":
+            values = base_value * (1 + values / 100.0)
+        return np.clip(values, *FEATURE_LIMITS[feature])
+
+    def sweep(self, base, axes, grid=True):
+        """
+        SweepResult for base (dict of the FEATURES) under the given axes.
+        grid=True takes the cartesian product of the axes; grid=False pairs
+        the i-th values of every axis (all axes must have the same length).
+        """
+        base = {f: float(base[f]) for f in FEATURES}
+        axes = {f: self._normalize_axis(f, spec) for f, spec in axes.items()}
+        key = (tuple(base.values()), tuple(axes.items()), grid)
+        with self._lock:
+            self.stats["sweeps"] += 1
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return self._cache[key]
+
+        values = {f: self._axis_values(f, base[f], *spec) for f, spec in axes.items()}
+        if grid:
+            shape = tuple(len(v) for v in values.values())
+            n = int(np.prod(shape)) if shape else 1
+        else:
+            lengths = {len(v) for v in values.values()}
+            if len(lengths) > 1:
+                raise ValueError("grid=False needs axes of equal length")
+            shape = (lengths.pop() if lengths else 1,)
+            n = shape[0]
+        if n > self.max_scenarios:
+            raise ValueError(f"{n} scenarios requested, at most {self.max_scenarios} per sweep")
+
+        inputs = pd.DataFrame({f: np.full(n, v) for f, v in base.items()})
+        if grid and values:
+            mesh = np.meshgrid(*values.values(), indexing="ij")
+            for f, m in zip(values, mesh):
+                inputs[f] = m.ravel()
+        else:
+            for f, v in values.items():
+                inputs[f] = v
+        proba = self.model.predict_proba(inputs)
+        result = SweepResult(base, values, inputs, proba, self.model.classes_, shape, self.min_probability)
+
+        with self._lock:
+            self.stats["scenarios_scored"] += n
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+
+class NutrientPlanner:
+    """
+    Approximately smallest soil adjustment (N, P, K, pH) that makes a chosen
+    crop the top recommendation, or lifts it above a probability.
+
+    The forest only changes its answer when an input crosses one of its split
+    thresholds, so the candidate values of each feature are the points just
+    past those thresholds. A beam search moves one feature per step, to the
+    next few crossings or a coarse jump snapped to a crossing, scoring every
+    expansion of the beam in one batch, and stops at the time budget. Plans
+    that reach the goal are then polished: every crossing between the current
+    value and the plan is tried at once, feature by feature, keeping the
+    cheapest one that still reaches the goal. Cost is the L1 change in
+    standard deviations of the training data, optionally weighted per feature.
+
+    The search is heuristic: moving one feature at a time can miss a cheaper
+    plan that needs two features to change together, so a plan is small, not
+    guaranteed to be the smallest.
+    """
+
+    ADJUSTABLE = ("N", "P", "K", "ph")
+    RESOLUTION = {"N": 1.0, "P": 1.0, "K": 1.0, "ph": 0.01}
+    MAX_CHANGE = {"N": 120.0, "P": 120.0, "K": 120.0, "ph": 2.0}
+
+    def __init__(self, model, forest=None, beam_width=8, per_direction=3, max_steps=8):
+        if forest is None:
+            forest = model if hasattr(model, "split_values") else None
+        if forest is None:
+            from flat_forest import flatten_forest
+            forest = flatten_forest(model)
+        self.model = model
+        self.classes = np.asarray(model.classes_)
+        self.scale = dict(zip(FEATURES, forest._scale))
+        self.splits = {f: forest.split_values(f) for f in self.ADJUSTABLE}
+        self.beam_width = beam_width
+        self.per_direction = per_direction
+        self.max_steps = max_steps
+
+    def _crossings(self, feature, base_value):
+        """
+        Every distinct value (at the feature's resolution) just past a split
+        threshold, within MAX_CHANGE of base_value; base_value itself included.
+        """
+        res, splits = self.RESOLUTION[feature], self.splits[feature]
+        lo = max(FEATURE_LIMITS[feature][0], base_value - self.MAX_CHANGE[feature])
+        hi = min(FEATURE_LIMITS[feature][1], base_value + self.MAX_CHANGE[feature])
+        # x <= threshold goes left: the first value above and the last value at or below each threshold
+        values = np.concatenate([np.floor(splits / res + 1) * res, np.floor(splits / res) * res, [base_value]])
+        values = np.round(values, 6)
+        return np.unique(values[(values >= lo) & (values <= hi)])
+
+    def _moves(self, crossings, value):
+        """
+        From value: the nearest crossings each way plus coarse jumps snapped to crossings.
+        """
+        pos = np.searchsorted(crossings, value)
+        near = np.arange(pos - self.per_direction, pos + self.per_direction + 1)
+        span = crossings[-1] - crossings[0]
+        jumps = value + np.outer([-1, 1], span * 0.5 ** np.arange(1, 6)).ravel()
+        snapped = np.clip(np.searchsorted(crossings, jumps), 0, len(crossings) - 1)
+        idx = np.unique(np.concatenate([near[(near >= 0) & (near < len(crossings))], snapped]))
+        moves = crossings[idx]
+        return moves[moves != value]
+
+    def _cost(self, X, base, weights):
+        cost = np.zeros(len(X))
+        for f in self.ADJUSTABLE:
+            cost += weights.get(f, 1.0) * np.abs(X[f].to_numpy() - base[f]) / self.scale[f]
+        return cost
+
+    def _reaches(self, proba, target, min_probability):
+        if min_probability is None:
+            return proba.argmax(axis=1) == target
+        return proba[:, target] >= min_probability
+
+    def plan(self, base, crop, min_probability=None, adjustable=ADJUSTABLE, weights=None,
+             n_plans=3, budget_s=1.0):
+        """
+        Ranked adjustment plans for reaching crop from base (dict of the FEATURES).
+
+        Returns {"plans": [...], "closest": ..., "evaluated": rows scored,
+        "elapsed_s": ..., "budget_exhausted": bool}. Each plan has "changes"
+        {feature: (from, to)}, "inputs", "cost", "probability" of the crop and
+        "top_crop"; "closest" is the input with the highest probability seen,
+        for when no plan reaches the goal.
+        """
+        start = time.perf_counter()
+        base = {f: float(base[f]) for f in FEATURES}
+        weights = weights or {}
+        target = int(np.flatnonzero(self.classes == crop)[0])
+        adjustable = [f for f in adjustable if f in self.ADJUSTABLE]
+        evaluated, exhausted = 0, False
+
+        closest = {"probability": -1.0}
+
+        def score(rows):
+            nonlocal evaluated
+            X = pd.DataFrame(rows, columns=FEATURES)
+            evaluated += len(X)
+            proba = self.model.predict_proba(X)
+            best = int(proba[:, target].argmax())
+            if proba[best, target] > closest["probability"]:
+                row = dict(zip(FEATURES, X.iloc[best]))
+                closest.update({
+                    "changes": {f: (base[f], row[f]) for f in self.ADJUSTABLE if row[f] != base[f]},
+                    "inputs": row,
+                    "probability": float(proba[best, target]),
+                    "top_crop": self.classes[int(proba[best].argmax())],
+                })
+            return X, proba
+
+        X, proba = score([base])
+        found = {}
+        if self._reaches(proba, target, min_probability)[0]:
+            found[tuple(X.iloc[0])] = 0.0
+        crossings = {f: self._crossings(f, base[f]) for f in adjustable}
+        beam = [base]
+        seen = {tuple(base.values())}
+        for _ in range(self.max_steps):
+            if found or time.perf_counter() - start > budget_s:
+                exhausted = not found
+                break
+            rows = []
+            for state in beam:
+                for f in adjustable:
+                    for v in self._moves(crossings[f], state[f]):
+                        row = {**state, f: float(v)}
+                        key = tuple(row.values())
+                        if key not in seen:
+                            seen.add(key)
+                            rows.append(row)
+            if not rows:
+                break
+            X, proba = score(rows)
+            cost = self._cost(X, base, weights)
+            ok = self._reaches(proba, target, min_probability)
+            for i in np.flatnonzero(ok):
+                found[tuple(X.iloc[i])] = cost[i]
+            # keep the most promising states, cheaper first among equals
+            order = np.lexsort((cost, -proba[:, target]))
+            beam = [dict(zip(FEATURES, X.iloc[i])) for i in order if not ok[i]][:self.beam_width]
+
+        plans = self._polish(found, base, crossings, target, min_probability, weights, score, start, budget_s)
+        plans = sorted(plans, key=lambda p: p["cost"])[:n_plans]
+        return {"plans": plans, "closest": closest, "evaluated": evaluated,
+                "elapsed_s": time.perf_counter() - start, "budget_exhausted": exhausted}
+
+    def _polish(self, found, base, crossings, target, min_probability, weights, score, start, budget_s):
+        """
+        Pull the changes of the successful plans back towards base while the goal still holds.
+        """
+        plans = {}
+        for key in sorted(found, key=found.get)[:self.beam_width]:
+            row = dict(zip(FEATURES, key))
+            improved = True
+            while improved and time.perf_counter() - start <= budget_s:
+                improved = False
+                rows = []
+                # every crossing between base and the current value, for each changed feature
+                for f, values in crossings.items():
+                    closer = values[np.abs(values - base[f]) < abs(row[f] - base[f])]
+                    rows.extend({**row, f: float(v)} for v in closer)
+                if not rows:
+                    break
+                X, proba = score(rows)
+                ok = self._reaches(proba, target, min_probability)
+                if ok.any():
+                    cost = np.where(ok, self._cost(X, base, weights), np.inf)
+                    row = dict(zip(FEATURES, X.iloc[int(cost.argmin())]))
+                    improved = True
+            plans[tuple(row.values())] = row
+
+        results = []
+        if plans:
+            X, proba = score(list(plans.values()))
+            cost = self._cost(X, base, weights)
+            for i, row in enumerate(plans.values()):
+                results.append({
+                    "changes": {f: (base[f], row[f]) for f in self.ADJUSTABLE if row[f] != base[f]},
+                    "inputs": row,
+                    "cost": float(cost[i]),
+                    "probability": float(proba[i, target]),
+                    "top_crop": self.classes[int(proba[i].argmax())],
+                })
+        return results
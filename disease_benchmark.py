@@ -0,0 +1,162 @@
+"""
+Compare served disease models: accuracy, parameter count, FLOPs and CPU latency.
+
+Usage:
+  python disease_benchmark.py plant_disease_model.h5 plant_disease_mobilenet.keras
+"""
+
+import argparse
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from disease_data import load_split
+
+# layers that only move data around
+ZERO_COST_LAYERS = ("InputLayer", "Flatten", "Reshape", "Dropout", "SpatialDropout2D", "ZeroPadding2D")
+
+
+def _shape(tensor):
+    return tuple(1 if d is None else int(d) for d in tensor.shape[1:])
+
+
+def model_input_size(model):
+    """
+    (height, width) the model expects.
+    """
+    return tuple(int(d) for d in model.input_shape[1:3])
+
+
+def layer_flops(layer):
+    """
+    Forward FLOPs of one layer for a single image (a multiply-add counts as 2).
+    Uses the layer's symbolic input/output shapes, so the model must be built.
+    """
+    kind = type(layer).__name__
+    if kind in ZERO_COST_LAYERS:
+        return 0
+    try:
+        out_shape = _shape(layer.output)
+        in_shape = _shape(layer.input) if not isinstance(layer.input, (list, tuple)) else _shape(layer.input[0])
+    except (AttributeError, ValueError):
+        return 0
+    out_size = int(np.prod(out_shape))
+
+    if kind == "Conv2D":
+        kh, kw = layer.kernel_size
+        groups = getattr(layer, "groups", 1)
+        return 2 * out_size * kh * kw * in_shape[-1] // groups
+    if kind == "DepthwiseConv2D":
+        kh, kw = layer.kernel_size
+        return 2 * out_size * kh * kw
+    if kind == "SeparableConv2D":
+        kh, kw = layer.kernel_size
+        depthwise = 2 * int(np.prod(out_shape[:-1])) * in_shape[-1] * layer.depth_multiplier * kh * kw
+        return depthwise + 2 * out_size * in_shape[-1] * layer.depth_multiplier
+    if kind == "Dense":
+        return 2 * out_size * in_shape[-1]
+    if kind in ("MaxPooling2D", "AveragePooling2D"):
+        ph, pw = layer.pool_size
+        return out_size * ph * pw
+    if kind in ("GlobalAveragePooling2D", "GlobalMaxPooling2D"):
+        return int(np.prod(in_shape))
+    if kind == "BatchNormalization":
+        return 2 * out_size
+    # activations, rescaling, add/multiply and other elementwise ops
+    return out_size
+
+
+def iter_layers(model):
+    """
+    Yield the leaf layers of a model, descending into nested models (e.g. a backbone).
+    """
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.Model):
+            yield from iter_layers(layer)
+        else:
+            yield layer
+
+
+def count_flops(model):
+    """
+    Total forward FLOPs for a single image.
+    """
+    return sum(layer_flops(layer) for layer in iter_layers(model))
+
+
+def cpu_latency_ms(model, batch_size=1, runs=50, warmup=5):
+    """
+    Median and p95 forward latency in milliseconds for one batch.
+    """
+    h, w = model_input_size(model)
+    x = tf.random.uniform((batch_size, h, w, 3))
+    infer = tf.function(lambda t: model(t, training=False))
+    for _ in range(warmup):
+        infer(x)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        infer(x).numpy()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times)), float(np.percentile(times, 95))
+
+
+def evaluate_accuracy(model, split="test", batch_size=32):
+    """
+    Top-1 accuracy on a split, loaded at the model's own input size.
+    """
+    ds, _, _ = load_split(split, img_size=model_input_size(model), batch_size=batch_size)
+    infer = tf.function(lambda t: model(t, training=False))
+    correct, total = 0, 0
+    for x, y in ds:
+        pred = infer(x).numpy().argmax(axis=1)
+        correct += int((pred == y.numpy().argmax(axis=1)).sum())
+        total += len(pred)
+    return correct / total if total else float("nan")
+
+
+def benchmark(model, name, split="test", with_accuracy=True):
+    """
+    Collect all report numbers for one model.
+    """
+    latency, p95 = cpu_latency_ms(model)
+    return {
+        "model": name,
+        "input": "x".join(str(d) for d in model_input_size(model)),
+        "params": int(model.count_params()),
+        "mflops": count_flops(model) / 1e6,
+        "latency_ms": latency,
+        "latency_p95_ms": p95,
+        "accuracy": evaluate_accuracy(model, split) if with_accuracy else float("nan"),
+    }
+
+
+def print_report(rows):
+    """
+    Print benchmark rows as an aligned table.
+    """
+    header = f"{'model':<36} {'input':>8} {'params':>12} {'MFLOPs':>10} {'ms (bs1)':>9} {'p95 ms':>8} {'accuracy':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(f"{r['model']:<36} {r['input']:>8} {r['params']:>12,} {r['mflops']:>10.1f} "
+              f"{r['latency_ms']:>9.2f} {r['latency_p95_ms']:>8.2f} {r['accuracy']:>9.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark served disease models.")
+    parser.add_argument("models", nargs="+", help="model files (.h5 / .keras)")
+    parser.add_argument("--split", default="test", help="dataset split used for accuracy")
+    parser.add_argument("--no-accuracy", action="store_true", help="skip the accuracy pass")
+    args = parser.parse_args()
+
+    rows = []
+    for path in args.models:
+        model = tf.keras.models.load_model(path, compile=False)
+        rows.append(benchmark(model, path, args.split, not args.no_accuracy))
+    print_report(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+tf.data input pipelines for the plant disease model.
+
+Images are decoded in parallel, resized once and cached on disk as uint8
+tensors, so only the first epoch pays for JPEG decoding. Datasets packed
+by pack_plant_dataset.py are streamed from TFRecord shards instead.
+Also holds the training callbacks for throughput logging and resumable checkpoints.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import time
+
+import tensorflow as tf
+
+AUTOTUNE = tf.data.AUTOTUNE
+IMG_SIZE = (150, 150)
+SHUFFLE_BUFFER = 2048
+DATASET_DIR = "Plant"
+CACHE_DIR = "tf_cache"
+SHARD_DIR = "Plant_shards"
+SHARD_INDEX = "index.json"
+
+# formats tf.io.decode_image understands (flow_from_directory also used these)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def list_image_files(directory):
+    """
+    Collect image paths and integer labels from a class-per-folder directory.
+    Class order is the sorted folder names, same as flow_from_directory.
+    """
+    class_names = sorted(
+        d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d))
+    )
+    paths, labels = [], []
+    for idx, name in enumerate(class_names):
+        for root, _, files in sorted(os.walk(os.path.join(directory, name))):
+            for fname in sorted(files):
+                if fname.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(root, fname))
+                    labels.append(idx)
+    return paths, labels, class_names
+
+
+def decode_and_resize(path, label, img_size=IMG_SIZE):
+    """
+    Read an image file into a uint8 (H, W, 3) tensor at img_size.
+    """
+    data = tf.io.read_file(path)
+    img = tf.io.decode_image(data, channels=3, expand_animations=False)
+    # nearest keeps uint8 (4x smaller cache) and matches keras load_img defaults
+    img = tf.image.resize(img, img_size, method="nearest")
+    return img, label
+
+
+def _to_model_input(images, labels, num_classes, img_size=None):
+    images = tf.cast(images, tf.float32) / 255.0
+    if img_size is not None:
+        images = tf.image.resize(images, img_size)
+    return images, tf.one_hot(labels, num_classes)
+
+
+def _batched(make_stream, num_classes, batch_size, training, seed, epochs=None, img_size=None):
+    """
+    Shuffle, batch, normalise and prefetch. make_stream(seed) returns one
+    epoch of unbatched (uint8 image, label) pairs, shuffled when seed is set.
+
+    With epochs=(first, last) the result is a single stream of last - first
+    epochs, each shuffled with seed + epoch. Fit it with steps_per_epoch:
+    epoch e then sees the same order whether the run was resumed or not.
+    """
+    if not training:
+        ds = make_stream(None).batch(batch_size)
+    elif epochs is None:
+        ds = make_stream(seed).batch(batch_size)
+    else:
+        first, last = epochs
+        ds = make_stream(seed + first).batch(batch_size)
+        for epoch in range(first + 1, last):
+            ds = ds.concatenate(make_stream(seed + epoch).batch(batch_size))
+
+    ds = ds.map(lambda x, y: _to_model_input(x, y, num_classes, img_size), num_parallel_calls=AUTOTUNE)
+    return ds.prefetch(AUTOTUNE)
+
+
+def make_dataset(directory, img_size=IMG_SIZE, batch_size=32, training=False,
+                 cache_dir=CACHE_DIR, seed=42, epochs=None):
+    """
+    Build a batched (image, one-hot label) dataset from a class-per-folder directory.
+    Returns (dataset, class_names, n_images).
+    """
+    paths, labels, class_names = list_image_files(directory)
+    if not paths:
+        raise ValueError(f"No images found in {directory}")
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels))
+    ds = ds.map(lambda p, l: decode_and_resize(p, l, img_size), num_parallel_calls=AUTOTUNE)
+
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        # the file list is part of the key so adding images invalidates the cache
+        digest = hashlib.sha1("\n".join(paths).encode("utf-8")).hexdigest()[:10]
+        split = os.path.basename(os.path.normpath(directory))
+        ds = ds.cache(os.path.join(cache_dir, f"{split}_{img_size[0]}x{img_size[1]}_{digest}"))
+    else:
+        ds = ds.cache()
+
+    def make_stream(stream_seed):
+        if stream_seed is None:
+            return ds
+        return ds.shuffle(min(SHUFFLE_BUFFER, len(paths)), seed=stream_seed, reshuffle_each_iteration=True)
+
+    return _batched(make_stream, len(class_names), batch_size, training, seed, epochs), class_names, len(paths)
+
+
+def load_shard_index(shard_dir=SHARD_DIR):
+    """
+    Read the index written by pack_plant_dataset.py, or None if there is none.
+    """
+    index_path = os.path.join(shard_dir, SHARD_INDEX)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _parse_example(record, img_size):
+    features = tf.io.parse_single_example(record, {
+        "image": tf.io.FixedLenFeature([], tf.string),
+        "label": tf.io.FixedLenFeature([], tf.int64),
+    })
+    img = tf.io.decode_raw(features["image"], tf.uint8)
+    img = tf.reshape(img, [img_size[0], img_size[1], 3])
+    return img, tf.cast(features["label"], tf.int32)
+
+
+def make_shard_dataset(shard_dir, split, batch_size=32, training=False, seed=42, img_size=None,
+                       epochs=None):
+    """
+    Stream a split from TFRecord shards with parallel interleaved reads.
+    Images are resized on the fly when img_size differs from the packed size.
+    Returns (dataset, class_names, n_images), like make_dataset.
+    """
+    index = load_shard_index(shard_dir)
+    if index is None or split not in index["splits"]:
+        raise ValueError(f"No packed '{split}' split in {shard_dir}")
+    info = index["splits"][split]
+    packed_size = tuple(index["img_size"])
+    out_size = tuple(img_size) if img_size is not None and tuple(img_size) != packed_size else None
+    class_names = index["class_names"]
+    files = [os.path.join(shard_dir, name) for name in info["shards"]]
+
+    def make_stream(stream_seed):
+        ds = tf.data.Dataset.from_tensor_slices(files)
+        if stream_seed is not None:
+            ds = ds.shuffle(len(files), seed=stream_seed, reshuffle_each_iteration=True)
+        ds = ds.interleave(
+            tf.data.TFRecordDataset,
+            cycle_length=min(len(files), 8),
+            num_parallel_calls=AUTOTUNE,
+            # order only matters when a resumed run has to replay an epoch
+            deterministic=stream_seed is None or epochs is not None,
+        )
+        ds = ds.map(lambda r: _parse_example(r, packed_size), num_parallel_calls=AUTOTUNE)
+        if stream_seed is not None:
+            ds = ds.shuffle(min(SHUFFLE_BUFFER, info["count"]), seed=stream_seed, reshuffle_each_iteration=True)
+        return ds
+
+    ds = _batched(make_stream, len(class_names), batch_size, training, seed, epochs, out_size)
+    return ds, class_names, info["count"]
+
+
+def load_split(split, img_size=IMG_SIZE, batch_size=32, training=False,
+               data_dir=DATASET_DIR, shard_dir=SHARD_DIR, seed=42, epochs=None):
+    """
+    Load a split from shards when pack_plant_dataset.py has been run,
+    otherwise from the image folders under data_dir.
+    """
+    if load_shard_index(shard_dir) is not None:
+        return make_shard_dataset(shard_dir, split, batch_size, training, seed, img_size, epochs)
+    return make_dataset(os.path.join(data_dir, split), img_size, batch_size, training, seed=seed, epochs=epochs)
+
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """
+    Log training images/sec per epoch (validation time excluded).
+    With log_path each epoch is also appended to a CSV, together with run_info
+    (thread counts, precision, ...) so runs on different nodes can be compared.
+    """
+
+    def __init__(self, n_images, log_path=None, run_info=None):
+        super().__init__()
+        self.n_images = n_images
+        self.log_path = log_path
+        self.run_info = run_info or {}
+        self.history = []
+        self._start = None
+        self._train_seconds = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._train_seconds = None
+        self._start = time.perf_counter()
+
+    def on_test_begin(self, logs=None):
+        # fit() runs validation through the same callbacks; stop the clock there
+        if self._start is not None and self._train_seconds is None:
+            self._train_seconds = time.perf_counter() - self._start
+
+    def on_epoch_end(self, epoch, logs=None):
+        epoch_seconds = time.perf_counter() - self._start
+        train_seconds = self._train_seconds or epoch_seconds
+        ips = self.n_images / train_seconds
+        row = {
+            "epoch": epoch + 1,
+            "train_seconds": round(train_seconds, 3),
+            "epoch_seconds": round(epoch_seconds, 3),
+            "images_per_sec": round(ips, 1),
+        }
+        self.history.append(row)
+        print(f"\nEpoch {epoch + 1}: {ips:.1f} images/sec ({train_seconds:.1f}s training, {epoch_seconds:.1f}s total)")
+        if logs is not None:
+            logs["images_per_sec"] = ips
+
+        if self.log_path:
+            row = {**row, **self.run_info}
+            new_file = not os.path.exists(self.log_path)
+            with open(self.log_path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(row)
+
+
+class TrainingCheckpoint(tf.keras.callbacks.Callback):
+    """
+    Save the full training state at the end of every epoch so an interrupted
+    run can resume: the model with its optimizer state (last.keras) and a
+    state.json with the epoch counter, data seed and per-epoch metrics.
+    Both files are replaced atomically.
+    """
+
+    MODEL_FILE = "last.keras"
+    STATE_FILE = "state.json"
+
+    def __init__(self, checkpoint_dir, state=None):
+        super().__init__()
+        self.checkpoint_dir = checkpoint_dir
+        self.state = dict(state or {})
+        self.state.setdefault("epoch", 0)
+        self.state.setdefault("history", [])
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    @classmethod
+    def load_state(cls, checkpoint_dir):
+        """
+        Return (model_path, state) of a saved run, or (None, None).
+        """
+        model_path = os.path.join(checkpoint_dir, cls.MODEL_FILE)
+        state_path = os.path.join(checkpoint_dir, cls.STATE_FILE)
+        if not (os.path.exists(model_path) and os.path.exists(state_path)):
+            return None, None
+        with open(state_path, "r", encoding="utf-8") as f:
+            return model_path, json.load(f)
+
+    def save_state(self):
+        tmp_state = os.path.join(self.checkpoint_dir, self.STATE_FILE + ".tmp")
+        with open(tmp_state, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_state, os.path.join(self.checkpoint_dir, self.STATE_FILE))
+
+    def on_epoch_end(self, epoch, logs=None):
+        # model first: a state.json never points past the saved weights
+        tmp_model = os.path.join(self.checkpoint_dir, "tmp_" + self.MODEL_FILE)
+        self.model.save(tmp_model)
+        os.replace(tmp_model, os.path.join(self.checkpoint_dir, self.MODEL_FILE))
+
+        self.state["epoch"] = epoch + 1
+        self.state["history"].append({"epoch": epoch + 1, **{k: float(v) for k, v in (logs or {}).items()}})
+        val_acc = (logs or {}).get("val_accuracy")
+        if val_acc is not None and val_acc > self.state.get("best_val_accuracy", float("-inf")):
+            self.state["best_val_accuracy"] = float(val_acc)
+        self.save_state()
+
+
+class ResumableEarlyStopping(tf.keras.callbacks.EarlyStopping):
+    """
+    EarlyStopping whose patience counter, best value and best weights survive
+    a resume. The counters go into the state of a TrainingCheckpoint, which
+    must come after this callback so the same epoch's state.json holds them;
+    the best weights are kept next to it in best.weights.h5.
+    """
+
+    WEIGHTS_FILE = "best.weights.h5"
+
+    def __init__(self, checkpoint, **kwargs):
+        super().__init__(**kwargs)
+        self.checkpoint = checkpoint
+        self.weights_path = os.path.join(checkpoint.checkpoint_dir, self.WEIGHTS_FILE)
+
+    def on_train_begin(self, logs=None):
+        super().on_train_begin(logs)
+        saved = self.checkpoint.state.get("early_stopping")
+        if not saved:
+            return
+        self.wait, self.best, self.best_epoch = saved["wait"], saved["best"], saved["best_epoch"]
+        if self.restore_best_weights and os.path.exists(self.weights_path):
+            current = self.model.get_weights()
+            self.model.load_weights(self.weights_path)
+            self.best_weights = self.model.get_weights()
+            self.model.set_weights(current)
+
+    def on_epoch_end(self, epoch, logs=None):
+        super().on_epoch_end(epoch, logs)
+        if self.best is None:
+            return
+        if self.restore_best_weights and self.best_epoch == epoch:
+            tmp_weights = os.path.join(self.checkpoint.checkpoint_dir, "tmp_" + self.WEIGHTS_FILE)
+            self.model.save_weights(tmp_weights)
+            os.replace(tmp_weights, self.weights_path)
+        self.checkpoint.state["early_stopping"] = {
+            "wait": self.wait, "best": float(self.best), "best_epoch": self.best_epoch,
+        }
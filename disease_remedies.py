@@ -0,0 +1,69 @@
+"""
+Remedy texts for plant diseases shown by AgriBot, plus the extra names
+farmers use for the PlantVillage classes (English and Hindi).
+keyword_index.build_disease_index() turns these into the chat's disease lookup.
+"""
+
+DISEASE_REMEDIES = {
+    "Strawberry___Leaf_scorch": {
+        "en": """<div class="disease-remedy"><div class="disease-title">🔴 Strawberry Leaf Scorch</div><div class="disease-section">🌿 Symptoms:</div><div class="disease-bullet">• Brown, scorched leaf edges</div><div class="disease-bullet">• Purple spots on leaves</div><div class="disease-bullet">• Leaf curling and premature dropping</div><div class="disease-section">✅ Treatment:</div><div class="disease-bullet">• Prune infected leaves</div><div class="disease-bullet">• Spray Copper Oxychloride (0.3%) every 10 days</div><div class="disease-bullet">• Use neem oil (5ml/L) for organic control</div><div class="disease-section">🛡 Prevention:</div><div class="disease-bullet">• Space plants 30cm apart for airflow</div><div class="disease-bullet">• Avoid nitrogen-heavy fertilizers</div></div>""",
+        "hi": """<div class="disease-remedy"><div class="disease-title">🔴 स्ट्रॉबेरी लीफ स्कॉर्च</div><div class="disease-section">🌿 लक्षण:</div><div class="disease-bullet">• भूरे, झुलसे हुए पत्तों के किनारे</div><div class="disease-bullet">• पत्तियों पर बैंगनी धब्बे</div><div class="disease-bullet">• पत्तियाँ मुड़ना और गिरना</div><div class="disease-section">✅ उपचार:</div><div class="disease-bullet">• संक्रमित पत्तियाँ काटें</div><div class="disease-bullet">• हर 10 दिन में कॉपर ऑक्सीक्लोराइड (0.3%) छिड़कें</div><div class="disease-bullet">• जैविक नियंत्रण के लिए नीम तेल (5 मिली/लीटर) का उपयोग करें</div><div class="disease-section">🛡 रोकथाम:</div><div class="disease-bullet">• हवा के प्रवाह के लिए पौधों को 30 सेमी दूर रखें</div><div class="disease-bullet">• नाइट्रोजन युक्त उर्वरकों से बचें</div></div>"""
+    },
+    "Tomato___Late_blight": {
+        "en": """<div class="disease-remedy"><div class="disease-title">🔴 Tomato Late Blight</div><div class="disease-section">🌿 Symptoms:</div><div class="disease-bullet">• Water-soaked spots on leaves</div><div class="disease-bullet">• White mold under leaves</div><div class="disease-bullet">• Rapid wilting</div><div class="disease-section">✅ Treatment:</div><div class="disease-bullet">• Remove and burn infected plants</div><div class="disease-bullet">• Spray Mancozeb (0.25%) every 7 days</div><div class="disease-bullet">• Use garlic-chili spray for organic option</div><div class="disease-section">🛡 Prevention:</div><div class="disease-bullet">• Plant resistant varieties</div><div class="disease-bullet">• Use drip irrigation</div><div class="disease-bullet">• Rotate crops yearly</div></div>""",
+        "hi": """<div class="disease-remedy"><div class="disease-title">🔴 टमाटर लेट ब्लाइट</div><div class="disease-section">🌿 लक्षण:</div><div class="disease-bullet">• पत्तियों पर पानी से भरे धब्बे</div><div class="disease-bullet">• पत्तियों के नीचे सफेद फफूंद</div><div class="disease-bullet">• तेजी से मुरझाना</div><div class="disease-section">✅ उपचार:</div><div class="disease-bullet">• संक्रमित पौधों को हटाकर जलाएं</div><div class="disease-bullet">• हर 7 दिन में मैनकोज़ेब (0.25%) छिड़कें</div><div class="disease-bullet">• जैविक विकल्प के लिए लहसुन-मिर्च का छिड़काव करें</div><div class="disease-section">🛡 रोकथाम:</div><div class="disease-bullet">• प्रतिरोधी किस्में लगाएं</div><div class="disease-bullet">• ड्रिप सिंचाई का उपयोग करें</div><div class="disease-bullet">• हर साल फसल बदलें</div></div>"""
+    },
+    "default": {
+        "en": "I'm still learning about this. Can you describe symptoms or ask something else?",
+        "hi": "मैं इसके बारे में अभी सीख रहा हूँ। क्या आप लक्षण बता सकते हैं या कुछ और पूछ सकते हैं?"
+    }
+}
+
+
+# names beyond those derived from the class labels themselves; a name listed
+# under several classes is narrowed down by the crop mentioned with it
+DISEASE_SYNONYMS = {
+    "Apple___Apple_scab": ["scab on apple", "सेब की पपड़ी", "सेब का स्कैब"],
+    "Apple___Black_rot": ["apple frogeye leaf spot", "सेब का काला सड़न"],
+    "Apple___Cedar_apple_rust": ["apple rust", "सेब का रतुआ"],
+    "Cherry_(including_sour)___Powdery_mildew": ["चूर्णिल आसिता", "cherry mildew", "चेरी की चूर्णिल आसिता"],
+    "Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot": ["grey leaf spot", "मक्का का धूसर पत्ती धब्बा"],
+    "Corn_(maize)___Common_rust_": ["maize rust", "corn rust", "मक्का का रतुआ"],
+    "Corn_(maize)___Northern_Leaf_Blight": ["turcicum leaf blight", "मक्का का झुलसा"],
+    "Grape___Black_rot": ["grape rot", "अंगूर का काला सड़न"],
+    "Grape___Esca_(Black_Measles)": ["grape measles", "अंगूर का एस्का"],
+    "Grape___Leaf_blight_(Isariopsis_Leaf_Spot)": ["grape leaf spot", "अंगूर की पत्ती झुलसा"],
+    "Orange___Haunglongbing_(Citrus_greening)": ["huanglongbing", "hlb", "citrus greening", "greening disease", "संतरे का ग्रीनिंग रोग", "सिट्रस ग्रीनिंग"],
+    "Peach___Bacterial_spot": ["peach leaf spot", "आड़ू का जीवाणु धब्बा"],
+    "Pepper,_bell___Bacterial_spot": ["capsicum bacterial spot", "शिमला मिर्च का जीवाणु धब्बा"],
+    "Potato___Early_blight": ["अगेती झुलसा", "potato alternaria", "आलू का अगेती झुलसा", "आलू अगेती झुलसा"],
+    "Potato___Late_blight": ["पछेती झुलसा", "potato phytophthora", "आलू का पछेती झुलसा", "आलू पछेती झुलसा"],
+    "Squash___Powdery_mildew": ["चूर्णिल आसिता", "pumpkin powdery mildew", "कद्दू की चूर्णिल आसिता"],
+    "Strawberry___Leaf_scorch": ["strawberry scorch", "स्ट्रॉबेरी लीफ स्कॉर्च", "स्ट्रॉबेरी पत्ती झुलसा"],
+    "Tomato___Bacterial_spot": ["tomato leaf spot", "टमाटर का जीवाणु धब्बा"],
+    "Tomato___Early_blight": ["अगेती झुलसा", "tomato alternaria", "टमाटर का अगेती झुलसा", "टमाटर अगेती झुलसा"],
+    "Tomato___Late_blight": ["पछेती झुलसा", "tomato phytophthora", "टमाटर लेट ब्लाइट", "टमाटर का पछेती झुलसा", "टमाटर पछेती झुलसा"],
+    "Tomato___Leaf_Mold": ["tomato leaf mould", "टमाटर की पत्ती फफूंद"],
+    "Tomato___Septoria_leaf_spot": ["septoria", "टमाटर का सेप्टोरिया"],
+    "Tomato___Spider_mites Two-spotted_spider_mite": ["spider mite", "red spider mite", "मकड़ी घुन", "लाल मकड़ी"],
+    "Tomato___Target_Spot": ["tomato target spot", "टमाटर का लक्ष्य धब्बा"],
+    "Tomato___Tomato_Yellow_Leaf_Curl_Virus": ["tylcv", "leaf curl", "yellow leaf curl", "पत्ती मरोड़", "टमाटर का पत्ती मरोड़ रोग"],
+    "Tomato___Tomato_mosaic_virus": ["tomv", "mosaic virus", "टमाटर मोज़ेक", "टमाटर का मोज़ेक वायरस"],
+}
+
+CROP_SYNONYMS = {
+    "Apple": ["सेब"],
+    "Blueberry": ["ब्लूबेरी"],
+    "Cherry_(including_sour)": ["sour cherry", "चेरी"],
+    "Corn_(maize)": ["maize", "मक्का"],
+    "Grape": ["grapes", "अंगूर"],
+    "Orange": ["citrus", "संतरा", "संतरे"],
+    "Peach": ["आड़ू"],
+    "Pepper,_bell": ["bell pepper", "capsicum", "शिमला मिर्च"],
+    "Potato": ["potatoes", "आलू"],
+    "Raspberry": ["रास्पबेरी"],
+    "Soybean": ["soya", "सोयाबीन"],
+    "Squash": ["pumpkin", "कद्दू"],
+    "Strawberry": ["strawberries", "स्ट्रॉबेरी"],
+    "Tomato": ["tomatoes", "टमाटर"],
+}
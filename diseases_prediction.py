@@ -1,42 +1,463 @@
-import numpy as np
+"""
+Plant disease inference shared by every page of the app.
+
+get_disease_service() returns one DiseaseService per process: the model is
+loaded lazily (or in the background with warmup_async()), traced once with a
+dummy batch so the first real diagnosis does not pay for graph building, and
+then reused by pages/Diseases.py and the chat's photo upload alike.
+With a disease_cascade.json from build_disease_cascade.py the service is a
+DiseaseCascade: a fast model answers confident cases, the rest go to the full one.
+"""
+
+import io
+import os
 import json
-import tensorflow as tf
+import threading
+import time
+import numpy as np
 from pathlib import Path
-from tensorflow.keras.preprocessing import image
 
-DISEASE_MODEL_PATH = "plant_disease_model.h5"
+# plant_disease_mobilenet.keras (train_disease_model.py --arch mobilenet) can be served instead
+DISEASE_MODEL_PATH = os.environ.get("DISEASE_MODEL_PATH", "plant_disease_model.h5")
 LABELS_PATH = "class_labels.json"
+FALLBACK_LABELS = ["Healthy", "Powdery", "Rust"]
+DEFAULT_INPUT_SIZE = (150, 150)
+# written by build_disease_cascade.py; when present the service answers easy images with the fast model
+CASCADE_PATH = os.environ.get("DISEASE_CASCADE_PATH", "disease_cascade.json")
 
-# Load CNN model
-try:
-    disease_model = tf.keras.models.load_model(DISEASE_MODEL_PATH)
-except Exception as e:
-    print(f"⚠️ Could not load disease model: {e}")
-    disease_model = None
+# tiled mode: the photo is scaled so TILE_GRID model-sized tiles span its shorter side
+TILE_GRID = 3
+TILE_OVERLAP = 0.5
+MIN_TILE_LEAF = 0.3
+MAX_TILES = 48
+TILE_BATCH = 16
+EARLY_EXIT_CONFIDENCE = 0.9
 
-# Load class labels
-if Path(LABELS_PATH).exists():
-    with open(LABELS_PATH, "r") as f:
-        class_labels = json.load(f)
-else:
-    class_labels = ["Healthy", "Powdery", "Rust"]  # fallback classes
+
+def rss_mb():
+    """
+    Resident memory of this process in MB (Linux /proc, else peak RSS).
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
 
 
-def predict_disease(img_path):
+def tile_views(rgb, tile, overlap=TILE_OVERLAP):
     """
-    Predict plant disease from an image.
-    Returns predicted class and probability distribution.
+    Every tile-sized window of an (H, W, 3) array as a zero-copy strided view of
+    shape (H - tile_h + 1, W - tile_w + 1, tile_h, tile_w, 3), plus the top and
+    left offsets of the overlapping tiles to take from it. The last row and
+    column of tiles end at the bottom and right edges, so no pixel is left out.
+    """
+    th, tw = tile
+    height, width = rgb.shape[:2]
+    sy, sx = max(1, int(th * (1 - overlap))), max(1, int(tw * (1 - overlap)))
+    windows = np.lib.stride_tricks.sliding_window_view(rgb, (th, tw, 3))[:, :, 0]
+    ys = np.union1d(np.arange(0, height - th + 1, sy), [height - th])
+    xs = np.union1d(np.arange(0, width - tw + 1, sx), [width - tw])
+    return windows, ys, xs
+
+
+def window_means(mask, ys, xs, tile):
+    """
+    Mean of a 2-D mask over every tile, from one integral image.
+    """
+    th, tw = tile
+    ii = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1))
+    ii[1:, 1:] = mask.cumsum(axis=0).cumsum(axis=1)
+    y0, x0 = ys[:, None], xs[None, :]
+    return (ii[y0 + th, x0 + tw] - ii[y0, x0 + tw] - ii[y0 + th, x0] + ii[y0, x0]) / (th * tw)
+
+
+def open_image(source):
+    """
+    Image path, bytes, file-like or PIL image -> RGB PIL image.
+    """
+    from PIL import Image
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    img = source if isinstance(source, Image.Image) else Image.open(source)
+    return img.convert("RGB")
+
+
+class DiseaseService:
+    """
+    One warm disease model. Thread-safe: loading happens once under a lock
+    and inference runs through a single traced tf.function.
+    """
+
+    def __init__(self, model_path=DISEASE_MODEL_PATH, labels_path=LABELS_PATH):
+        self.model_path = model_path
+        self.labels_path = labels_path
+        self.model = None
+        self.error = None
+        self.input_size = DEFAULT_INPUT_SIZE
+        self.class_labels = self._load_labels()
+        self._infer = None
+        self._lock = threading.Lock()
+        self._warm_thread = None
+        self.stats = {"load_s": None, "warmup_s": None, "rss_before_mb": None, "rss_after_mb": None,
+                      "first_diagnosis_s": None, "predictions": 0, "predict_s": 0.0}
+
+    def _load_labels(self):
+        if Path(self.labels_path).exists():
+            with open(self.labels_path, "r") as f:
+                return json.load(f)
+        return FALLBACK_LABELS
+
+    @property
+    def ready(self):
+        return self._infer is not None
+
+    def load(self):
+        """
+        Load and warm up the model once; later calls return immediately.
+        """
+        if self._infer is not None or self.error is not None:
+            return self
+        with self._lock:
+            if self._infer is not None or self.error is not None:
+                return self
+            self.stats["rss_before_mb"] = rss_mb()
+            start = time.perf_counter()
+            try:
+                if str(self.model_path).endswith(".tflite"):
+                    model, infer = self._load_tflite()
+                else:
+                    model, infer = self._load_keras()
+            except Exception as e:
+                print(f"⚠️ Could not load disease model: {e}")
+                self.error = e
+                return self
+            self.stats["load_s"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            infer(np.zeros((1,) + self.input_size + (3,), dtype=np.float32))
+            self.stats["warmup_s"] = time.perf_counter() - start
+            self.stats["rss_after_mb"] = rss_mb()
+            self.model = model
+            self._infer = infer
+        return self
+
+    def _load_keras(self):
+        import tensorflow as tf
+
+        model = tf.keras.models.load_model(self.model_path, compile=False)
+        # Input resolution is read from the model so other architectures can be served
+        self.input_size = tuple(int(d) for d in model.input_shape[1:3])
+        infer = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec((None,) + self.input_size + (3,), tf.float32)],
+        )
+        return model, lambda x: infer(x).numpy()
+
+    def _load_tflite(self):
+        """
+        Interpreter for a converted (e.g. quantized) model; float input and output,
+        resized to the batch on demand. An interpreter is not thread-safe, so calls are serialized.
+        """
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ModuleNotFoundError:
+            # tf.lite.Interpreter is deprecated in favour of LiteRT but still ships with TensorFlow
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        interpreter = Interpreter(model_path=str(self.model_path))
+        interpreter.allocate_tensors()
+        input_detail = interpreter.get_input_details()[0]
+        output_index = interpreter.get_output_details()[0]["index"]
+        self.input_size = tuple(int(d) for d in input_detail["shape"][1:3])
+        lock = threading.Lock()
+
+        def infer(x):
+            with lock:
+                if interpreter.get_input_details()[0]["shape"][0] != len(x):
+                    interpreter.resize_tensor_input(input_detail["index"], [len(x), *self.input_size, 3])
+                    interpreter.allocate_tensors()
+                interpreter.set_tensor(input_detail["index"], np.asarray(x, dtype=np.float32))
+                interpreter.invoke()
+                return interpreter.get_tensor(output_index).copy()
+
+        return interpreter, infer
+
+    def warmup_async(self):
+        """
+        Start loading in a background thread (no-op if already started).
+        """
+        with self._lock:
+            if self._warm_thread is None and not self.ready:
+                self._warm_thread = threading.Thread(target=self.load, name="disease-warmup", daemon=True)
+                self._warm_thread.start()
+        return self
+
+    def preprocess(self, source):
+        """
+        Image path, bytes, file-like or PIL image -> float32 array scaled to [0, 1].
+        """
+        from PIL import Image
+
+        # nearest resize matches keras.preprocessing.image.load_img used in training
+        img = open_image(source).resize(self.input_size[::-1], Image.NEAREST)
+        return np.asarray(img, dtype=np.float32) / 255.0
+
+    def predict_batch(self, sources):
+        """
+        Probabilities for several images in one forward pass, shape (n, classes).
+        """
+        start = time.perf_counter()
+        self.load()
+        if self._infer is None:
+            raise RuntimeError("Disease detection model not loaded.")
+        probs = self.predict_array(np.stack([self.preprocess(s) for s in sources]))
+        if self.stats["first_diagnosis_s"] is None:
+            self.stats["first_diagnosis_s"] = time.perf_counter() - start
+        return probs
+
+    def predict_array(self, batch):
+        """
+        Probabilities for an already preprocessed float batch at input_size.
+        """
+        self.load()
+        if self._infer is None:
+            raise RuntimeError("Disease detection model not loaded.")
+        start = time.perf_counter()
+        probs = self._infer(batch)
+        self.stats["predict_s"] += time.perf_counter() - start
+        self.stats["predictions"] += len(batch)
+        return probs
+
+    def inference_ms(self):
+        """
+        Mean model time per image so far, or None before the first prediction.
+        """
+        n = self.stats["predictions"]
+        return self.stats["predict_s"] / n * 1000 if n else None
+
+    def diagnose(self, source):
+        """
+        (class label, confidence in %) for one image.
+        """
+        probs = self.predict_batch([source])[0]
+        index = int(np.argmax(probs))
+        return self.class_labels[index], float(probs[index]) * 100
+
+    def predict_tiled(self, source, grid=TILE_GRID, max_tiles=MAX_TILES, batch_size=TILE_BATCH,
+                      early_exit=EARLY_EXIT_CONFIDENCE):
+        """
+        Diagnose a high-resolution photo from overlapping model-sized tiles, so
+        small lesions are not averaged away by squashing the whole frame.
+
+        Tiles that are mostly leaf are scored in batches, leafiest first,
+        together with the whole-image view; scoring stops once a tile is
+        diseased with at least early_exit confidence. Disease classes take
+        their maximum over the tiles (one spot is enough), healthy classes
+        the mean. Returns a dict with probs, label, confidence (%), tiles
+        scored / available, whether it exited early and the box (x, y, w, h)
+        of the most diseased tile in original pixels.
+        """
+        from PIL import Image
+        from image_quality import leaf_mask
+
+        self.load()
+        if self._infer is None:
+            raise RuntimeError("Disease detection model not loaded.")
+        th, tw = self.input_size
+        if not isinstance(source, Image.Image):
+            source = Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+        width, height = source.size
+        scale = grid * min(th, tw) / min(width, height)
+        work_size = (max(tw, round(width * scale)), max(th, round(height * scale)))
+        # JPEG: decode straight at 1/2 .. 1/8 scale instead of the full frame (no-op otherwise)
+        source.draft("RGB", work_size)
+        img = open_image(source)
+        work = np.asarray(img.resize(work_size, Image.BILINEAR))
+        windows, ys, xs = tile_views(work, (th, tw))
+        leaf = window_means(leaf_mask(work), ys, xs, (th, tw))
+        order = np.argsort(-leaf, axis=None, kind="stable")
+        order = order[leaf.ravel()[order] >= MIN_TILE_LEAF][:max_tiles]
+        rows, cols = np.unravel_index(order, leaf.shape)
+
+        diseased = np.array(["healthy" not in label.lower() for label in self.class_labels])
+        whole = self.preprocess(img)[None]
+        scored, exited = [], False
+        for start in range(0, max(len(order), 1), batch_size):
+            r, c = rows[start:start + batch_size], cols[start:start + batch_size]
+            # the only copy: the tiles of this batch, gathered from the strided view
+            batch = windows[ys[r], xs[c]].astype(np.float32) / 255.0
+            scored.append(self.predict_array(np.concatenate([whole, batch]) if start == 0 else batch))
+            if diseased.any() and (scored[-1][:, diseased].max(axis=1) >= early_exit).any():
+                exited = start + batch_size < len(order)
+                break
+        # row 0 is the whole image, the rest are tiles in `order`
+        scored = np.concatenate(scored)
+        probs = np.where(diseased, scored.max(axis=0), scored.mean(axis=0))
+        probs = probs / probs.sum()
+        index = int(np.argmax(probs))
+
+        box = None
+        if len(scored) > 1 and diseased.any():
+            best = int(np.argmax(scored[1:, diseased].max(axis=1)))
+            box = (round(xs[cols[best]] / scale), round(ys[rows[best]] / scale), round(tw / scale), round(th / scale))
+        return {
+            "probs": probs,
+            "label": self.class_labels[index],
+            "confidence": float(probs[index]) * 100,
+            "tiles": len(scored) - 1,
+            "tiles_available": int(leaf.size),
+            "early_exit": exited,
+            "box": box,
+        }
+
+
+class DiseaseCascade:
+    """
+    Two-stage diagnosis with the DiseaseService interface: every image goes
+    through the fast model, and only those whose top-1 confidence is below
+    the calibrated threshold are escalated, together, to the full model.
+    """
+
+    def __init__(self, fast, full, threshold):
+        self.fast = fast
+        self.full = full
+        self.threshold = float(threshold)
+        self._lock = threading.Lock()
+        self._warm_thread = None
+        self.stats = {"images": 0, "escalated": 0, "fast_s": 0.0, "full_s": 0.0}
+
+    @property
+    def class_labels(self):
+        return self.full.class_labels
+
+    @property
+    def input_size(self):
+        return self.full.input_size
+
+    @property
+    def error(self):
+        return self.full.error
+
+    @property
+    def ready(self):
+        # a fast model that failed to load only means every image is escalated
+        return self.full.ready and (self.fast.ready or self.fast.error is not None)
+
+    def load(self):
+        self.full.load()
+        self.fast.load()
+        return self
+
+    def warmup_async(self):
+        with self._lock:
+            if self._warm_thread is None and not self.ready:
+                self._warm_thread = threading.Thread(target=self.load, name="disease-warmup", daemon=True)
+                self._warm_thread.start()
+        return self
+
+    def predict_batch(self, sources):
+        """
+        Probabilities for several images, shape (n, classes); escalated rows come from the full model.
+        """
+        self.load()
+        # decode once; each stage resizes to its own input size
+        images = [open_image(s) for s in sources]
+        escalate = np.ones(len(images), dtype=bool)
+        probs = None
+        if self.fast.ready:
+            start = time.perf_counter()
+            probs = self.fast.predict_batch(images)
+            self.stats["fast_s"] += time.perf_counter() - start
+            escalate = probs.max(axis=1) < self.threshold
+        if escalate.any():
+            start = time.perf_counter()
+            full_probs = self.full.predict_batch([img for img, e in zip(images, escalate) if e])
+            self.stats["full_s"] += time.perf_counter() - start
+            if probs is None:
+                probs = full_probs
+            else:
+                probs[escalate] = full_probs
+        with self._lock:
+            self.stats["images"] += len(images)
+            self.stats["escalated"] += int(escalate.sum())
+        return probs
+
+    def diagnose(self, source):
+        probs = self.predict_batch([source])[0]
+        index = int(np.argmax(probs))
+        return self.class_labels[index], float(probs[index]) * 100
+
+    def predict_tiled(self, source, **kwargs):
+        # tiling is for small lesions, where the full model's accuracy matters most
+        return self.full.predict_tiled(source, **kwargs)
+
+    def inference_ms(self):
+        images = self.stats["images"]
+        return (self.stats["fast_s"] + self.stats["full_s"]) / images * 1000 if images else None
+
+    def report(self):
+        """
+        Escalation rate and latency per image so far. The full model's cost for
+        the images the fast model answered is estimated from the escalated ones.
+        """
+        images, escalated = self.stats["images"], self.stats["escalated"]
+        if not images:
+            return {"images": 0}
+        fast_ms = self.stats["fast_s"] / images * 1000
+        full_ms = self.stats["full_s"] / escalated * 1000 if escalated else float("nan")
+        cascade_ms = (self.stats["fast_s"] + self.stats["full_s"]) / images * 1000
+        return {
+            "images": images,
+            "escalation_rate": escalated / images,
+            "fast_ms_per_image": fast_ms,
+            "full_ms_per_image": full_ms,
+            "cascade_ms_per_image": cascade_ms,
+            "saved_ms_per_image": full_ms - cascade_ms,
+        }
+
+
+def load_cascade(path=CASCADE_PATH, model_path=DISEASE_MODEL_PATH, labels_path=LABELS_PATH):
     """
-    if disease_model is None:
-        raise RuntimeError("Disease detection model not loaded.")
+    DiseaseCascade from build_disease_cascade.py's config, or None when there is
+    none or it was calibrated against a different full model.
+    """
+    if not Path(path).exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if Path(config["full_model"]).resolve() != Path(model_path).resolve():
+        print(f"⚠️ {path} was calibrated for {config['full_model']}, not {model_path}; cascade disabled")
+        return None
+    return DiseaseCascade(DiseaseService(config["fast_model"], labels_path),
+                          DiseaseService(model_path, labels_path), config["threshold"])
+
+
+_service = None
+_service_lock = threading.Lock()
 
-    img = image.load_img(img_path, target_size=(150, 150))
-    img_array = image.img_to_array(img) / 255.0
-    img_array = np.expand_dims(img_array, axis=0)
 
-    prediction = disease_model.predict(img_array)
-    predicted_index = np.argmax(prediction)
-    predicted_class = class_labels[predicted_index]
-    prediction_probs = float(prediction[0][predicted_index]) * 100
+def get_disease_service():
+    """
+    The process-wide DiseaseService (or DiseaseCascade) shared by all pages.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = load_cascade() or DiseaseService()
+        return _service
 
-    return predicted_class, prediction_probs
+
+def predict_disease(img_path, tiled=False):
+    """
+    Predict plant disease from an image.
+    Returns predicted class and probability.
+    With tiled=True high-resolution photos are scanned in tiles (predict_tiled).
+    """
+    if tiled:
+        result = get_disease_service().predict_tiled(img_path)
+        return result["label"], result["confidence"]
+    return get_disease_service().diagnose(img_path)
@@ -0,0 +1,84 @@
+# evaluate_param_extractor.py
+"""
+Measure the local parameter extractor on a labelled corpus.
+
+Each corpus line is {"text": ..., "expected": {"N": 90.0, ...}}. Messages the
+extractor is confident about are answered without an LLM call; the others
+would go to the LLM. Reports accuracy on the confident messages and the share
+of LLM extraction calls saved.
+
+Usage:
+  python evaluate_param_extractor.py [param_extraction_corpus.jsonl] [--threshold 0.8]
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+
+from param_extractor import LOCAL_CONFIDENCE_THRESHOLD, extract_local
+
+CORPUS_PATH = "param_extraction_corpus.jsonl"
+TOLERANCE = 0.01
+
+
+def load_corpus(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def matches(found, expected):
+    return found.keys() == expected.keys() and all(
+        abs(found[k] - expected[k]) <= TOLERANCE for k in expected
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local parameter extractor.")
+    parser.add_argument("corpus", nargs="?", default=CORPUS_PATH)
+    parser.add_argument("--threshold", type=float, default=LOCAL_CONFIDENCE_THRESHOLD)
+    parser.add_argument("--show-errors", action="store_true")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    confident = exact_confident = exact_all = 0
+    field_total, field_correct = Counter(), Counter()
+    errors = []
+
+    start = time.perf_counter()
+    results = [extract_local(row["text"]) for row in corpus]
+    elapsed = time.perf_counter() - start
+
+    for row, (found, confidence) in zip(corpus, results):
+        expected = row["expected"]
+        ok = matches(found, expected)
+        exact_all += ok
+        if confidence < args.threshold:
+            continue
+        confident += 1
+        exact_confident += ok
+        if not ok:
+            errors.append((row["text"], expected, found, confidence))
+        for key in expected.keys() | found.keys():
+            field_total[key] += 1
+            if key in expected and key in found and abs(found[key] - expected[key]) <= TOLERANCE:
+                field_correct[key] += 1
+
+    n = len(corpus)
+    print(f"Messages:                  {n}")
+    print(f"Local extraction:          {elapsed / n * 1e6:.0f} µs per message")
+    print(f"LLM calls saved:           {confident}/{n} ({confident / n:.0%}) at confidence >= {args.threshold}")
+    if confident:
+        print(f"Exact match (confident):   {exact_confident}/{confident} ({exact_confident / confident:.0%})")
+    print(f"Exact match (all, no LLM): {exact_all}/{n} ({exact_all / n:.0%})")
+    print("Per-field accuracy (confident):")
+    for key in sorted(field_total):
+        print(f"  {key:<12} {field_correct[key]}/{field_total[key]}")
+
+    if args.show_errors:
+        for text, expected, found, confidence in errors:
+            print(f"\n✗ {text!r} (confidence {confidence})\n  expected {expected}\n  found    {found}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Local stand-in for the Gemini API that streams canned answers.
+
+Speaks the protocol of llm_client.HTTPStreamClient, so AgriBot can be run and
+timed without network access or an API key:
+  python fake_llm_server.py --port 8765 --ttft 0.3 --delay 0.05
+  AGRIBOT_LLM_URL=http://127.0.0.1:8765 streamlit run app.py
+"""
+
+import argparse
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_ANSWER = (
+    "• Check the leaves every few days for early signs of pests 🌿\n"
+    "• Water early in the morning and avoid wetting the foliage 💧\n"
+    "• Use neem oil spray (5 ml per litre) as a safe first treatment\n"
+    "• Rotate crops every season to keep the soil healthy 🌾"
+)
+
+
+def fake_answer(prompt):
+    """
+    Pick a reply for a prompt: an empty JSON object for parameter extraction,
+    otherwise the canned farming answer.
+    """
+    if "Extract ONLY numeric values" in prompt:
+        return "{}"
+    return CANNED_ANSWER
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    # set by main()
+    ttft = 0.3
+    delay = 0.05
+    calls = 0
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        FakeLLMHandler.calls += 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        time.sleep(self.ttft)
+        # word-sized chunks, the way a real model streams tokens
+        for chunk in re.findall(r"\S+\s*", fake_answer(payload.get("prompt", ""))):
+            self.wfile.write((json.dumps({"text": chunk}) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.delay)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_error(404)
+            return
+        body = json.dumps({"status": "ok", "calls": FakeLLMHandler.calls}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake streaming LLM server for AgriBot.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.3, help="seconds before the first chunk")
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds between chunks")
+    args = parser.parse_args()
+
+    FakeLLMHandler.ttft = args.ttft
+    FakeLLMHandler.delay = args.delay
+    server = ThreadingHTTPServer((args.host, args.port), FakeLLMHandler)
+    print(f"Fake LLM streaming on http://{args.host}:{args.port}/generate")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Read-only, memory-mapped copy of the crop recommendation forest.
+
+The joblib Pipeline is a few hundred Python tree objects: every worker that
+unpickles it gets a private copy, so memory grows with the worker count.
+export_flat_forest() writes the trees as flat node arrays (.npy) plus the
+scaler parameters; load_flat_forest() maps them with mmap_mode="r", so all
+processes serving the model share the same page-cache pages.
+
+FlatForest exposes classes_ and predict_proba(), so it can be passed to
+crop_predictor.recommend_topk / recommend_topk_batch in place of the Pipeline.
+
+Usage:
+  python flat_forest.py [export_model/crop_recommender_rf.joblib] [--out export_model/crop_recommender_flat]
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from crop_predictor import FEATURES
+
+FLAT_DIR = Path("export_model") / "crop_recommender_flat"
+ARRAYS = ["feature", "threshold", "left", "right", "leaf", "value", "node_value", "roots"]
+
+
+def _split_pipeline(pipe):
+    """
+    (StandardScaler, RandomForestClassifier) from the training pipeline.
+    """
+    try:
+        prep, rf = pipe.named_steps["prep"], pipe.named_steps["model"]
+        scaler = prep.named_transformers_["num"]
+    except (AttributeError, KeyError):
+        raise ValueError("expected Pipeline([('prep', ColumnTransformer([('num', StandardScaler(), ...)])), ('model', ...)])")
+    columns = list(prep.transformers_[0][2])
+    if columns != FEATURES:
+        raise ValueError(f"pipeline features {columns} do not match {FEATURES}")
+    return scaler, rf
+
+
+def flatten_forest(pipe):
+    """
+    In-memory FlatForest for a fitted pipeline (export_flat_forest writes the same arrays).
+    """
+    scaler, rf = _split_pipeline(pipe)
+    feature, threshold, left, right, leaf, value, node_value, roots = [], [], [], [], [], [], [], []
+    offset, n_leaves, max_depth = 0, 0, 0
+    for est in rf.estimators_:
+        tree = est.tree_
+        is_leaf = tree.children_left < 0
+        node_ids = np.arange(tree.node_count)
+        roots.append(offset)
+        feature.append(np.where(is_leaf, -1, tree.feature))
+        threshold.append(tree.threshold)
+        # leaves point at themselves (and have feature -1), so walks stop there
+        left.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        right.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        leaf_rows = np.full(tree.node_count, -1)
+        leaf_rows[is_leaf] = np.arange(is_leaf.sum()) + n_leaves
+        leaf.append(leaf_rows)
+        counts = tree.value[:, 0, :]
+        fractions = counts / counts.sum(axis=1, keepdims=True)
+        value.append(fractions[is_leaf])
+        # class distribution at every node, for path attributions (crop_predictor.ForestExplainer)
+        node_value.append(fractions)
+        offset += tree.node_count
+        n_leaves += int(is_leaf.sum())
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "leaf": np.concatenate(leaf).astype(np.int32),
+        "value": np.concatenate(value).astype(np.float64),
+        "node_value": np.concatenate(node_value).astype(np.float32),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+    meta = {
+        "features": FEATURES,
+        "classes": rf.classes_.tolist(),
+        "scaler_mean": scaler.mean_.tolist(),
+        "scaler_scale": scaler.scale_.tolist(),
+        "n_trees": len(rf.estimators_),
+        "n_nodes": offset,
+        "n_leaves": n_leaves,
+        "max_depth": int(max_depth),
+    }
+    return FlatForest(arrays, meta)
+
+
+def export_flat_forest(pipe, out_dir=FLAT_DIR):
+    """
+    Write the fitted pipeline as flat arrays in out_dir. Returns out_dir.
+    """
+    forest = flatten_forest(pipe)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name in ARRAYS:
+        np.save(out_dir / f"{name}.npy", getattr(forest, name))
+    (out_dir / "meta.json").write_text(json.dumps(forest.meta, indent=2), encoding="utf-8")
+    return out_dir
+
+
+class FlatForest:
+    """
+    Random forest over flat node arrays; predictions match the Pipeline's predict_proba.
+    """
+
+    def __init__(self, arrays, meta):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.classes_ = np.asarray(meta["classes"], dtype=object)
+        self.features = meta["features"]
+        self.max_depth = meta["max_depth"]
+        self._mean = np.asarray(meta["scaler_mean"], dtype=np.float64)
+        self._scale = np.asarray(meta["scaler_scale"], dtype=np.float64)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+    def transform(self, X):
+        """
+        Scaled float32 features, as the trees see them inside the Pipeline.
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features].to_numpy(dtype=np.float64)
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        return ((X - self._mean) / self._scale).astype(np.float32)
+
+    def apply(self, X):
+        """
+        Leaf node id per (sample, tree), shape (n_samples, n_trees).
+        """
+        Xs = self.transform(X)
+        n_trees = self.n_trees
+        nodes = np.tile(self.roots, len(Xs))
+        # (sample, tree) pairs still above their leaf; each step moves them one level down
+        active = np.arange(len(nodes))
+        while len(active):
+            current = nodes[active]
+            feat = self.feature[current]
+            internal = feat >= 0
+            active, current, feat = active[internal], current[internal], feat[internal]
+            go_left = Xs[active // n_trees, feat] <= self.threshold[current]
+            nodes[active] = np.where(go_left, self.left[current], self.right[current])
+        return nodes.reshape(len(Xs), n_trees)
+
+    def predict_proba(self, X, chunk_size=256):
+        leaves = self.leaf[self.apply(X)]
+        proba = np.empty((len(leaves), len(self.classes_)))
+        # averaging in row chunks keeps the (rows x trees x classes) gather small
+        for start in range(0, len(leaves), chunk_size):
+            proba[start:start + chunk_size] = self.value[leaves[start:start + chunk_size]].mean(axis=1)
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def split_values(self, feature):
+        """
+        Sorted unique split thresholds of one feature, in raw input units.
+        """
+        j = self.features.index(feature)
+        scaled = np.unique(self.threshold[self.feature == j])
+        return scaled * self._scale[j] + self._mean[j]
+
+    def touch(self):
+        """
+        Read every page once so a pre-fork parent brings the arrays into the page cache.
+        """
+        return float(sum(float(getattr(self, name).sum()) for name in ARRAYS))
+
+
+def load_flat_forest(path=FLAT_DIR, mmap=True):
+    """
+    Load an exported forest; with mmap=True the arrays stay file-backed and shared.
+    """
+    path = Path(path)
+    meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    mode = "r" if mmap else None
+    arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mode) for name in ARRAYS}
+    return FlatForest(arrays, meta)
+
+
+def main():
+    from crop_predictor import load_model
+
+    parser = argparse.ArgumentParser(description="Export the crop forest as memory-mappable arrays.")
+    parser.add_argument("model", nargs="?", default="export_model/crop_recommender_rf.joblib")
+    parser.add_argument("--out", default=FLAT_DIR.as_posix())
+    parser.add_argument("--check", default="Crop_recommendation.csv", help="CSV to compare predictions on")
+    args = parser.parse_args()
+
+    pipe = load_model(args.model)
+    out_dir = export_flat_forest(pipe, args.out)
+    forest = load_flat_forest(out_dir)
+    print(f"Saved {forest.n_trees} trees, {forest.meta['n_nodes']} nodes "
+          f"({forest.nbytes / 2**20:.1f} MB) to {out_dir}")
+
+    if Path(args.check).exists():
+        X = pd.read_csv(args.check)[FEATURES]
+        diff = np.abs(forest.predict_proba(X) - pipe.predict_proba(X)).max()
+        agree = (forest.predict(X) == pipe.predict(X)).mean()
+        print(f"Max probability difference vs pipeline: {diff:.2e}, top-1 agreement {agree:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Cheap quality checks for leaf photos before they reach the disease model.
+
+Blurry, dark, washed-out or leafless captures still get a confident label
+from the CNN. QualityGate looks at a small downscaled copy of the photo
+(JPEGs are decoded at reduced scale, so a 12-megapixel capture costs a few
+milliseconds) and measures:
+
+  sharpness    variance of the Laplacian of the grey image
+  exposure     mean brightness and the share of crushed / blown-out pixels
+  leaf pixels  share of plant-coloured pixels: saturated, with blue the weakest
+               channel, which covers green tissue and yellow, brown or orange lesions
+
+Photos that fail are rejected (ImageQualityError) or returned with their
+problems for the caller to flag, and the gate counts how many model
+invocations it saved.
+
+Usage:
+  python image_quality.py leaf.jpg [more.jpg ...]
+"""
+
+import argparse
+import io
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from diseases_prediction import open_image
+
+QUALITY_SIZE = 256
+# thresholds for the QUALITY_SIZE copy; downscaling sharpens, so they do not carry over to full resolution
+MIN_SHARPNESS = 40.0
+MIN_BRIGHTNESS = 40.0
+MAX_BRIGHTNESS = 225.0
+MAX_CLIPPED = 0.5
+DARK_LEVEL, BRIGHT_LEVEL = 20, 240
+MIN_LEAF_RATIO = 0.15
+LEAF_CHROMA = 30
+
+PROBLEMS = ("blurry", "dark", "overexposed", "no_leaf")
+
+
+class ImageQualityError(ValueError):
+    """
+    Raised for a photo that should not be diagnosed; .report holds the measurements.
+    """
+
+    def __init__(self, report):
+        super().__init__(f"image rejected: {', '.join(report['problems'])}")
+        self.report = report
+
+
+def downscale(source, size=QUALITY_SIZE):
+    """
+    RGB uint8 array whose longer side is at most size.
+    """
+    from PIL import Image
+
+    if isinstance(source, Image.Image):
+        img = source
+    else:
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        img = Image.open(source)
+        # JPEG only: decode at 1/2, 1/4 or 1/8 scale instead of the full frame
+        img.draft("RGB", (size, size))
+    img = open_image(img)
+    img.thumbnail((size, size), Image.BILINEAR)
+    return np.asarray(img)
+
+
+def leaf_mask(rgb):
+    """
+    Plant-coloured pixels of an RGB array: saturated, with blue the weakest channel.
+    """
+    rgb = rgb.astype(np.int16)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    return (b <= np.minimum(r, g)) & (np.maximum(r, g) - b > LEAF_CHROMA)
+
+
+def measure(rgb):
+    """
+    Quality measurements of an RGB uint8 array.
+    """
+    rgb = rgb.astype(np.int32)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    grey = (r * 77 + g * 150 + b * 29) >> 8  # ITU-R 601 luma in integers
+
+    lap = (grey[:-2, 1:-1] + grey[2:, 1:-1] + grey[1:-1, :-2] + grey[1:-1, 2:]
+           - 4 * grey[1:-1, 1:-1]).astype(np.float32)
+    hist = np.bincount(grey.ravel(), minlength=256)
+    n = grey.size
+    return {
+        "sharpness": float(lap.var()),
+        "brightness": float(np.dot(hist, np.arange(256)) / n),
+        "dark_ratio": float(hist[:DARK_LEVEL + 1].sum() / n),
+        "bright_ratio": float(hist[BRIGHT_LEVEL:].sum() / n),
+        "leaf_ratio": float(leaf_mask(rgb).mean()),
+    }
+
+
+def problems(m):
+    found = []
+    if m["sharpness"] < MIN_SHARPNESS:
+        found.append("blurry")
+    if m["brightness"] < MIN_BRIGHTNESS or m["dark_ratio"] > MAX_CLIPPED:
+        found.append("dark")
+    if m["brightness"] > MAX_BRIGHTNESS or m["bright_ratio"] > MAX_CLIPPED:
+        found.append("overexposed")
+    if m["leaf_ratio"] < MIN_LEAF_RATIO:
+        found.append("no_leaf")
+    return found
+
+
+class QualityGate:
+    """
+    Thread-safe quality check with counters of what it let through and what it stopped.
+    """
+
+    def __init__(self, reject=PROBLEMS):
+        self.reject = tuple(reject)
+        self._lock = threading.Lock()
+        self.stats = {"checked": 0, "flagged": 0, "rejected": 0, "check_s": 0.0, "problems": Counter()}
+
+    def check(self, source, raise_on_reject=True):
+        """
+        Measurements, found problems and elapsed time for one photo. With
+        raise_on_reject a problem listed in self.reject raises ImageQualityError.
+        """
+        start = time.perf_counter()
+        m = measure(downscale(source))
+        report = {**m, "problems": problems(m), "check_ms": (time.perf_counter() - start) * 1000}
+        flagged = any(p in self.reject for p in report["problems"])
+        # only a raised photo is kept from the model; callers may still diagnose a flagged one
+        rejected = flagged and raise_on_reject
+        with self._lock:
+            self.stats["checked"] += 1
+            self.stats["flagged"] += int(flagged)
+            self.stats["rejected"] += int(rejected)
+            self.stats["check_s"] += report["check_ms"] / 1000
+            self.stats["problems"].update(report["problems"])
+        if rejected:
+            raise ImageQualityError(report)
+        return report
+
+    def report(self, inference_ms=None):
+        """
+        Counts so far; with the model's per-image latency also the inference time avoided.
+        """
+        checked, rejected = self.stats["checked"], self.stats["rejected"]
+        result = {
+            "checked": checked,
+            "flagged": self.stats["flagged"],
+            "rejected": rejected,
+            "rejection_rate": rejected / checked if checked else 0.0,
+            "check_ms_per_image": self.stats["check_s"] / checked * 1000 if checked else 0.0,
+            "problems": dict(self.stats["problems"]),
+        }
+        if inference_ms is not None:
+            result["avoided_inference_ms"] = rejected * inference_ms
+        return result
+
+
+_gate = None
+_gate_lock = threading.Lock()
+
+
+def get_quality_gate():
+    """
+    The process-wide QualityGate, so its counters cover every page.
+    """
+    global _gate
+    with _gate_lock:
+        if _gate is None:
+            _gate = QualityGate()
+        return _gate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check leaf photos before disease inference.")
+    parser.add_argument("images", nargs="+")
+    args = parser.parse_args()
+
+    gate = QualityGate()
+    print(f"{'image':<40} {'sharp':>8} {'bright':>7} {'dark':>6} {'blown':>6} {'leaf':>6} {'ms':>6}  problems")
+    for path in args.images:
+        r = gate.check(path, raise_on_reject=False)
+        print(f"{path[-40:]:<40} {r['sharpness']:>8.1f} {r['brightness']:>7.1f} {r['dark_ratio']:>6.2f} "
+              f"{r['bright_ratio']:>6.2f} {r['leaf_ratio']:>6.2f} {r['check_ms']:>6.1f}  "
+              f"{', '.join(r['problems']) or 'ok'}")
+    summary = gate.report()
+    print(f"\n{summary['flagged']}/{summary['checked']} would be rejected, "
+          f"{summary['check_ms_per_image']:.1f} ms per check")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Multi-keyword lookup for chat messages.
+
+KeywordIndex is an Aho-Corasick automaton: it is built once from any number
+of phrases and then finds all of them in a message in a single pass, so the
+cost per message does not grow with the size of the knowledge base.
+build_disease_index() indexes the PlantVillage classes, their English/Hindi
+synonyms and the remedy keys.
+"""
+
+import re
+from collections import deque, namedtuple
+
+Match = namedtuple("Match", ["start", "end", "phrase", "values"])
+
+_SEPARATORS = re.compile(r"[\s_]+")
+
+
+def normalize_keyword_text(text):
+    """
+    Lower case, underscores as spaces, single spaces.
+    """
+    return _SEPARATORS.sub(" ", text.lower()).strip()
+
+
+def _is_letter(ch):
+    # Devanagari vowel signs are not str.isalnum(), but are part of a word
+    return ch.isalnum() or "ऀ" <= ch <= "ॿ"
+
+
+class KeywordIndex:
+    """
+    Aho-Corasick automaton over normalised phrases. Every phrase carries one
+    or more values (e.g. class labels); matches only count on word boundaries.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._values = {}
+        self._built = False
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, phrase, value):
+        phrase = normalize_keyword_text(phrase)
+        if not phrase:
+            return
+        self._values.setdefault(phrase, [])
+        if value not in self._values[phrase]:
+            self._values[phrase].append(value)
+        state = 0
+        for ch in phrase:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        if phrase not in self._out[state]:
+            self._out[state].append(phrase)
+        self._built = False
+
+    def build(self):
+        """
+        Compute failure links (breadth first). Called automatically on first search.
+        """
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+        return self
+
+    def find_all(self, text, overlapping=False):
+        """
+        All phrases found in text as Match tuples, ordered by position.
+        Offsets refer to normalize_keyword_text(text). Unless overlapping is
+        set, only the longest of overlapping matches is kept.
+        """
+        if not self._built:
+            self.build()
+        text = normalize_keyword_text(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for phrase in out[state]:
+                start, end = i + 1 - len(phrase), i + 1
+                if (start > 0 and _is_letter(text[start - 1])) or (end < len(text) and _is_letter(text[end])):
+                    continue
+                matches.append(Match(start, end, phrase, self._values[phrase]))
+
+        matches.sort(key=lambda m: (m.start, -(m.end - m.start)))
+        if overlapping:
+            return matches
+        kept, last_end = [], -1
+        for m in matches:
+            if m.start >= last_end:
+                kept.append(m)
+                last_end = m.end
+        return kept
+
+
+def _label_names(label):
+    """
+    Readable names derived from a PlantVillage label:
+    "Grape___Esca_(Black_Measles)" -> crops ["grape"], diseases ["esca black measles", "esca", "black measles"].
+    """
+    crop, _, disease = label.partition("___")
+    crop_names = [
+        normalize_keyword_text(re.sub(r"[(),]", " ", crop)),
+        normalize_keyword_text(re.split(r"[(,]", crop)[0]),
+    ]
+    disease = disease.strip("_")
+    disease_names = [
+        normalize_keyword_text(re.sub(r"[()]", " ", disease)),
+        normalize_keyword_text(re.sub(r"\(.*?\)", "", disease)),
+    ]
+    disease_names += [normalize_keyword_text(part) for part in re.findall(r"\((.*?)\)", disease)]
+    # "Cercospora_leaf_spot Gray_leaf_spot": two names for the same disease
+    if " " in disease and "(" not in disease:
+        disease_names += [normalize_keyword_text(part) for part in disease.split(" ")]
+    return list(dict.fromkeys(filter(None, crop_names))), list(dict.fromkeys(filter(None, disease_names)))
+
+
+def build_disease_index(class_labels, remedies=None, synonyms=None, crop_synonyms=None):
+    """
+    Index of disease names. Values are ("label", class_label) for names that
+    identify one class, ("disease", class_label) for a disease name shared by
+    several crops (e.g. "late blight"), and ("crop", crop) for crop names.
+    """
+    index = KeywordIndex()
+    remedies = remedies or {}
+    synonyms = synonyms or {}
+    crop_synonyms = crop_synonyms or {}
+
+    for label in list(class_labels) + [key for key in remedies if key != "default"]:
+        crop, _, disease = label.partition("___")
+        crop_names, disease_names = _label_names(label)
+        for name in crop_names + crop_synonyms.get(crop, []):
+            index.add(name, ("crop", crop))
+        if disease.lower() == "healthy":
+            for crop_name in crop_names:
+                index.add(f"healthy {crop_name}", ("label", label))
+            continue
+        index.add(label, ("label", label))
+        for name in disease_names:
+            for crop_name in crop_names:
+                index.add(f"{crop_name} {name}", ("label", label))
+            index.add(name, ("disease", label))
+        for name in synonyms.get(label, []):
+            index.add(name, ("label", label))
+    return index.build()
+
+
+def resolve_diseases(matches):
+    """
+    Class labels mentioned in a message, most specific first: exact names,
+    then shared disease names narrowed down by any crop mentioned.
+    """
+    crops = {value for m in matches for kind, value in m.values if kind == "crop"}
+    labels = []
+    for m in matches:
+        candidates = [value for kind, value in m.values if kind == "label"]
+        candidates = candidates or [value for kind, value in m.values if kind == "disease"]
+        if len(candidates) > 1:
+            candidates = [label for label in candidates if label.partition("___")[0] in crops] or candidates
+        labels.extend(candidates)
+    return list(dict.fromkeys(labels))
@@ -0,0 +1,253 @@
+"""
+Offline retrieval over AgriBot's own knowledge: disease remedies, the crops
+the recommendation model knows (with growing conditions from the training
+data) and the 38 disease classes of the image model.
+
+KnowledgeIndex scores documents with BM25 over a sparse document-term
+matrix. The chat answers from the best document directly when the match is
+clear, and otherwise passes the top passages to the LLM as context.
+"""
+
+import re
+from collections import Counter, namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from tts_service import strip_html
+
+CROP_DATA_PATH = Path("Crop_recommendation.csv")
+BM25_K1 = 1.5
+BM25_B = 0.75
+# share of the question's terms the best document must contain to answer directly
+DIRECT_ANSWER_COVERAGE = 0.6
+# ... and how far it must be ahead of the runner-up
+DIRECT_ANSWER_MARGIN = 0.2
+PASSAGE_CHARS = 600
+
+Document = namedtuple("Document", ["doc_id", "title", "text", "answer", "lang"])
+Hit = namedtuple("Hit", ["score", "doc"])
+
+_TOKEN = re.compile(r"[\wऀ-ॿ]+")
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i in is it its me my of on or
+should so the their there this to was what when where which who why will with you your
+about get give tell please help
+का की के को में से है हैं और पर भी क्या कैसे करें कर मेरे मेरी मेरा यह वह लिए हो
+""".split())
+
+_UNITS = {"N": "", "P": "", "K": "", "temperature": " °C", "humidity": " %", "ph": "", "rainfall": " mm"}
+_FEATURE_NAMES = {
+    "N": "nitrogen (N)", "P": "phosphorus (P)", "K": "potassium (K)", "temperature": "temperature",
+    "humidity": "humidity", "ph": "soil pH", "rainfall": "rainfall",
+}
+
+
+# crude English suffix stripping: "treatment" -> "treat", "growing" -> "grow"
+_SUFFIXES = ("ment", "ing", "ed", "s")
+
+
+def tokenize(text):
+    """
+    Lower-case word tokens without stopwords, English suffixes stripped.
+    """
+    tokens = []
+    for token in _TOKEN.findall(text.lower().replace("_", " ")):
+        if token in STOPWORDS:
+            continue
+        if token.isascii():
+            for suffix in _SUFFIXES:
+                if token.endswith(suffix) and len(token) - len(suffix) >= 4 and not token.endswith("ss"):
+                    token = token[:-len(suffix)]
+                    break
+        tokens.append(token)
+    return tokens
+
+
+class KnowledgeIndex:
+    """
+    BM25 over a list of Documents. Term weights are computed once into a
+    CSC matrix (documents x terms), so a query only sums a few columns.
+    """
+
+    def __init__(self, documents, k1=BM25_K1, b=BM25_B):
+        self.documents = list(documents)
+        self.vocabulary = {}
+        rows, cols, counts = [], [], []
+        lengths = np.zeros(len(self.documents))
+        for i, doc in enumerate(self.documents):
+            tokens = tokenize(doc.title + " " + doc.text)
+            lengths[i] = len(tokens)
+            for term, count in Counter(tokens).items():
+                rows.append(i)
+                cols.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                counts.append(count)
+
+        tf = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float32), (rows, cols)),
+            shape=(len(self.documents), len(self.vocabulary)),
+        )
+        n_docs = max(len(self.documents), 1)
+        df = np.bincount(cols, minlength=len(self.vocabulary))
+        self.idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        norm = k1 * (1 - b + b * lengths / max(lengths.mean(), 1.0))
+        data = tf.data.copy()
+        row_of = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+        data = data * (k1 + 1) / (data + norm[row_of])
+        data *= self.idf[tf.indices]
+        self.weights = sparse.csr_matrix((data, tf.indices, tf.indptr), shape=tf.shape).tocsc()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _query_terms(self, query):
+        return [self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary]
+
+    def search(self, query, k=3, lang=None):
+        """
+        Top-k Hits for a query. Documents in another language than lang are skipped.
+        """
+        terms = self._query_terms(query)
+        if not terms:
+            return []
+        unique = sorted(set(terms))
+        query_vec = np.array([terms.count(t) for t in unique], dtype=np.float32)
+        scores = np.asarray(self.weights[:, unique] @ query_vec).ravel()
+        if lang is not None:
+            allowed = np.array([doc.lang in (None, lang) for doc in self.documents])
+            scores = np.where(allowed, scores, 0.0)
+        top = np.argsort(scores)[::-1][:k]
+        return [Hit(float(scores[i]), self.documents[i]) for i in top if scores[i] > 0]
+
+    def coverage(self, query, doc):
+        """
+        Share of the query's known terms that occur in doc.
+        """
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return 0.0
+        doc_terms = set(tokenize(doc.title + " " + doc.text))
+        return len(query_terms & doc_terms) / len(query_terms)
+
+    def direct_answer(self, query, hits, lang=None):
+        """
+        The best hit's ready-made answer if it clearly matches the question
+        (and is written in lang, when given), else None. Documents without a
+        language have English answers.
+        """
+        if not hits or hits[0].doc.answer is None:
+            return None
+        if lang is not None and (hits[0].doc.lang or "en") != lang:
+            return None
+        best = hits[0].score
+        runner_up = hits[1].score if len(hits) > 1 else 0.0
+        if (best - runner_up) / best < DIRECT_ANSWER_MARGIN:
+            return None
+        if self.coverage(query, hits[0].doc) < DIRECT_ANSWER_COVERAGE:
+            return None
+        return hits[0].doc.answer
+
+    @staticmethod
+    def passages(hits, max_chars=PASSAGE_CHARS):
+        """
+        Hit texts trimmed for use as LLM context.
+        """
+        return [f"{hit.doc.title}: {hit.doc.text[:max_chars]}" for hit in hits]
+
+
+def _readable_label(label):
+    crop, _, disease = label.partition("___")
+    crop = re.sub(r"_?\(.*?\)", "", crop).replace(",", "").replace("_", " ").strip()
+    disease = re.sub(r"[_()]+", " ", disease).strip()
+    return crop, disease
+
+
+def crop_profiles(data_path=CROP_DATA_PATH, features=None):
+    """
+    Typical growing conditions per crop (10th/50th/90th percentile) from the training data.
+    """
+    data_path = Path(data_path)
+    if not data_path.exists():
+        return {}
+    df = pd.read_csv(data_path)
+    features = [f for f in (features or _UNITS) if f in df.columns]
+    quantiles = df.groupby("label")[features].quantile([0.1, 0.5, 0.9])
+    profiles = {}
+    for crop in df["label"].unique():
+        q = quantiles.loc[crop]
+        profiles[crop] = {f: (q.loc[0.1, f], q.loc[0.5, f], q.loc[0.9, f]) for f in features}
+    return profiles
+
+
+def _fmt(value):
+    return f"{value:.1f}".rstrip("0").rstrip(".")
+
+
+def build_documents(remedies=None, class_labels=None, metadata=None, profiles=None,
+                    synonyms=None, crop_aliases=None):
+    """
+    Documents for the remedies (one per language), the crops in the model
+    metadata and the disease classes.
+    """
+    remedies = remedies or {}
+    synonyms = synonyms or {}
+    crop_aliases = crop_aliases or {}
+    profiles = profiles or {}
+    documents = []
+
+    for key, entry in remedies.items():
+        if key == "default":
+            continue
+        crop, disease = _readable_label(key)
+        for lang, html in entry.items():
+            text = " ".join(strip_html(html).split())
+            extra = " ".join(synonyms.get(key, []))
+            documents.append(Document(f"remedy:{key}:{lang}", f"{crop} {disease}",
+                                      f"{text} {extra}".strip(), html, lang))
+
+    classes = (metadata or {}).get("classes", [])
+    n_crops = len(classes)
+    for crop in classes:
+        alias = crop_aliases.get(crop, "")
+        title = f"{crop.capitalize()} {alias}".strip()
+        profile = profiles.get(crop)
+        lines = []
+        if profile:
+            for feature, (low, mid, high) in profile.items():
+                unit = _UNITS.get(feature, "")
+                lines.append(f"• {_FEATURE_NAMES.get(feature, feature)}: {_fmt(low)}–{_fmt(high)}{unit} "
+                             f"(typical {_fmt(mid)}{unit})")
+        intro = (f"{crop.capitalize()} is one of the {n_crops} crops the AgriBot recommendation model "
+                 f"can suggest. Growing conditions for {crop} (ideal soil, climate, fertilizer):")
+        text = intro + " " + " ".join(line.lstrip("• ") for line in lines)
+        answer = (f"{title} 🌱\n{intro}\n" + "\n".join(lines)) if lines else None
+        documents.append(Document(f"crop:{crop}", title, text, answer, None))
+
+    # classes with a remedy are already covered by the remedy documents
+    for label in class_labels or []:
+        if label in remedies:
+            continue
+        crop, disease = _readable_label(label)
+        names = " ".join(synonyms.get(label, []))
+        if disease.lower() == "healthy":
+            text = (f"Healthy {crop} leaf. The AgriBot image model recognises healthy {crop} "
+                    f"plants; no disease treatment is needed.")
+            title = f"Healthy {crop}"
+        else:
+            text = (f"{disease} is a disease of {crop} that the AgriBot image model can detect "
+                    f"from a leaf photo. Also known as: {names or disease}.")
+            title = f"{crop} {disease}"
+        documents.append(Document(f"class:{label}", title, text, None, None))
+
+    return documents
+
+
+def build_knowledge_index(remedies=None, class_labels=None, metadata=None, synonyms=None,
+                          crop_aliases=None, data_path=CROP_DATA_PATH):
+    features = (metadata or {}).get("features")
+    return KnowledgeIndex(build_documents(
+        remedies, class_labels, metadata, crop_profiles(data_path, features), synonyms, crop_aliases
+    ))
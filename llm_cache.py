@@ -0,0 +1,198 @@
+"""
+Response cache for AgriBot LLM calls.
+
+CachedLLMClient wraps any llm_client.LLMClient. Answers are keyed by the
+normalised question, language, model name and call kind; they live in an
+in-memory LRU with a TTL, backed by a SQLite file so they survive restarts.
+Identical concurrent requests share a single LLM call (single-flight).
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from llm_client import LLMClient
+
+CACHE_DB_PATH = "agribot_llm_cache.sqlite3"
+MAX_MEMORY_ENTRIES = 512
+TTL_SECONDS = 7 * 24 * 3600
+# how long an identical request waits on another's call before making its own
+COALESCE_WAIT_SECONDS = 60
+
+_SPACES = re.compile(r"\s+")
+_TRAILING_PUNCT = re.compile(r"[\s?!.।,;:]+$")
+
+
+def normalize_prompt(text):
+    """
+    Canonical form of a question for cache lookups: NFKC, lower case,
+    collapsed whitespace, no trailing punctuation.
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _SPACES.sub(" ", text).strip()
+    return _TRAILING_PUNCT.sub("", text)
+
+
+def make_cache_key(text, lang, model_name, kind):
+    raw = json.dumps([kind, lang, model_name, normalize_prompt(text)], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache: LRU dict in memory, SQLite on disk. Entries expire after ttl seconds.
+    """
+
+    def __init__(self, db_path=CACHE_DB_PATH, max_entries=MAX_MEMORY_ENTRIES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, created REAL)"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        """
+        Return (value, tier) with tier "memory" or "disk", or (None, None).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if now - created < self.ttl:
+                    self._memory.move_to_end(key)
+                    return value, "memory"
+                del self._memory[key]
+
+            if self._db is None:
+                return None, None
+            row = self._db.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, None
+            value, created = row
+            if now - created >= self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None, None
+            self._put_memory(key, value, created)
+            return value, "disk"
+
+    def set(self, key, value):
+        created = time.time()
+        with self._lock:
+            self._put_memory(key, value, created)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, created),
+                )
+                self._db.commit()
+
+    def _put_memory(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+class _Flight:
+    """
+    One in-progress LLM call that identical requests wait on.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class CachedLLMClient(LLMClient):
+    """
+    Caching, deduplicating wrapper around another LLMClient.
+
+    stream()/generate() take extra keyword arguments for the cache key:
+    cache_text (the user question; defaults to the prompt), lang and kind.
+    Hits are served without touching the network. A request that waits on an
+    identical in-flight call gives up after wait_timeout seconds (default: the
+    wrapped client's request timeout) and calls the LLM itself.
+    """
+
+    def __init__(self, client, cache=None, wait_timeout=None):
+        super().__init__()
+        self.client = client
+        self.model_name = client.model_name
+        self.cache = cache if cache is not None else ResponseCache()
+        self.wait_timeout = wait_timeout or getattr(client, "timeout", None) or COALESCE_WAIT_SECONDS
+        self.ttft_history = client.ttft_history
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "memory_hits": 0, "disk_hits": 0, "coalesced": 0, "misses": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def stream(self, prompt, temperature=0.7, cache_text=None, lang="", kind="answer"):
+        key = make_cache_key(cache_text if cache_text is not None else prompt, lang, self.model_name, kind)
+        self._count("requests")
+
+        value, tier = self.cache.get(key)
+        if value is not None:
+            self._count(f"{tier}_hits")
+            yield value
+            return
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            # same question already on its way to the LLM: wait for that answer
+            if flight.done.wait(self.wait_timeout) and flight.result is not None:
+                self._count("coalesced")
+                yield flight.result
+                return
+            # the leader failed or hangs; make our own call below, without caching races
+            self._count("misses")
+            yield from self.client.stream(prompt, temperature)
+            return
+
+        self._count("misses")
+        parts = []
+        try:
+            for chunk in self.client.stream(prompt, temperature):
+                parts.append(chunk)
+                yield chunk
+            flight.result = "".join(parts)
+            self.cache.set(key, flight.result)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def generate(self, prompt, temperature=0.7, cache_text=None, lang="", kind="answer"):
+        return "".join(self.stream(prompt, temperature, cache_text, lang, kind))
+
+    def stats(self):
+        """
+        Request counters plus the overall hit rate (coalesced requests count as hits).
+        """
+        with self._lock:
+            counts = dict(self._counts)
+        hits = counts["memory_hits"] + counts["disk_hits"] + counts["coalesced"]
+        counts["hit_rate"] = hits / counts["requests"] if counts["requests"] else 0.0
+        return counts
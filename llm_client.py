@@ -0,0 +1,126 @@
+"""
+LLM clients used by AgriBot.
+
+Every client streams text chunks; generate() just joins them. GeminiClient
+talks to Google Gemini, HTTPStreamClient to any server that streams
+newline-delimited JSON chunks, such as fake_llm_server.py for local testing.
+"""
+
+import json
+import os
+import time
+import urllib.request
+from collections import deque
+
+DEFAULT_GEMINI_MODEL = "gemini-1.5-flash-8b"
+# point AgriBot at a local streaming server instead of Gemini
+LLM_URL_ENV = "AGRIBOT_LLM_URL"
+
+
+class LLMClient:
+    """
+    Base class. Subclasses implement _stream(prompt, temperature) and yield text.
+    Time-to-first-token of recent calls is kept in ttft_history (seconds).
+    """
+
+    model_name = "unknown"
+
+    def __init__(self):
+        self.ttft_history = deque(maxlen=200)
+
+    def _stream(self, prompt, temperature):
+        raise NotImplementedError
+
+    def stream(self, prompt, temperature=0.7):
+        """
+        Yield the response text chunk by chunk as the model produces it.
+        """
+        start = time.perf_counter()
+        first = True
+        for chunk in self._stream(prompt, temperature):
+            if not chunk:
+                continue
+            if first:
+                self.ttft_history.append(time.perf_counter() - start)
+                first = False
+            yield chunk
+
+    def generate(self, prompt, temperature=0.7):
+        """
+        Return the full response text.
+        """
+        return "".join(self.stream(prompt, temperature))
+
+    def mean_ttft(self):
+        """
+        Mean time-to-first-token over recent calls, or None.
+        """
+        if not self.ttft_history:
+            return None
+        return sum(self.ttft_history) / len(self.ttft_history)
+
+
+class GeminiClient(LLMClient):
+    """
+    Google Gemini via google-generativeai, using its streaming API.
+    """
+
+    def __init__(self, model_name=DEFAULT_GEMINI_MODEL, api_key=None):
+        super().__init__()
+        import google.generativeai as genai
+
+        if api_key:
+            genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def _stream(self, prompt, temperature):
+        response = self.model.generate_content(
+            prompt, generation_config={"temperature": temperature}, stream=True
+        )
+        for chunk in response:
+            try:
+                yield chunk.text
+            except ValueError:
+                # chunk without text parts (e.g. safety metadata only)
+                continue
+
+
+class HTTPStreamClient(LLMClient):
+    """
+    Client for a server that answers POST {base_url}/generate with one JSON
+    object per line: {"text": "..."} chunks, or {"error": "..."}.
+    """
+
+    def __init__(self, base_url, model_name="local", timeout=60):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model_name
+        self.timeout = timeout
+
+    def _stream(self, prompt, temperature):
+        body = json.dumps({"prompt": prompt, "temperature": temperature, "model": self.model_name})
+        request = urllib.request.Request(
+            self.base_url + "/generate",
+            data=body.encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            for line in response:
+                line = line.strip()
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                yield data.get("text", "")
+
+
+def make_llm_client(api_key=None, model_name=DEFAULT_GEMINI_MODEL):
+    """
+    HTTPStreamClient when AGRIBOT_LLM_URL is set, otherwise Gemini.
+    """
+    url = os.environ.get(LLM_URL_ENV)
+    if url:
+        return HTTPStreamClient(url)
+    return GeminiClient(model_name, api_key=api_key)
@@ -0,0 +1,142 @@
+"""
+Load test for api_server.py: requests/sec and latency percentiles.
+
+Each worker thread keeps one HTTP connection alive and sends requests back to
+back for the given duration.
+
+Usage:
+  python load_test.py --endpoint recommend --concurrency 16 --duration 10
+  python load_test.py --endpoint disease-batch --image leaf.jpg --batch-size 8
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+import numpy as np
+
+SAMPLE = {"N": 90, "P": 42, "K": 43, "temperature": 20.9, "humidity": 82.0, "ph": 6.5, "rainfall": 202.9}
+
+
+def multipart_body(field, files):
+    """
+    (body, content type) for a multipart/form-data upload of (filename, bytes) pairs.
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for filename, data in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n".encode("utf-8") + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def build_request(endpoint, batch_size, image_bytes):
+    """
+    (path, body, content type) for one request of the chosen kind.
+    """
+    if endpoint == "recommend":
+        return "/recommend", json.dumps({**SAMPLE, "k": 3}).encode(), "application/json"
+    if endpoint == "recommend-batch":
+        body = {"samples": [SAMPLE] * batch_size, "k": 3}
+        return "/recommend/batch", json.dumps(body).encode(), "application/json"
+    if endpoint == "disease":
+        return ("/disease",) + multipart_body("image", [("leaf.jpg", image_bytes)])
+    if endpoint == "disease-batch":
+        files = [(f"leaf{i}.jpg", image_bytes) for i in range(batch_size)]
+        return ("/disease/batch",) + multipart_body("images", files)
+    if endpoint == "health":
+        return "/health", None, None
+    raise ValueError(endpoint)
+
+
+def random_jpeg(size=256):
+    import io
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    buf = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, (size, size, 3), dtype=np.uint8)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def worker(url, request, deadline, latencies, errors, lock):
+    path, body, content_type = request
+    headers = {"Content-Type": content_type} if content_type else {}
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    local_lat, local_err = [], 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request("POST" if body is not None else "GET", path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                local_err += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            local_err += 1
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+            continue
+        local_lat.append(time.perf_counter() - start)
+    conn.close()
+    with lock:
+        latencies.extend(local_lat)
+        errors[0] += local_err
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the AgriBot prediction API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", default="recommend",
+                        choices=["recommend", "recommend-batch", "disease", "disease-batch", "health"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--batch-size", type=int, default=16, help="items per batch request")
+    parser.add_argument("--image", default=None, help="leaf photo (default: random JPEG)")
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    image_bytes = None
+    if args.endpoint.startswith("disease"):
+        if args.image:
+            with open(args.image, "rb") as f:
+                image_bytes = f.read()
+        else:
+            image_bytes = random_jpeg()
+    request = build_request(args.endpoint, args.batch_size, image_bytes)
+
+    latencies, errors, lock = [], [0], threading.Lock()
+    start = time.perf_counter()
+    deadline = start + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(url, request, deadline, latencies, errors, lock))
+        for _ in range(args.concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    items = args.batch_size if args.endpoint.endswith("batch") else 1
+    print(f"endpoint {args.endpoint}, concurrency {args.concurrency}, {elapsed:.1f}s")
+    print(f"requests:     {len(latencies)} ok, {errors[0]} failed")
+    print(f"requests/sec: {len(latencies) / elapsed:.1f}")
+    if items > 1:
+        print(f"items/sec:    {len(latencies) * items / elapsed:.1f}")
+    if latencies:
+        ms = np.array(latencies) * 1000
+        print(f"latency ms:   p50 {np.percentile(ms, 50):.1f}  p95 {np.percentile(ms, 95):.1f}  "
+              f"p99 {np.percentile(ms, 99):.1f}  max {ms.max():.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Rerun wall time of app.py when widgets change.
+
+Runs the page headless with Streamlit's AppTest. It types a location, then
+nudges the top-k slider and the nitrogen input a few times, timing each rerun.
+The weather and soil APIs are replaced by a fake with a fixed latency, so the
+numbers do not depend on the network. The API call count shows what each
+widget change triggers.
+
+AppTest always reruns the whole script, so these are full-app reruns; in the
+browser a change inside a fragment reruns only that fragment.
+
+Usage:
+  python measure_app_reruns.py [--app app.py] [--latency 0.3] [--changes 10]
+  git show <commit>:app.py > /tmp/app_before.py && python measure_app_reruns.py --app /tmp/app_before.py
+"""
+
+import argparse
+import time
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import requests
+
+WEATHER = {"main": {"temp": 27.5, "humidity": 71}, "rain": {"1h": 2.0}, "coord": {"lat": 18.52, "lon": 73.86}}
+SOIL = {"properties": {"layers": [
+    {"name": "phh2o", "depths": [{"values": {"mean": 68}}]},
+    {"name": "nitrogen", "depths": [{"values": {"mean": 120}}]},
+]}}
+
+
+class FakeAPI:
+    """
+    Stand-in for requests.Session.get with a fixed round-trip latency.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = Counter()
+
+    def get(self, session, url, *args, **kwargs):
+        time.sleep(self.latency)
+        response = requests.Response()
+        response.status_code = 200
+        if "openweathermap" in url:
+            self.calls["weather"] += 1
+            response._content = requests.compat.json.dumps(WEATHER).encode()
+        else:
+            self.calls["soil"] += 1
+            response._content = requests.compat.json.dumps(SOIL).encode()
+        return response
+
+
+def timed(at, api, action):
+    before = api.calls.copy()
+    start = time.perf_counter()
+    action()
+    at.run(timeout=60)
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return elapsed, api.calls - before
+
+
+def main():
+    from streamlit.testing.v1 import AppTest
+    import streamlit as st
+
+    parser = argparse.ArgumentParser(description="Time app.py reruns per widget change.")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake API round trip, seconds")
+    parser.add_argument("--changes", type=int, default=10, help="changes per widget")
+    args = parser.parse_args()
+
+    api = FakeAPI(args.latency)
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    with mock.patch.object(requests.Session, "get", lambda s, url, *a, **kw: api.get(s, url, *a, **kw)):
+        at = AppTest.from_file(Path(args.app).resolve().as_posix(), default_timeout=60)
+        rows = [("first load", *timed(at, api, lambda: None))]
+        rows.append(("select state", *timed(at, api, lambda: at.selectbox(key="state_select").set_value("Punjab"))))
+        rows.append(("type location", *timed(at, api, lambda: at.text_input(key="location_input").input("Pune"))))
+        rows.append(("fetch soil", *timed(at, api, lambda: at.button(key="fetch_soil_button").click())))
+
+        for name, key, values in [
+            ("top-k slider", "top_k_slider", [3 + i % 5 for i in range(1, args.changes + 1)]),
+            ("nitrogen input", "nitrogen_input", [60.0 + i for i in range(args.changes)]),
+        ]:
+            times, calls = [], Counter()
+            for value in values:
+                widget = at.slider(key=key) if "slider" in key else at.number_input(key=key)
+                elapsed, c = timed(at, api, lambda: widget.set_value(value))
+                times.append(elapsed)
+                calls += c
+            rows.append((name, float(np.mean(times)), calls, float(np.percentile(times, 95))))
+        rows.append(("recommend", *timed(at, api, lambda: at.button(key="recommend_button").click())))
+
+    print(f"{args.app}: fake API latency {args.latency * 1000:.0f} ms, {args.changes} changes per widget\n")
+    print(f"{'rerun after':<16} {'mean ms':>9} {'p95 ms':>8} {'weather calls':>14} {'soil calls':>11}")
+    for row in rows:
+        name, mean, calls = row[:3]
+        p95 = f"{row[3] * 1000:.0f}" if len(row) > 3 else "-"
+        print(f"{name:<16} {mean * 1000:>9.0f} {p95:>8} {calls['weather']:>14} {calls['soil']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Memory and first-diagnosis latency of the shared disease service.
+
+Compares the chat and disease pages sharing one warm DiseaseService against
+the old way, where every importer loaded its own model and the first
+model.predict() call built the graph on the user's request.
+
+Usage:
+  python measure_disease_service.py [image.jpg] [--model plant_disease_model.h5]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from diseases_prediction import DISEASE_MODEL_PATH, DiseaseService, rss_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the shared disease inference service.")
+    parser.add_argument("image", nargs="?", default=None, help="leaf photo (default: random pixels)")
+    parser.add_argument("--model", default=DISEASE_MODEL_PATH)
+    args = parser.parse_args()
+
+    rows = [("process RSS before TensorFlow", f"{rss_mb():.0f} MB")]
+    start = time.perf_counter()
+    import tensorflow  # noqa: F401  (timed separately from the model load)
+    rows.append(("TensorFlow import", f"{(time.perf_counter() - start) * 1000:.0f} ms"))
+
+    # cold: model loaded on the user's first photo
+    shared = DiseaseService(args.model)
+    if args.image is None:
+        from PIL import Image
+        rng = np.random.default_rng(0)
+        image = Image.fromarray(rng.integers(0, 255, shared.input_size + (3,), dtype=np.uint8))
+    else:
+        image = args.image
+    start = time.perf_counter()
+    label, confidence = shared.diagnose(image)
+    rows.append(("first diagnosis, cold (load + trace + infer)", f"{(time.perf_counter() - start) * 1000:.0f} ms"))
+    rows.append(("  of which model load", f"{shared.stats['load_s'] * 1000:.0f} ms"))
+    rows.append(("  of which warmup trace", f"{shared.stats['warmup_s'] * 1000:.0f} ms"))
+    rows.append(("process RSS with one shared model", f"{rss_mb():.0f} MB"))
+
+    # the old layout: the second page loads a copy of its own
+    before = rss_mb()
+    copy = DiseaseService(args.model).warmup_async()
+    copy._warm_thread.join()
+    rows.append(("extra RSS for a second page's own copy", f"{rss_mb() - before:.0f} MB"))
+
+    # warm: loaded in the background before the photo arrives
+    start = time.perf_counter()
+    copy.diagnose(image)
+    rows.append(("first diagnosis, warm service", f"{(time.perf_counter() - start) * 1000:.1f} ms"))
+    start = time.perf_counter()
+    for _ in range(20):
+        shared.diagnose(image)
+    rows.append(("steady-state diagnosis", f"{(time.perf_counter() - start) / 20 * 1000:.1f} ms"))
+
+    # the old predict path: model.predict() builds its own function on first use
+    batch = shared.preprocess(image)[None]
+    start = time.perf_counter()
+    copy.model.predict(batch, verbose=0)
+    rows.append(("first model.predict() (old code path)", f"{(time.perf_counter() - start) * 1000:.0f} ms"))
+    start = time.perf_counter()
+    for _ in range(20):
+        copy.model.predict(batch, verbose=0)
+    rows.append(("steady-state model.predict()", f"{(time.perf_counter() - start) / 20 * 1000:.1f} ms"))
+
+    print(f"Prediction: {label} ({confidence:.1f}%)\n")
+    width = max(len(name) for name, _ in rows)
+    for name, value in rows:
+        print(f"{name:<{width}}  {value:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Accuracy and latency of tiled vs whole-image disease inference.
+
+Runs every photo of a class-per-folder directory (e.g. Plant/test, or a set
+of full-resolution camera photos sorted the same way) through the served
+model twice: squashed to the input size as predict_disease does today, and
+with DiseaseService.predict_tiled. Folder order must match the model's
+class order, as in training.
+
+Usage:
+  python measure_tiled_inference.py [Plant/test] [--grid 3] [--early-exit 0.9] [--limit 200]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from disease_data import list_image_files
+from diseases_prediction import EARLY_EXIT_CONFIDENCE, TILE_GRID, DiseaseService, DISEASE_MODEL_PATH
+
+
+def summarize(name, pred, labels, times, diseased, extra=""):
+    times = np.asarray(times) * 1000
+    detected = diseased[pred] == diseased[labels]
+    print(f"{name:<10} {np.mean(pred == labels):>9.4f} {detected.mean():>16.4f} "
+          f"{np.mean(times):>9.1f} {np.percentile(times, 95):>8.1f}  {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare tiled and whole-image disease inference.")
+    parser.add_argument("directory", nargs="?", default="Plant/test")
+    parser.add_argument("--model", default=DISEASE_MODEL_PATH)
+    parser.add_argument("--grid", type=int, default=TILE_GRID, help="tiles across the shorter side")
+    parser.add_argument("--early-exit", type=float, default=EARLY_EXIT_CONFIDENCE,
+                        help="stop at a tile this confidently diseased (>1 disables)")
+    parser.add_argument("--limit", type=int, default=None, help="at most this many images")
+    args = parser.parse_args()
+
+    paths, labels, class_names = list_image_files(args.directory)
+    if args.limit:
+        keep = np.random.default_rng(0).permutation(len(paths))[:args.limit]
+        paths, labels = [paths[i] for i in keep], [labels[i] for i in keep]
+    labels = np.asarray(labels)
+    service = DiseaseService(args.model).load()
+    if not service.ready:
+        raise SystemExit(f"could not load {args.model}: {service.error}")
+    if len(service.class_labels) != len(class_names):
+        raise SystemExit(f"{args.directory} has {len(class_names)} classes, the model {len(service.class_labels)}")
+    diseased = np.array(["healthy" not in name.lower() for name in service.class_labels])
+
+    # one untimed pass each so lazy initialisation is not measured
+    service.predict_batch([paths[0]])
+    service.predict_tiled(paths[0], grid=args.grid, early_exit=args.early_exit)
+
+    whole_pred, whole_times = [], []
+    tiled_pred, tiled_times, tiles, exits = [], [], [], []
+    for path in paths:
+        start = time.perf_counter()
+        whole_pred.append(int(service.predict_batch([path])[0].argmax()))
+        whole_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        result = service.predict_tiled(path, grid=args.grid, early_exit=args.early_exit)
+        tiled_times.append(time.perf_counter() - start)
+        tiled_pred.append(int(result["probs"].argmax()))
+        tiles.append(result["tiles"])
+        exits.append(result["early_exit"])
+
+    print(f"{len(paths)} images from {args.directory}, grid {args.grid}, early exit at {args.early_exit}\n")
+    print(f"{'mode':<10} {'accuracy':>9} {'healthy/disease':>16} {'mean ms':>9} {'p95 ms':>8}")
+    summarize("whole", np.asarray(whole_pred), labels, whole_times, diseased)
+    summarize("tiled", np.asarray(tiled_pred), labels, tiled_times, diseased,
+              f"{np.mean(tiles):.1f} tiles per image, early exit on {np.mean(exits):.0%}")
+
+
+if __name__ == "__main__":
+    main()
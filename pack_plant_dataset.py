@@ -0,0 +1,98 @@
+"""
+Pack the PlantVillage folders (Plant/train, Plant/val, Plant/test) into TFRecord shards.
+
+Each record holds one image already resized to 150x150 as raw uint8 bytes plus
+its integer label, so training skips per-file opens and JPEG decoding.
+Run once (or again after the image folders change):
+  python pack_plant_dataset.py [--out Plant_shards] [--shard-size 1000]
+
+Exports:
+  - <out>/<split>-00000-of-000NN.tfrecord
+  - <out>/index.json (image size, class names, shard list and count per split)
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+import tensorflow as tf
+
+from disease_data import AUTOTUNE, IMG_SIZE, SHARD_DIR, SHARD_INDEX, decode_and_resize, list_image_files
+
+DATASET_DIR = "Plant"
+SPLITS = ["train", "val", "test"]
+SHARD_SIZE = 1000
+
+
+def _example(img, label):
+    return tf.train.Example(features=tf.train.Features(feature={
+        "image": tf.train.Feature(bytes_list=tf.train.BytesList(value=[img.tobytes()])),
+        "label": tf.train.Feature(int64_list=tf.train.Int64List(value=[int(label)])),
+    })).SerializeToString()
+
+
+def pack_split(split_dir, out_dir, split, shard_size, class_names=None, seed=42):
+    """
+    Write one split as shards. Returns (shard file names, image count, class names).
+    """
+    paths, labels, found_classes = list_image_files(split_dir)
+    if class_names is not None and found_classes != class_names:
+        raise SystemExit(f"Class folders in {split_dir} differ from the train split.")
+
+    # mix classes across shards so interleaved reads see a shuffled stream
+    order = list(range(len(paths)))
+    random.Random(seed).shuffle(order)
+    paths = [paths[i] for i in order]
+    labels = [labels[i] for i in order]
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels))
+    ds = ds.map(lambda p, l: decode_and_resize(p, l, IMG_SIZE), num_parallel_calls=AUTOTUNE)
+    ds = ds.prefetch(AUTOTUNE)
+
+    n_shards = max(1, -(-len(paths) // shard_size))
+    shard_names = [f"{split}-{i:05d}-of-{n_shards:05d}.tfrecord" for i in range(n_shards)]
+    writer = None
+    for i, (img, label) in enumerate(ds.as_numpy_iterator()):
+        if i % shard_size == 0:
+            if writer is not None:
+                writer.close()
+            writer = tf.io.TFRecordWriter(os.path.join(out_dir, shard_names[i // shard_size]))
+        writer.write(_example(img, label))
+    if writer is not None:
+        writer.close()
+
+    return shard_names, len(paths), found_classes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack Plant/{train,val,test} into TFRecord shards.")
+    parser.add_argument("--data", default=DATASET_DIR, help="folder holding the train/val/test splits")
+    parser.add_argument("--out", default=SHARD_DIR, help="output folder for shards and index.json")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="images per shard")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    index = {"img_size": list(IMG_SIZE), "class_names": None, "splits": {}}
+
+    for split in SPLITS:
+        split_dir = os.path.join(args.data, split)
+        if not os.path.isdir(split_dir):
+            print(f"Skipping {split}: {split_dir} not found")
+            continue
+        start = time.perf_counter()
+        shards, count, class_names = pack_split(
+            split_dir, args.out, split, args.shard_size, index["class_names"]
+        )
+        index["class_names"] = class_names
+        index["splits"][split] = {"count": count, "shards": shards}
+        print(f"Packed {count} {split} images into {len(shards)} shards in {time.perf_counter() - start:.1f}s")
+
+    with open(os.path.join(args.out, SHARD_INDEX), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    print("Index saved at:", os.path.join(args.out, SHARD_INDEX))
+
+
+if __name__ == "__main__":
+    main()
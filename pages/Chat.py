@@ -3,18 +3,20 @@
 import streamlit as st
 from pathlib import Path
 from crop_predictor import FEATURES, load_model, recommend_topk, load_metadata
-import google.generativeai as genai
+from llm_client import make_llm_client
+from llm_cache import CachedLLMClient, ResponseCache
+from param_extractor import extract_local, EXTRACTION_STATS, LOCAL_CONFIDENCE_THRESHOLD
+from disease_remedies import DISEASE_REMEDIES, DISEASE_SYNONYMS, CROP_SYNONYMS
+from keyword_index import build_disease_index, resolve_diseases
+from knowledge_index import build_knowledge_index
 import json
-import re
 import time
 from datetime import datetime
-from gtts import gTTS
-import io
-
-if "model" not in st.session_state:
-    st.session_state["model"] = genai.GenerativeModel("gemini-1.5-flash-8b")
-if "messages" not in st.session_state:
-    st.session_state["messages"] = []  # store chat history
+from tts_service import TTSService, remedy_texts
+from chat_history import ChatArchive, ChatHistory
+from diseases_prediction import get_disease_service
+from image_quality import ImageQualityError, get_quality_gate
+import html
 
 # -------------------------------
 # CONFIG & PATHS
@@ -131,20 +133,16 @@ div.stFileUploader>label {
 # -------------------------------
 
 
-def speak_text(text, lang_code="en"):
+@st.cache_resource
+def get_tts_service():
     """
-    Converts text to speech and returns a playable audio in Streamlit.
-    lang_code: 'en' for English, 'hi' for Hindi
+    Background text-to-speech with a disk cache, shared by all sessions.
+    The static disease remedies are queued for synthesis right away.
     """
-    try:
-        tts = gTTS(text=text, lang=lang_code)
-        audio_bytes = io.BytesIO()
-        tts.write_to_fp(audio_bytes)
-        audio_bytes.seek(0)
-        return audio_bytes
-    except Exception as e:
-        st.warning(f"Text-to-Speech failed: {e}")
-        return None
+    service = TTSService()
+    service.pregenerate(remedy_texts(DISEASE_REMEDIES))
+    return service
+
 def get_lang_code(lang_name):
     return "hi" if lang_name == "हिंदी" else "en"
 
@@ -207,7 +205,13 @@ trans = {
         "low_nitrogen": "Low Nitrogen — apply urea or compost.",
         "low_rainfall": "Low rainfall — consider drip irrigation.",
         "high_humidity": "High humidity + heat — risk of fungal infection.",
-        "select_language": "🌐 Language"
+        "select_language": "🌐 Language",
+        "photo_diagnosis": "🔬 Diagnosis from your photo",
+        "photo_healthy": "✅ The plant looks healthy. Keep checking the leaves regularly.",
+        "photo_no_remedy": "I don't have a treatment guide for this yet — ask me about it and I'll help.",
+        "photo_failed": "⚠️ I couldn't analyse this photo. Please try a clear, close-up picture of one leaf.",
+        "photo_quality": "📷 This photo looks {problems}, so I didn't diagnose it. Please retake it in daylight, close to one leaf and holding the camera steady.",
+        "quality_problems": {"blurry": "blurry", "dark": "too dark", "overexposed": "overexposed", "no_leaf": "like it has no leaf in it"}
     },
     "हिंदी": {
         "title": "AgriBot: आपका AI कृषि सहायक 🌾",
@@ -236,7 +240,13 @@ trans = {
         "low_nitrogen": "कम नाइट्रोजन — यूरिया या कम्पोस्ट लगाएं।",
         "low_rainfall": "कम वर्षा — ड्रिप सिंचाई पर विचार करें।",
         "high_humidity": "उच्च आर्द्रता + गर्मी — फंगल संक्रमण का खतरा।",
-        "select_language": "🌐 भाषा"
+        "select_language": "🌐 भाषा",
+        "photo_diagnosis": "🔬 आपकी फोटो से निदान",
+        "photo_healthy": "✅ पौधा स्वस्थ दिखता है। पत्तियों की नियमित जाँच करते रहें।",
+        "photo_no_remedy": "इसके लिए मेरे पास अभी उपचार गाइड नहीं है — इसके बारे में पूछें, मैं मदद करूँगा।",
+        "photo_failed": "⚠️ मैं इस फोटो का विश्लेषण नहीं कर सका। कृपया एक पत्ती की साफ, नज़दीकी फोटो लें।",
+        "photo_quality": "📷 यह फोटो {problems} लग रही है, इसलिए मैंने इसकी जाँच नहीं की। कृपया दिन की रोशनी में, एक पत्ती के पास से और कैमरा स्थिर रखकर फिर से फोटो लें।",
+        "quality_problems": {"blurry": "धुंधली", "dark": "बहुत अंधेरी", "overexposed": "बहुत ज़्यादा रोशनी वाली", "no_leaf": "बिना पत्ती की"}
     }
 }
 
@@ -250,20 +260,31 @@ crop_trans = {
     "coconut": "नारियल", "cotton": "कपास", "jute": "जूट", "coffee": "कॉफ़ी"
 }
 
-DISEASE_REMEDIES = {
-    "Strawberry___Leaf_scorch": {
-        "en": """<div class="disease-remedy"><div class="disease-title">🔴 Strawberry Leaf Scorch</div><div class="disease-section">🌿 Symptoms:</div><div class="disease-bullet">• Brown, scorched leaf edges</div><div class="disease-bullet">• Purple spots on leaves</div><div class="disease-bullet">• Leaf curling and premature dropping</div><div class="disease-section">✅ Treatment:</div><div class="disease-bullet">• Prune infected leaves</div><div class="disease-bullet">• Spray Copper Oxychloride (0.3%) every 10 days</div><div class="disease-bullet">• Use neem oil (5ml/L) for organic control</div><div class="disease-section">🛡 Prevention:</div><div class="disease-bullet">• Space plants 30cm apart for airflow</div><div class="disease-bullet">• Avoid nitrogen-heavy fertilizers</div></div>""",
-        "hi": """<div class="disease-remedy"><div class="disease-title">🔴 स्ट्रॉबेरी लीफ स्कॉर्च</div><div class="disease-section">🌿 लक्षण:</div><div class="disease-bullet">• भूरे, झुलसे हुए पत्तों के किनारे</div><div class="disease-bullet">• पत्तियों पर बैंगनी धब्बे</div><div class="disease-bullet">• पत्तियाँ मुड़ना और गिरना</div><div class="disease-section">✅ उपचार:</div><div class="disease-bullet">• संक्रमित पत्तियाँ काटें</div><div class="disease-bullet">• हर 10 दिन में कॉपर ऑक्सीक्लोराइड (0.3%) छिड़कें</div><div class="disease-bullet">• जैविक नियंत्रण के लिए नीम तेल (5 मिली/लीटर) का उपयोग करें</div><div class="disease-section">🛡 रोकथाम:</div><div class="disease-bullet">• हवा के प्रवाह के लिए पौधों को 30 सेमी दूर रखें</div><div class="disease-bullet">• नाइट्रोजन युक्त उर्वरकों से बचें</div></div>"""
-    },
-    "Tomato___Late_blight": {
-        "en": """<div class="disease-remedy"><div class="disease-title">🔴 Tomato Late Blight</div><div class="disease-section">🌿 Symptoms:</div><div class="disease-bullet">• Water-soaked spots on leaves</div><div class="disease-bullet">• White mold under leaves</div><div class="disease-bullet">• Rapid wilting</div><div class="disease-section">✅ Treatment:</div><div class="disease-bullet">• Remove and burn infected plants</div><div class="disease-bullet">• Spray Mancozeb (0.25%) every 7 days</div><div class="disease-bullet">• Use garlic-chili spray for organic option</div><div class="disease-section">🛡 Prevention:</div><div class="disease-bullet">• Plant resistant varieties</div><div class="disease-bullet">• Use drip irrigation</div><div class="disease-bullet">• Rotate crops yearly</div></div>""",
-        "hi": """<div class="disease-remedy"><div class="disease-title">🔴 टमाटर लेट ब्लाइट</div><div class="disease-section">🌿 लक्षण:</div><div class="disease-bullet">• पत्तियों पर पानी से भरे धब्बे</div><div class="disease-bullet">• पत्तियों के नीचे सफेद फफूंद</div><div class="disease-bullet">• तेजी से मुरझाना</div><div class="disease-section">✅ उपचार:</div><div class="disease-bullet">• संक्रमित पौधों को हटाकर जलाएं</div><div class="disease-bullet">• हर 7 दिन में मैनकोज़ेब (0.25%) छिड़कें</div><div class="disease-bullet">• जैविक विकल्प के लिए लहसुन-मिर्च का छिड़काव करें</div><div class="disease-section">🛡 रोकथाम:</div><div class="disease-bullet">• प्रतिरोधी किस्में लगाएं</div><div class="disease-bullet">• ड्रिप सिंचाई का उपयोग करें</div><div class="disease-bullet">• हर साल फसल बदलें</div></div>"""
-    },
-    "default": {
-        "en": "I'm still learning about this. Can you describe symptoms or ask something else?",
-        "hi": "मैं इसके बारे में अभी सीख रहा हूँ। क्या आप लक्षण बता सकते हैं या कुछ और पूछ सकते हैं?"
-    }
-}
+@st.cache_data
+def load_class_labels():
+    try:
+        with open("class_labels.json", "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+@st.cache_resource
+def get_disease_index():
+    """
+    Disease keyword index over class_labels.json, synonyms and remedy keys, built once per process.
+    """
+    return build_disease_index(load_class_labels(), DISEASE_REMEDIES, DISEASE_SYNONYMS, CROP_SYNONYMS)
+
+@st.cache_resource
+def get_knowledge_index():
+    """
+    BM25 index over remedies, the model's crops and the disease classes, built once per process.
+    """
+    return build_knowledge_index(DISEASE_REMEDIES, load_class_labels(), load_cached_metadata(),
+                                 DISEASE_SYNONYMS, crop_trans)
+
+disease_index = get_disease_index()
+knowledge = get_knowledge_index()
 
 FEATURES = metadata.get('features', ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall'])
 
@@ -288,17 +309,25 @@ t = trans[lang]
 # -------------------------------
 # SESSION STATE & CHAT INITIALIZATION
 # -------------------------------
+# messages rendered per page; older ones come back with "load more"
+VISIBLE_MESSAGES = 20
+
+@st.cache_resource
+def get_chat_archive():
+    """
+    SQLite file that all sessions page their old messages out to.
+    """
+    return ChatArchive()
+
 if "messages" not in st.session_state:
-    st.session_state.messages = []
+    st.session_state.messages = ChatHistory(get_chat_archive())
+if "visible_messages" not in st.session_state:
+    st.session_state.visible_messages = VISIBLE_MESSAGES
 if "chat_crop_params" not in st.session_state:
     st.session_state.chat_crop_params = {}
 
 if not st.session_state.messages:
-    st.session_state.messages.append({
-        "role": "assistant",
-        "content": t["greeting"],
-        "timestamp": datetime.now().strftime("%H:%M")
-    })
+    st.session_state.messages.append("assistant", t["greeting"])
 
 # -------------------------------
 # OPTIONAL FORM IN AN EXPANDER
@@ -332,11 +361,7 @@ with st.expander(t['enter_conditions']):
                     <div class="crop-confidence">Confidence: {score:.1%}</div>
                 </div>
                 """
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": rec_html,
-                "timestamp": datetime.now().strftime("%H:%M")
-            })
+            st.session_state.messages.append("assistant", rec_html)
             st.rerun()
         else:
             st.error("Model not available.")
@@ -344,79 +369,135 @@ with st.expander(t['enter_conditions']):
 # -------------------------------
 # CHAT INTERFACE
 # -------------------------------
-for msg in st.session_state.messages:
-    align = "flex-end" if msg["role"] == "user" else "flex-start"
-    bubble_class = "user-message" if msg["role"] == "user" else "bot-message"
+history = st.session_state.messages
+shown = history.visible(st.session_state.visible_messages)
+hidden = len(history) - len(shown)
+if hidden > 0:
+    if history.summary():
+        st.caption(f"🗂 {history.summary()}")
+    if st.button(f"⬆️ Load {min(VISIBLE_MESSAGES, hidden)} earlier messages"):
+        st.session_state.visible_messages += VISIBLE_MESSAGES
+        st.rerun()
+
+for msg in shown:
+    align = "flex-end" if msg.role == "user" else "flex-start"
+    bubble_class = "user-message" if msg.role == "user" else "bot-message"
+    ttft_note = f" · ⚡ {msg.ttft:.2f}s" if msg.ttft is not None else ""
     st.markdown(f"""
         <div style="display: flex; justify-content: {align};">
             <div class="{bubble_class}">
-                {msg["content"]}
-                <div class="chat-timestamp" style="text-align: {'right' if msg['role'] == 'user' else 'left'};">{msg.get('timestamp', '')}</div>
+                {msg.content}
+                <div class="chat-timestamp" style="text-align: {'right' if msg.role == 'user' else 'left'};">{msg.timestamp}{ttft_note}</div>
             </div>
         </div>
     """, unsafe_allow_html=True)
 
+# Speech for the latest reply; synthesized in the background, the text never waits for it
+@st.fragment(run_every=1)
+def wait_for_audio(key):
+    if tts.status(key) != "pending":
+        st.rerun(scope="app")
+    st.caption("🔊 …")
+
+def render_audio(key):
+    status = tts.status(key)
+    if status == "ready":
+        st.audio(tts.get(key), format="audio/mp3")
+    elif status == "pending":
+        wait_for_audio(key)
+
+tts = get_tts_service()
+if history[-1].role == "assistant" and history[-1].audio:
+    render_audio(history[-1].audio)
+
 # Placeholder for bot response during typing
 bot_placeholder = st.empty()
 
 # -------------------------------
 # GEMINI & HELPER FUNCTIONS
 # -------------------------------
-def setup_gemini():
-    if st.session_state["model"] is None:
-        genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-        st.session_state["model"] = genai.GenerativeModel("gemini-1.5-flash")
-    return st.session_state["model"]
-
-
-def extract_with_regex(prompt):
-    extracted = {}
-    prompt_lower = prompt.lower()
-    patterns = {
-        'N': r'(?:n|nitrogen)\D*(\d+\.?\d*)', 'P': r'(?:p|phosphorus)\D*(\d+\.?\d*)',
-        'K': r'(?:k|potassium)\D*(\d+\.?\d*)', 'ph': r'(?:ph)\D*(\d+\.?\d*)',
-        'temperature': r'(?:temp|temperature)\D*(\d+\.?\d*)',
-        'humidity': r'(?:hum|humidity)\D*(\d+\.?\d*)', 'rainfall': r'(?:rain|rainfall)\D*(\d+\.?\d*)'
-    }
-    for key, pattern in patterns.items():
-        match = re.search(pattern, prompt_lower)
-        if match:
-            try:
-                extracted[key] = float(match.group(1))
-            except:
-                pass
-    return extracted
+@st.cache_resource
+def get_llm_client():
+    """
+    One streaming LLM client per server process (Gemini, or the local
+    server in AGRIBOT_LLM_URL, see llm_client.py), behind a response cache
+    shared by all sessions.
+    """
+    try:
+        api_key = st.secrets["GOOGLE_API_KEY"]
+    except Exception:
+        api_key = None
+    try:
+        return CachedLLMClient(make_llm_client(api_key), ResponseCache())
+    except Exception as e:
+        st.warning(f"LLM client unavailable: {e}")
+        return None
+
 
 def extract_parameters_strict(prompt, llm_model):
-    if not llm_model:
-        return extract_with_regex(prompt)
+    """
+    Local extractor first; the LLM is only asked when it is not confident.
+    """
+    local_params, confidence = extract_local(prompt)
+    if confidence >= LOCAL_CONFIDENCE_THRESHOLD or not llm_model:
+        EXTRACTION_STATS["local"] += 1
+        return local_params
+    EXTRACTION_STATS["llm"] += 1
     extraction_prompt = f"Extract ONLY numeric values for: {FEATURES}. Return JSON like {{\"N\": 90, \"ph\": 6.5}}. If unsure, return {{}}. USER: \"{prompt}\""
     try:
-        response = llm_model.generate_content(extraction_prompt, generation_config={"temperature": 0.1})
-        raw_text = response.text.strip().replace("json", "").replace("", "").strip()
+        response = llm_model.generate(extraction_prompt, temperature=0.1, cache_text=prompt, kind="extract")
+        raw_text = response.strip().replace("```json", "").replace("```", "").strip()
         data = json.loads(raw_text)
         if isinstance(data, dict):
             return {key: float(value) for key, value in data.items() if key in FEATURES and isinstance(value, (int, float))}
     except Exception:
-        return extract_with_regex(prompt)
+        pass
+    return local_params
 
-def generate_free_response(prompt, llm_model, lang):
+def build_free_prompt(prompt, lang, passages=()):
     lang_note = "Respond in Hindi. Be helpful, friendly, and use emojis." if lang == "हिंदी" else "Respond in English. Be helpful, friendly, and use emojis."
-    full_prompt = f"""
+    context = ""
+    if passages:
+        context = "Use these AgriBot notes if they are relevant:\n    " + "\n    ".join(f"- {p}" for p in passages) + "\n"
+    return f"""
     You are AgriBot, a friendly expert farming assistant in India. {lang_note}
     Answer the following question in simple, clear bullet points. Use line breaks for readability.
     DO NOT use Markdown like ** or ###. Use plain text with • for bullets
     keep answer short.
+    {context}
     Question: {prompt}
     """
+
+def knowledge_answer(prompt, lang):
+    """
+    (direct answer or None, top hits) from the local knowledge index.
+    """
+    hits = knowledge.search(prompt, k=3, lang=get_lang_code(lang))
+    return knowledge.direct_answer(prompt, hits, lang=get_lang_code(lang)), hits
+
+def stream_free_response(prompt, llm_model, lang):
+    """
+    Answer from the knowledge index when it clearly matches; otherwise yield
+    the LLM answer chunk by chunk, with the top passages as context.
+    """
+    answer, hits = knowledge_answer(prompt, lang)
+    if answer is not None:
+        yield answer
+        return
     try:
-        response = llm_model.generate_content(full_prompt, generation_config={"temperature": 0.7})
-        return response.text.strip()
+        yield from llm_model.stream(build_free_prompt(prompt, lang, knowledge.passages(hits)),
+                                    temperature=0.7, cache_text=prompt, lang=lang)
     except Exception:
-        return "I'm having trouble thinking right now. Try again in a moment 🙏"
+        yield "I'm having trouble thinking right now. Try again in a moment 🙏"
 
-# ✅ FIXED: Typing Effect Simulator — No flicker, clean rendering
-def simulate_typing(text, placeholder, delay=0.01, chunk_size=20):
+def generate_free_response(prompt, llm_model, lang):
+    return "".join(stream_free_response(prompt, llm_model, lang)).strip()
+
+# Renders real LLM chunks into the bot bubble as they arrive (no artificial delays)
+def render_stream(chunks, placeholder, prefix=""):
+    """
+    Returns the full text and the time-to-first-token in seconds.
+    """
     full_html_template = """
     <div style="display: flex; justify-content: flex-start;">
         <div class="bot-message">
@@ -427,33 +508,64 @@ def simulate_typing(text, placeholder, delay=0.01, chunk_size=20):
     """
     timestamp = datetime.now().strftime("%H:%M")
 
-    displayed_text = ""
-    for i in range(0, len(text), chunk_size):
-        displayed_text += text[i:i+chunk_size]
+    start = time.perf_counter()
+    ttft = None
+    displayed_text = prefix
+    for chunk in chunks:
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        displayed_text += chunk
         safe_text = displayed_text.replace("\n", "<br>")
         rendered_html = full_html_template.format(
             typed_text=safe_text,
             timestamp=timestamp
         )
         placeholder.markdown(rendered_html, unsafe_allow_html=True)
-        time.sleep(delay)
+    return displayed_text.strip(), ttft
 
 
-llm = setup_gemini()
+llm = get_llm_client()
 
 # -------------------------------
-# CHAT INPUT & PROCESSING LOGIC — WITH TYPING EFFECT
+# CHAT INPUT & PROCESSING LOGIC — STREAMED RESPONSES
 # -------------------------------
-if user_input := st.chat_input("Ask about crops, soil, or pests..."):
-    st.session_state.messages.append({
-        "role": "user",
-        "content": user_input,
-        "timestamp": datetime.now().strftime("%H:%M")
-    })
+def diagnose_photo(data, lang):
+    """
+    Diagnose a leaf photo with the shared disease model and return the reply HTML.
+    """
+    try:
+        quality_gate.check(data)
+        label, confidence = disease_service.diagnose(data)
+    except ImageQualityError as e:
+        problems = ", ".join(t["quality_problems"][p] for p in e.report["problems"])
+        return t["photo_quality"].format(problems=problems)
+    except Exception:
+        return t["photo_failed"]
+    crop, _, disease = label.partition("___")
+    name = f"{crop} {disease}".replace("_", " ").strip()
+    header = f'<div class="disease-section">{t["photo_diagnosis"]}: {html.escape(name)} ({confidence:.1f}%)</div>'
+    if disease.lower() == "healthy":
+        return header + t["photo_healthy"]
+    remedy = DISEASE_REMEDIES.get(label)
+    return header + (remedy[get_lang_code(lang)] if remedy else t["photo_no_remedy"])
+
+# the model loads in the background so the first photo is answered quickly
+disease_service = get_disease_service().warmup_async()
+quality_gate = get_quality_gate()
+
+if submission := st.chat_input("Ask about crops, soil, or pests... or attach a leaf photo 📷",
+                               accept_file=True, file_type=["jpg", "jpeg", "png"]):
+    text = submission.text or ""
+    if submission.files:
+        photo = submission.files[0]
+        st.session_state.pending_photo = photo.getvalue()
+        text = f"📷 {html.escape(photo.name)}" + (f"<br>{html.escape(text)}" if text else "")
+    st.session_state.messages.append("user", text)
+    st.session_state.visible_messages = VISIBLE_MESSAGES
     st.rerun()
 
-if st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
-    last_user_message = st.session_state.messages[-1]["content"]
+if history and history[-1].role == "user":
+    last_user_message = history[-1].content
     
     with bot_placeholder.container():
         st.markdown("""
@@ -462,15 +574,20 @@ if st.session_state.messages and st.session_state.messages[-1]["role"] == "user"
                 <span class="typing-dots"><span></span><span></span><span></span></span>
             </div>
         """, unsafe_allow_html=True)
-        time.sleep(1.2)
 
     response_content = ""
-    user_input_lower = last_user_message.lower()
-    disease_found = next((key for key in DISEASE_REMEDIES if key != "default" and key.lower().replace("_", " ") in user_input_lower), None)
+    ttft = None
+    mentioned = resolve_diseases(disease_index.find_all(last_user_message))
+    disease_found = next((label for label in mentioned if label in DISEASE_REMEDIES), None)
+
+    photo = st.session_state.pop("pending_photo", None)
 
-    if disease_found:
+    if photo is not None:
+        response_content = diagnose_photo(photo, lang)
+        streamed = False
+    elif disease_found:
         response_content = DISEASE_REMEDIES[disease_found][get_lang_code(lang)]
-        is_typing_effect = False
+        streamed = False
     elif llm:
         extracted = extract_parameters_strict(last_user_message, llm)
         if extracted:
@@ -488,50 +605,41 @@ if st.session_state.messages and st.session_state.messages[-1]["role"] == "user"
                 rec_html += f"{i+1}. {name}** — {score:.1%} confidence\n"
             response_content = rec_html
             st.session_state.chat_crop_params = {}
-            is_typing_effect = False
+            streamed = False
         else:
-            raw_response = generate_free_response(last_user_message, llm, lang)
-            response_content = f"{t['thanks_for_info']} {raw_response}" if extracted else raw_response
-            is_typing_effect = True
+            # the streamed bubble replaces the thinking bubble on the first chunk
+            prefix = f"{t['thanks_for_info']} " if extracted else ""
+            response_content, ttft = render_stream(
+                stream_free_response(last_user_message, llm, lang), bot_placeholder, prefix
+            )
+            streamed = True
     else:
-        response_content = "🤖 My AI core is offline. Please try again later."
-        is_typing_effect = False
-
-    bot_placeholder.empty()
+        answer, _ = knowledge_answer(last_user_message, lang)
+        response_content = answer or "🤖 My AI core is offline. Please try again later."
+        streamed = False
 
-    st.session_state.messages.append({
-        "role": "assistant",
-        "content": response_content,
-        "timestamp": datetime.now().strftime("%H:%M")
-    })
-    lang_code = "hi" if lang == "हिंदी" else "en"
-    audio_stream = speak_text(response_content, lang_code=lang_code)
-    if audio_stream:
-        st.audio(audio_stream, format="audio/mp3")
+    if not streamed:
+        bot_placeholder.empty()
 
+    reply = history.append(
+        "assistant", response_content, ttft=ttft,
+        audio=tts.request(response_content, get_lang_code(lang))
+    )
 
-
-    if is_typing_effect:
-        # This block will be skipped now, we'll rerun to render the typing effect
-        pass
-    else:
-        # For non-typing content (crop/disease) — render immediately
+    if not streamed:
+        # For non-streamed content (crop/disease) — render immediately
         st.rerun()
+    elif reply.audio:
+        render_audio(reply.audio)
 
-if st.session_state.messages and st.session_state.messages[-1]["role"] == "assistant":
-    last_bot_message = st.session_state.messages[-1]
-    # This logic assumes the 'is_typing_effect' flag was conceptually passed
-    # In a real scenario, you might store this flag in the message dict
-    # For now, we heuristically decide based on content
-    is_html = "<div" in last_bot_message["content"]
-    
-    if not is_html: # Apply typing effect to plain text
-         # The placeholder needs to be redefined here if it was cleared
-        bot_typing_placeholder = st.empty()
-        simulate_typing(last_bot_message['content'], bot_typing_placeholder)
-        
-# A better way to handle the rerun logic
-# The logic above is slightly flawed because of reruns clearing placeholders.
-# A more stable pattern is to not mix direct rendering and reruns so heavily.
-# But for the purpose of fixing the immediate code, the primary issue was in the main
-# CHAT INPUT block. The corrected logic simplifies the final step.
+# -------------------------------
+# LLM CACHE STATS
+# -------------------------------
+if llm:
+    cache_stats = llm.stats()
+    mean_ttft = llm.mean_ttft()
+    st.caption(
+        f"LLM cache: {cache_stats['hit_rate']:.0%} hit rate over {cache_stats['requests']} requests"
+        + (f" · mean first token {mean_ttft:.2f}s" if mean_ttft is not None else "")
+        + f" · {EXTRACTION_STATS['local']} extraction calls answered locally"
+    )
@@ -1,6 +1,7 @@
 import streamlit as st
 import os
-from diseases_prediction import predict_disease
+from diseases_prediction import predict_disease, get_disease_service
+from image_quality import ImageQualityError, get_quality_gate
 
 # -------------------------------
 # Page Config
@@ -11,6 +12,11 @@ st.set_page_config(
     page_icon="🌾",
 )
 
+# same warm model instance as the chat; loads in the background on first visit
+disease_service = get_disease_service().warmup_async()
+# a few milliseconds on a downscaled copy, before any photo reaches the model
+quality_gate = get_quality_gate()
+
 # -------------------------------
 # CSS for Transparent UI
 # -------------------------------
@@ -89,7 +95,14 @@ trans = {
         "upload": "Upload Crop Image",
         "predict": "🔍 Predict Disease",
         "result": "🩺 Disease Prediction",
-        "probabilities": "📊 Probabilities"
+        "probabilities": "📊 Probabilities",
+        "quality_rejected": "📷 This photo looks {problems}. Retake it in daylight, close to one leaf, or analyze it anyway.",
+        "quality_problems": {"blurry": "blurry", "dark": "too dark", "overexposed": "overexposed", "no_leaf": "like it has no leaf in it"},
+        "analyze_anyway": "Analyze anyway",
+        "tiled": "🔬 Detailed scan (slower, finds small spots on large photos)",
+        "tiled_caption": "Scanned {tiles} of {available} leaf tiles{early}",
+        "tiled_early": ", stopped at the first clear lesion",
+        "quality_stats": "Quality check: {rejected} of {checked} photos stopped before the model ({avoided})"
     },
     "हिंदी": {
         "hero_title": "🌱 फसल रोग पहचान",
@@ -97,7 +110,14 @@ trans = {
         "upload": "फसल छवि अपलोड करें",
         "predict": "🔍 रोग पहचानें",
         "result": "🩺 रोग की भविष्यवाणी",
-        "probabilities": "📊 संभावनाएँ"
+        "probabilities": "📊 संभावनाएँ",
+        "quality_rejected": "📷 यह फोटो {problems} लग रही है। दिन की रोशनी में एक पत्ती के पास से फिर से फोटो लें, या फिर भी जाँच करें।",
+        "quality_problems": {"blurry": "धुंधली", "dark": "बहुत अंधेरी", "overexposed": "बहुत ज़्यादा रोशनी वाली", "no_leaf": "बिना पत्ती की"},
+        "analyze_anyway": "फिर भी जाँच करें",
+        "tiled": "🔬 विस्तृत जाँच (धीमी, बड़ी फोटो में छोटे धब्बे भी पकड़ती है)",
+        "tiled_caption": "{available} में से {tiles} पत्ती-खंड जाँचे गए{early}",
+        "tiled_early": ", पहला स्पष्ट धब्बा मिलते ही रुके",
+        "quality_stats": "गुणवत्ता जाँच: {checked} में से {rejected} फोटो मॉडल से पहले रोकी गईं ({avoided})"
     }
 }
 
@@ -155,11 +175,37 @@ if image_source is not None:
 
     st.image(img_path, caption="Selected Image", use_column_width=True)
 
+    force = False
+    if st.session_state.get("quality_rejected") == img_path:
+        problems = ", ".join(t["quality_problems"][p] for p in st.session_state.quality_problems)
+        st.warning(t["quality_rejected"].format(problems=problems))
+        force = st.checkbox(t["analyze_anyway"], key="analyze_anyway")
+        stats = quality_gate.report(disease_service.inference_ms())
+        avoided = f"~{stats['avoided_inference_ms']:.0f} ms" if "avoided_inference_ms" in stats else "-"
+        st.caption(t["quality_stats"].format(rejected=stats["rejected"], checked=stats["checked"], avoided=avoided))
+
+    tiled = st.checkbox(t["tiled"], key="tiled_scan")
+
     if st.button(t["predict"]):
+        try:
+            # a forced photo was already checked and counted when it was rejected
+            if not force:
+                quality_gate.check(img_path)
+        except ImageQualityError as e:
+            st.session_state.quality_rejected = img_path
+            st.session_state.quality_problems = e.report["problems"]
+            st.rerun()
         with st.spinner("Analyzing image..."):
-            predicted_class, prediction_probs = predict_disease(img_path)
+            if tiled:
+                scan = disease_service.predict_tiled(img_path)
+                predicted_class, prediction_probs = scan["label"], scan["confidence"]
+            else:
+                predicted_class, prediction_probs = predict_disease(img_path)
 
         st.subheader(t["result"])
+        if tiled:
+            st.caption(t["tiled_caption"].format(tiles=scan["tiles"], available=scan["tiles_available"],
+                                                 early=t["tiled_early"] if scan["early_exit"] else ""))
         st.success(f"*Prediction:* {predicted_class} ({prediction_probs:.2f}%)")
 
         st.subheader(t["probabilities"])
@@ -0,0 +1,235 @@
+"""
+Local extraction of crop model parameters (N, P, K, temperature, humidity,
+ph, rainfall) from chat messages.
+
+extract_local() runs before any LLM call. It uses precompiled patterns and
+understands units, Hindi keywords, Devanagari digits and number words. It
+returns the values it found and a confidence score. The chat only asks the
+LLM when the confidence is below LOCAL_CONFIDENCE_THRESHOLD.
+"""
+
+import re
+from collections import Counter
+
+LOCAL_CONFIDENCE_THRESHOLD = 0.8
+
+# process-wide counters: how often the local extractor was enough
+EXTRACTION_STATS = Counter()
+
+# plausible input ranges; values outside are dropped and lower the confidence
+VALID_RANGES = {
+    "N": (0, 1000), "P": (0, 1000), "K": (0, 1000),
+    "temperature": (-20, 60), "humidity": (0, 100),
+    "ph": (0, 14), "rainfall": (0, 5000),
+}
+
+KEYWORDS = {
+    "ph": [r"(?<![a-z])p\.?\s?h\b", r"पीएच", r"पी\s?एच"],
+    "N": [r"nitrogen", r"\bn\b", r"नाइट्रोजन", r"नत्रजन"],
+    "P": [r"phosph?or(?:o)?us", r"\bp\b", r"फॉस्फोरस", r"फास्फोरस"],
+    "K": [r"potassium", r"potash", r"\bk\b", r"पोटेशियम", r"पोटैशियम", r"पोटाश"],
+    "temperature": [r"temperature", r"\btemp\b", r"तापमान"],
+    "humidity": [r"humidity", r"\bhumid\b", r"आर्द्रता", r"आद्रता", r"नमी"],
+    "rainfall": [r"rain\s?fall", r"\brain\b", r"precipitation", r"वर्षा", r"बारिश"],
+}
+_KEYWORD_RE = re.compile(
+    "|".join(f"(?P<{name.lower()}_kw>{'|'.join(pats)})" for name, pats in KEYWORDS.items())
+)
+_GROUP_TO_FEATURE = {f"{name.lower()}_kw": name for name in KEYWORDS}
+
+_DEVANAGARI_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+_WORD_NUMBERS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60,
+    "seventy": 70, "eighty": 80, "ninety": 90,
+    "एक": 1, "दो": 2, "तीन": 3, "चार": 4, "पांच": 5, "पाँच": 5, "छह": 6, "छः": 6, "सात": 7,
+    "आठ": 8, "नौ": 9, "दस": 10, "बीस": 20, "पच्चीस": 25, "तीस": 30, "चालीस": 40,
+    "पचास": 50, "साठ": 60, "सत्तर": 70, "अस्सी": 80, "नब्बे": 90,
+}
+_MULTIPLIERS = {"hundred": 100, "thousand": 1000, "सौ": 100, "हज़ार": 1000, "हजार": 1000}
+_NUMBER_WORD = "|".join(
+    sorted(map(re.escape, list(_WORD_NUMBERS) + list(_MULTIPLIERS) + ["point"]), key=len, reverse=True)
+)
+# \w misses Devanagari vowel signs, so word boundaries include the whole block
+_LETTER = r"[\w\u0900-\u097F]"
+
+# a number (digits or number words) with an optional unit right after it
+_NUMBER_RE = re.compile(
+    rf"(?:(?<![\w.])(?P<value>-?\d+(?:\.\d+)?)"
+    rf"|(?P<words>(?<!{_LETTER})(?:{_NUMBER_WORD})(?:[\s-]+(?:and[\s-]+)?(?:{_NUMBER_WORD}))*(?!{_LETTER})))"
+    r"\s*(?P<unit>°?\s?[cf]\b|degrees?\s?(?:c|celsius|f|fahrenheit)?\b|celsius|fahrenheit|डिग्री|"
+    r"%|percent\b|प्रतिशत|"
+    r"mm\b|cm\b|inch(?:es)?\b|मिमी|सेमी|"
+    r"kg\s?/\s?ha\b|mg\s?/\s?kg\b|ppm\b|"
+    r"acres?\b|hectares?\b|bigha\b|days?\b|weeks?\b|months?\b|years?\b|rs\.?|rupees\b|₹|एकड़|दिन)?"
+)
+_UNIT_FEATURE = {"c": "temperature", "f": "temperature", "%": "humidity", "mm": "rainfall",
+                 "cm": "rainfall", "inch": "rainfall"}
+_IGNORED_UNITS = ("acre", "hectare", "bigha", "day", "week", "month", "year", "rs", "rupee", "₹", "एकड़", "दिन")
+
+_NPK_TRIPLE_RE = re.compile(
+    r"\bnpk\b\D{0,12}?(\d+(?:\.\d+)?)\s*[-:,/ ]\s*(\d+(?:\.\d+)?)\s*[-:,/ ]\s*(\d+(?:\.\d+)?)"
+)
+# a keyword and a number separated by one of these probably do not belong together
+_SEPARATOR_RE = re.compile(r"[,;\n।]|\band\b|और|\d")
+
+# keyword and its number may be at most this many characters apart
+MAX_GAP = 24
+
+
+def _words_to_number(phrase):
+    """
+    "twenty five" -> 25, "six point five" -> 6.5, "दो सौ" -> 200; None if meaningless.
+    """
+    tokens = [t for t in re.split(r"[\s-]+", phrase.strip()) if t and t != "and"]
+    if "point" in tokens:
+        i = tokens.index("point")
+        decimals = "".join(str(_WORD_NUMBERS[t]) for t in tokens[i + 1:] if t in _WORD_NUMBERS)
+        if not decimals:
+            return None
+        whole = _words_to_number(" ".join(tokens[:i])) if i else 0
+        return float(f"{int(whole or 0)}.{decimals}")
+    total, current = 0, 0
+    for t in tokens:
+        if t in _WORD_NUMBERS:
+            current += _WORD_NUMBERS[t]
+        elif t in _MULTIPLIERS:
+            current = max(current, 1) * _MULTIPLIERS[t]
+            if _MULTIPLIERS[t] >= 1000:
+                total, current = total + current, 0
+    return float(total + current)
+
+
+def normalize_text(text):
+    """
+    Lower-case and map Devanagari digits to ASCII.
+    """
+    return text.lower().translate(_DEVANAGARI_DIGITS)
+
+
+def _unit_kind(unit):
+    if not unit:
+        return None
+    unit = unit.replace(" ", "")
+    if unit.startswith(("°", "degree")) or unit in ("c", "f", "celsius", "fahrenheit", "डिग्री"):
+        return "f" if unit.endswith("f") or "fahrenheit" in unit else "c"
+    if unit in ("%", "percent", "प्रतिशत"):
+        return "%"
+    if unit in ("mm", "मिमी"):
+        return "mm"
+    if unit in ("cm", "सेमी"):
+        return "cm"
+    if unit.startswith("inch"):
+        return "inch"
+    if unit.startswith(_IGNORED_UNITS):
+        return "ignored"
+    return "mass"
+
+
+def _convert(feature, value, kind):
+    if feature == "temperature" and kind == "f":
+        return (value - 32) * 5 / 9
+    if feature == "rainfall" and kind == "cm":
+        return value * 10
+    if feature == "rainfall" and kind == "inch":
+        return value * 25.4
+    return value
+
+
+def _find_numbers(text):
+    numbers = []
+    for m in _NUMBER_RE.finditer(text):
+        if m.group("value") is not None:
+            value, from_words = float(m.group("value")), False
+        else:
+            value, from_words = _words_to_number(m.group("words")), True
+            if value is None:
+                continue
+        numbers.append({
+            "start": m.start(), "end": m.end("value") if not from_words else m.end("words"),
+            "value": value, "kind": _unit_kind(m.group("unit")),
+            "from_words": from_words, "used": False,
+        })
+    return numbers
+
+
+def extract_local(text):
+    """
+    Extract parameters from a message without calling an LLM.
+    Returns (params, confidence) with confidence in [0, 1]. A message without
+    any numbers is confidently parameter-free.
+    """
+    text = normalize_text(text)
+    numbers = _find_numbers(text)
+    if not numbers:
+        return {}, 1.0
+
+    found = {}
+    penalty = 1.0
+
+    # "NPK 90-42-43" style triples
+    for m in _NPK_TRIPLE_RE.finditer(text):
+        for feature, group in zip(("N", "P", "K"), (1, 2, 3)):
+            found.setdefault(feature, float(m.group(group)))
+            for num in numbers:
+                if num["start"] == m.start(group):
+                    num["used"] = True
+
+    # pair keywords with numbers, cheapest pairs first: numbers after the
+    # keyword are preferred, separators and other keywords in between are not
+    keywords = [(_GROUP_TO_FEATURE[m.lastgroup], m.start(), m.end()) for m in _KEYWORD_RE.finditer(text)]
+    pairs = []
+    for k, (feature, kw_start, kw_end) in enumerate(keywords):
+        for n, num in enumerate(numbers):
+            if num["used"] or num["kind"] == "ignored":
+                continue
+            if num["start"] >= kw_end:
+                between, cost = text[kw_end:num["start"]], 0
+            elif num["end"] <= kw_start:
+                between, cost = text[num["end"]:kw_start], 2
+            else:
+                continue
+            if len(between) > MAX_GAP or _KEYWORD_RE.search(between):
+                continue
+            if _SEPARATOR_RE.search(between):
+                cost += 10
+            pairs.append((cost + len(between.strip()), k, n))
+
+    used_keywords = set()
+    for _, k, n in sorted(pairs):
+        feature = keywords[k][0]
+        num = numbers[n]
+        if k in used_keywords or num["used"] or feature in found:
+            continue
+        used_keywords.add(k)
+        num["used"] = True
+        found[feature] = _convert(feature, num["value"], num["kind"])
+
+    # numbers whose unit alone names the parameter ("28°C", "200 mm")
+    for num in numbers:
+        if num["used"]:
+            continue
+        if num["kind"] == "ignored":
+            num["used"] = True
+            continue
+        feature = _UNIT_FEATURE.get(num["kind"])
+        if feature and feature not in found:
+            num["used"] = True
+            found[feature] = _convert(feature, num["value"], num["kind"])
+            penalty *= 0.9
+
+    for feature in list(found):
+        low, high = VALID_RANGES[feature]
+        if not low <= found[feature] <= high:
+            del found[feature]
+            penalty *= 0.5
+
+    # stray number words ("which one is better") are not a sign of missed values
+    relevant = [num for num in numbers if num["used"] or not num["from_words"]]
+    if not relevant:
+        return {}, 1.0
+    explained = sum(1 for num in relevant if num["used"])
+    confidence = explained / len(relevant) * penalty
+    return {k: round(v, 2) for k, v in found.items()}, round(confidence, 3)
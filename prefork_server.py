@@ -0,0 +1,273 @@
+"""
+Pre-fork serving for api_server.py with models shared between workers.
+
+`python api_server.py --workers N` starts N independent interpreters and each
+unpickles its own copy of the crop Pipeline, so RAM grows linearly with N.
+Here the parent loads the crop model once, as the memory-mapped FlatForest
+from flat_forest.py, freezes the GC so collections in the children do not
+write to the inherited objects, binds the socket and forks the workers. The
+forest arrays are file-backed pages shared by every worker (and by any other
+process mapping the same files); the rest of the parent's heap is shared
+copy-on-write.
+
+TensorFlow is imported in the parent too (its modules and op registry are
+a few hundred MB per process), but the disease model itself is still built
+by each worker after the fork: TensorFlow starts its runtime thread pools
+when the first op runs, and those do not survive a fork.
+
+Usage:
+  python prefork_server.py --port 8000 --workers 4
+  python prefork_server.py --report --workers-list 1 2 4   (RSS/PSS vs api_server.py --workers)
+"""
+
+import argparse
+import gc
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from flat_forest import FLAT_DIR, load_flat_forest
+
+
+# -------------------------------
+# Serving
+# -------------------------------
+def load_shared_models(flat_dir=FLAT_DIR, preload_tensorflow=True):
+    """
+    Fill api_server.Models in the parent, before any worker exists.
+    """
+    import api_server
+
+    if Path(flat_dir, "meta.json").exists():
+        forest = load_flat_forest(flat_dir)
+        forest.touch()
+        api_server.Models.crop = forest
+        print(f"Crop model: {forest.n_trees} trees memory-mapped from {flat_dir}")
+    else:
+        # still shared copy-on-write, but reference counting gradually copies the pages
+        api_server._load_crop_model()
+        print(f"⚠️ {flat_dir} not found, sharing the pickled Pipeline instead "
+              f"(run flat_forest.py to export the mmapped forest)")
+    if preload_tensorflow:
+        import tensorflow  # noqa: F401  (module import only; no op may run before the fork)
+    return api_server.app
+
+
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock):
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="on"))
+    server.run(sockets=[sock])
+
+
+def fork_worker(app, sock):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(app, sock)
+        except BaseException:
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(host, port, workers, flat_dir=FLAT_DIR, preload_tensorflow=True):
+    app = load_shared_models(flat_dir, preload_tensorflow)
+    sock = bind_socket(host, port)
+    # everything allocated so far is long-lived: keep the collector from touching (and copying) it
+    gc.collect()
+    gc.freeze()
+
+    children = {fork_worker(app, sock) for _ in range(workers)}
+    print(f"Serving on http://{host}:{port} with {workers} pre-forked workers (parent pid {os.getpid()})")
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited ({os.waitstatus_to_exitcode(status)}), starting a new one")
+            children.add(fork_worker(app, sock))
+    sock.close()
+
+
+# -------------------------------
+# Memory report
+# -------------------------------
+def process_tree(pid):
+    """
+    pid and all of its descendants.
+    """
+    pids, queue = [], [pid]
+    while queue:
+        p = queue.pop()
+        pids.append(p)
+        try:
+            with open(f"/proc/{p}/task/{p}/children", "r") as f:
+                queue.extend(int(c) for c in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def memory_kb(pid):
+    """
+    {"Rss": kB, "Pss": kB, "Private": kB} from /proc/<pid>/smaps_rollup.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        return None
+    return {
+        "Rss": fields.get("Rss", 0),
+        "Pss": fields.get("Pss", 0),
+        "Private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def _get(port, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        conn.request("POST" if body is not None else "GET", path, body=body, headers=headers)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def wait_for_workers(port, workers, timeout):
+    """
+    Poll /health on fresh connections until every worker has answered once.
+    """
+    seen, deadline = set(), time.time() + timeout
+    while time.time() < deadline and len(seen) < workers:
+        try:
+            status, body = _get(port, "/health")
+            if status == 200:
+                seen.add(json.loads(body)["pid"])
+                continue
+        except (OSError, http.client.HTTPException, ValueError, KeyError):
+            pass
+        time.sleep(0.2)
+    return len(seen)
+
+
+def measure(command, port, workers, timeout, requests):
+    from load_test import SAMPLE
+
+    proc = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        answered = wait_for_workers(port, workers, timeout)
+        body = json.dumps({**SAMPLE, "k": 3}).encode()
+        for _ in range(requests):
+            _get(port, "/recommend", body)
+        time.sleep(1.0)
+        tree = process_tree(proc.pid)
+        mem = {pid: memory_kb(pid) for pid in tree}
+        mem = {pid: m for pid, m in mem.items() if m is not None}
+    finally:
+        proc.send_signal(signal.SIGINT)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            for pid in process_tree(proc.pid)[::-1]:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            proc.wait()
+    # the largest processes are the workers; the rest is supervisor/parent overhead
+    by_rss = sorted(mem.values(), key=lambda m: -m["Rss"])
+    worker_mem = by_rss[:workers]
+    return {
+        "answered": answered,
+        "processes": len(mem),
+        "worker_rss_mb": sum(m["Rss"] for m in worker_mem) / len(worker_mem) / 1024,
+        "worker_private_mb": sum(m["Private"] for m in worker_mem) / len(worker_mem) / 1024,
+        "total_rss_mb": sum(m["Rss"] for m in mem.values()) / 1024,
+        "total_pss_mb": sum(m["Pss"] for m in mem.values()) / 1024,
+    }
+
+
+def report(worker_counts, port, flat_dir, timeout, requests):
+    modes = {
+        "independent": lambda n: [sys.executable, "api_server.py", "--port", str(port), "--workers", str(n)],
+        "prefork": lambda n: [sys.executable, "prefork_server.py", "--port", str(port), "--workers", str(n),
+                              "--flat", str(flat_dir)],
+    }
+    header = (f"{'mode':<12} {'workers':>7} {'RSS/worker':>11} {'private/worker':>15} "
+              f"{'total RSS':>10} {'total PSS':>10}")
+    print(header)
+    print("-" * len(header))
+    for n in worker_counts:
+        for mode, command in modes.items():
+            r = measure(command(n), port, n, timeout, requests * n)
+            note = "" if r["answered"] == n else f"  ({r['answered']}/{n} workers answered)"
+            print(f"{mode:<12} {n:>7} {r['worker_rss_mb']:>9.0f}MB {r['worker_private_mb']:>13.0f}MB "
+                  f"{r['total_rss_mb']:>8.0f}MB {r['total_pss_mb']:>8.0f}MB{note}")
+    print("\nRSS counts shared pages in every process; PSS splits them between the processes mapping them, "
+          "so total PSS is the real footprint.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork AgriBot API server with shared models.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--flat", default=FLAT_DIR.as_posix(), help="directory written by flat_forest.py")
+    parser.add_argument("--no-preload-tensorflow", dest="preload_tensorflow", action="store_false",
+                        help="import TensorFlow in each worker instead of the parent")
+    report_args = parser.add_argument_group("memory report")
+    report_args.add_argument("--report", action="store_true", help="compare memory against api_server.py --workers")
+    report_args.add_argument("--workers-list", type=int, nargs="+", default=[1, 2, 4])
+    report_args.add_argument("--timeout", type=float, default=180.0, help="seconds to wait for workers to start")
+    report_args.add_argument("--requests", type=int, default=25, help="/recommend calls per worker before measuring")
+    args = parser.parse_args()
+
+    if args.report:
+        report(args.workers_list, args.port, args.flat, args.timeout, args.requests)
+    else:
+        serve(args.host, args.port, args.workers, args.flat, args.preload_tensorflow)
+
+
+if __name__ == "__main__":
+    main()
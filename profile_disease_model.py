@@ -0,0 +1,190 @@
+"""
+Per-layer CPU profile of a served disease model.
+
+For every leaf layer (descending into nested models such as the MobileNet
+backbone) the script records forward time, output activation size,
+parameter count and FLOPs, for each batch size of a sweep. Each layer is
+timed on its real input: the activations of one full forward pass are
+captured first, then every layer runs on its own as a traced tf.function.
+Each per-layer time includes one function call, whose cost is measured
+separately and subtracted in the "net ms" column; shares and GFLOP/s use
+the net time. The whole-model forward pass is timed too, for comparison.
+
+Writes the table as CSV and a Chrome trace (chrome://tracing or
+https://ui.perfetto.dev): one process per batch size, the layers laid out
+back to back by their median time.
+
+Usage:
+  python profile_disease_model.py [plant_disease_model.h5] [--batch-sizes 1 8 32] [--runs 20]
+  python profile_disease_model.py plant_disease_mobilenet.keras --csv mobilenet_layers.csv --trace mobilenet.json
+"""
+
+import argparse
+import csv
+import json
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from disease_benchmark import ZERO_COST_LAYERS, layer_flops, model_input_size
+from diseases_prediction import DISEASE_MODEL_PATH
+
+
+def _call_input(layer):
+    if isinstance(layer, tf.keras.Model):
+        # a nested model's .input is its own Input layer, not the tensor it is called on here
+        tensors = layer._inbound_nodes[-1].input_tensors
+        return tensors[0] if len(tensors) == 1 else tensors
+    return layer.input
+
+
+def layer_inputs(model, x):
+    """
+    Yield (layer, input value) for every leaf layer of one forward pass of x,
+    recursing into nested models.
+    """
+    layers = [layer for layer in model.layers if type(layer).__name__ != "InputLayer"]
+    probe = tf.keras.Model(model.inputs, [_call_input(layer) for layer in layers])
+    values = probe(x, training=False)
+    for layer, value in zip(layers, values):
+        if isinstance(layer, tf.keras.Model):
+            yield from layer_inputs(layer, value)
+        else:
+            yield layer, value
+
+
+def median_ms(fn, x, runs, warmup=2):
+    for _ in range(warmup):
+        out = fn(x)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = fn(x)
+        times.append((time.perf_counter() - start) * 1000)
+    # CPU eager execution is synchronous, so the call has finished its work when it returns
+    return float(np.median(times)), out
+
+
+def _nbytes(value):
+    return sum(int(np.prod(t.shape)) * t.dtype.size for t in tf.nest.flatten(value))
+
+
+def profile(model, batch_size, runs, skip=()):
+    """
+    One row per leaf layer for a batch, plus the whole-model forward time in ms.
+    Layers whose type is in skip are not timed, and shares are of the rest.
+    """
+    h, w = model_input_size(model)
+    x = tf.random.uniform((batch_size, h, w, 3))
+    whole = tf.function(lambda t: model(t, training=False))
+    model_ms, _ = median_ms(whole, x, runs)
+    # cost of calling a traced function at all; every per-layer time includes it once
+    overhead_ms, _ = median_ms(tf.function(lambda t: tf.identity(t[:1, :1, :1, :1])), x, runs)
+
+    rows = []
+    for layer, value in layer_inputs(model, x):
+        if type(layer).__name__ in skip:
+            continue
+        fn = tf.function(lambda t, layer=layer: layer(t, training=False))
+        ms, out = median_ms(fn, value, runs)
+        flops = layer_flops(layer) * batch_size
+        rows.append({
+            "batch": batch_size,
+            "layer": layer.name,
+            "type": type(layer).__name__,
+            "output": "x".join(str(d) for d in tf.nest.flatten(out)[0].shape[1:]),
+            "params": int(layer.count_params()),
+            "mflops": flops / 1e6,
+            "ms": ms,
+            "net_ms": max(ms - overhead_ms, 0.0),
+            "input_mb": _nbytes(value) / 2**20,
+            "output_mb": _nbytes(out) / 2**20,
+        })
+    net_total = sum(r["net_ms"] for r in rows)
+    for r in rows:
+        r["share"] = r["net_ms"] / net_total if net_total else 0.0
+        r["gflops_per_s"] = r["mflops"] / r["net_ms"] if r["net_ms"] > 0 else 0.0
+    return rows, model_ms, overhead_ms
+
+
+def print_table(rows, model_ms, overhead_ms, top=None):
+    batch = rows[0]["batch"]
+    layer_total = sum(r["ms"] for r in rows)
+    net_total = sum(r["net_ms"] for r in rows)
+    # a layer's input and output are both alive while it runs
+    peak = max(rows, key=lambda r: r["input_mb"] + r["output_mb"])
+    print(f"\nbatch {batch}: model forward {model_ms:.2f} ms, sum of layers {layer_total:.2f} ms, "
+          f"{net_total:.2f} ms without the {overhead_ms:.3f} ms call overhead per layer, "
+          f"params {sum(r['params'] for r in rows):,}, {sum(r['mflops'] for r in rows):,.0f} MFLOPs, "
+          f"peak activations {peak['input_mb'] + peak['output_mb']:.1f} MB at {peak['layer']}")
+    header = (f"{'layer':<28} {'type':<20} {'output':>14} {'params':>11} {'MFLOPs':>10} "
+              f"{'ms':>8} {'net ms':>8} {'share':>6} {'GFLOP/s':>8} {'out MB':>8}")
+    print(header)
+    print("-" * len(header))
+    shown = sorted(rows, key=lambda r: -r["net_ms"])[:top] if top else rows
+    for r in shown:
+        print(f"{r['layer'][:28]:<28} {r['type'][:20]:<20} {r['output']:>14} {r['params']:>11,} "
+              f"{r['mflops']:>10.1f} {r['ms']:>8.3f} {r['net_ms']:>8.3f} {r['share']:>6.1%} {r['gflops_per_s']:>8.1f} "
+              f"{r['output_mb']:>8.2f}")
+
+
+def chrome_trace(results, model_name):
+    """
+    Trace events: one process per batch size, layers back to back on one thread.
+    """
+    events = []
+    for pid, (rows, model_ms) in enumerate(results, start=1):
+        batch = rows[0]["batch"]
+        events.append({"ph": "M", "name": "process_name", "pid": pid,
+                       "args": {"name": f"{model_name} batch {batch}"}})
+        events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": 1, "args": {"name": "layers"}})
+        events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": 2, "args": {"name": "model"}})
+        events.append({"ph": "X", "name": "forward", "cat": "model", "pid": pid, "tid": 2,
+                       "ts": 0, "dur": model_ms * 1000})
+        ts = 0.0
+        for r in rows:
+            events.append({
+                "ph": "X", "name": r["layer"], "cat": r["type"], "pid": pid, "tid": 1,
+                "ts": ts, "dur": r["ms"] * 1000,
+                "args": {k: r[k] for k in ("output", "params", "mflops", "net_ms", "gflops_per_s", "output_mb")},
+            })
+            ts += r["ms"] * 1000
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-layer latency and memory profile of a disease model.")
+    parser.add_argument("model", nargs="?", default=DISEASE_MODEL_PATH, help=".h5 / .keras model")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--runs", type=int, default=20, help="timed calls per layer and batch size")
+    parser.add_argument("--top", type=int, default=None, help="print only the slowest N layers per batch")
+    parser.add_argument("--csv", default="disease_layer_profile.csv")
+    parser.add_argument("--trace", default="disease_layer_trace.json")
+    parser.add_argument("--skip-trivial", action="store_true",
+                        help=f"leave out data-movement layers ({', '.join(ZERO_COST_LAYERS)})")
+    args = parser.parse_args()
+
+    if args.model.endswith(".tflite"):
+        raise SystemExit("per-layer timing needs the Keras model; profile the .h5/.keras it was converted from")
+    model = tf.keras.models.load_model(args.model, compile=False)
+    results = []
+    for batch_size in args.batch_sizes:
+        rows, model_ms, overhead_ms = profile(model, batch_size, args.runs,
+                                              skip=ZERO_COST_LAYERS if args.skip_trivial else ())
+        results.append((rows, model_ms))
+        print_table(rows, model_ms, overhead_ms, args.top)
+
+    with open(args.csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0][0][0]) + ["model_ms"])
+        writer.writeheader()
+        for rows, model_ms in results:
+            for r in rows:
+                writer.writerow({**r, "model_ms": model_ms})
+    with open(args.trace, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(results, args.model), f)
+    print(f"\nSaved {args.csv} and {args.trace}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,31 @@
 """
 Train Plant Disease Detection Model using PlantVillage Dataset.
+
+Two architectures are available:
+  - cnn:       the original 3-block CNN (Flatten -> Dense 256), 150x150 input
+  - mobilenet: MobileNetV3-Small backbone with global pooling and a softmax head,
+               backbone weights loaded from a local file (no download)
+
+The full training state (model, optimizer, epoch, data seed, early-stopping
+patience) is checkpointed every epoch; --resume continues an interrupted run
+where it stopped.
+
+Usage:
+  python train_disease_model.py
+  python train_disease_model.py --arch mobilenet --img-size 160 \\
+      --backbone-weights weights_mobilenet_v3_small_224_1.0_float_no_top_v2.h5
+  python train_disease_model.py --resume --intra-op-threads 16 --mixed-precision bf16
 """
 
 import os
 import json
-import tensorflow as tf
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout
-from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
-
-DATASET_DIR = "Plant"
-TRAIN_DIR = os.path.join(DATASET_DIR, "train")
-VAL_DIR = os.path.join(DATASET_DIR, "val")
-TEST_DIR = os.path.join(DATASET_DIR, "test")
+import math
+import argparse
 
 MODEL_PATH = "plant_disease_model.h5"
+TRANSFER_MODEL_PATH = "plant_disease_mobilenet.keras"
 LABELS_PATH = "class_labels.json"
+CHECKPOINT_ROOT = "checkpoints"
 
 # -------------------------------
 # Hyperparameters
@@ -24,86 +33,269 @@ LABELS_PATH = "class_labels.json"
 IMG_SIZE = (150, 150)
 BATCH_SIZE = 32
 EPOCHS = 2
+FINE_TUNE_LR = 1e-4
+SEED = 42
+
+parser = argparse.ArgumentParser(description="Train the plant disease model.")
+parser.add_argument("--arch", choices=["cnn", "mobilenet"], default="cnn")
+parser.add_argument("--img-size", type=int, default=None,
+                    help="square input resolution (mobilenet only; default 150)")
+parser.add_argument("--backbone-weights", default=None,
+                    help="local no-top MobileNetV3-Small weights file (.h5)")
+parser.add_argument("--epochs", type=int, default=EPOCHS)
+parser.add_argument("--fine-tune-epochs", type=int, default=0,
+                    help="mobilenet: extra epochs with the backbone unfrozen")
+parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+parser.add_argument("--seed", type=int, default=SEED, help="data shuffling seed")
+
+ckpt_args = parser.add_argument_group("checkpointing")
+ckpt_args.add_argument("--checkpoint-dir", default=None,
+                       help=f"where the resumable state is kept (default {CHECKPOINT_ROOT}/<arch>)")
+ckpt_args.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+
+cpu_args = parser.add_argument_group("CPU tuning")
+cpu_args.add_argument("--inter-op-threads", type=int, default=0, help="0 = TensorFlow default")
+cpu_args.add_argument("--intra-op-threads", type=int, default=0, help="0 = TensorFlow default")
+cpu_args.add_argument("--onednn", choices=["default", "on", "off"], default="default",
+                      help="oneDNN optimisations (TF_ENABLE_ONEDNN_OPTS)")
+cpu_args.add_argument("--mixed-precision", choices=["off", "bf16"], default="off",
+                      help="bfloat16 compute with float32 weights, on CPUs with AVX512-BF16/AMX")
+args = parser.parse_args()
+
+if args.arch == "cnn":
+    if args.img_size not in (None, IMG_SIZE[0]):
+        parser.error("the cnn architecture is fixed at 150x150")
+    img_size = IMG_SIZE
+    model_path = MODEL_PATH
+else:
+    img_size = (args.img_size or IMG_SIZE[0],) * 2
+    model_path = TRANSFER_MODEL_PATH
+
+# -------------------------------
+# CPU Runtime Settings (oneDNN must be chosen before TensorFlow is imported)
+# -------------------------------
+if args.onednn != "default":
+    os.environ["TF_ENABLE_ONEDNN_OPTS"] = "1" if args.onednn == "on" else "0"
+
+import tensorflow as tf
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout
+from tensorflow.keras.callbacks import ModelCheckpoint
+from disease_data import load_split, ResumableEarlyStopping, ThroughputLogger, TrainingCheckpoint
+from disease_benchmark import benchmark, print_report
+
+tf.config.threading.set_inter_op_parallelism_threads(args.inter_op_threads)
+tf.config.threading.set_intra_op_parallelism_threads(args.intra_op_threads)
 
+
+def cpu_supports_bf16():
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+if args.mixed_precision == "bf16":
+    if cpu_supports_bf16():
+        tf.keras.mixed_precision.set_global_policy("mixed_bfloat16")
+    else:
+        print("⚠️ This CPU has no native bfloat16 support, training in float32.")
+
+# -------------------------------
+# Resume State
 # -------------------------------
-# Data Generators
+checkpoint_dir = args.checkpoint_dir or os.path.join(CHECKPOINT_ROOT, args.arch)
+resume_model_path, state = None, None
+if args.resume:
+    resume_model_path, state = TrainingCheckpoint.load_state(checkpoint_dir)
+    if state is None:
+        print(f"No checkpoint in {checkpoint_dir}, starting a new run.")
+    elif state.get("arch") != args.arch or tuple(state.get("img_size", img_size)) != img_size:
+        parser.error(f"checkpoint in {checkpoint_dir} is for a different architecture or input size")
+    else:
+        print(f"Resuming from {checkpoint_dir} after epoch {state['epoch']}")
+
+if state is None:
+    state = {"arch": args.arch, "img_size": list(img_size), "seed": args.seed, "epoch": 0}
+seed = state["seed"]
+initial_epoch = state["epoch"]
+
+# -------------------------------
+# Input Pipelines
 # -------------------------------
-datagen = ImageDataGenerator(rescale=1./255)
+# TFRecord shards from pack_plant_dataset.py when present, else the image folders.
+# Training data is built per phase as one stream with a fixed seed per epoch,
+# so a resumed epoch replays exactly the order of the interrupted one.
+def train_stream(first_epoch, last_epoch):
+    ds, _, _ = load_split("train", img_size, args.batch_size, training=True,
+                          seed=seed, epochs=(first_epoch, last_epoch))
+    return ds
 
-train_gen = datagen.flow_from_directory(
-    TRAIN_DIR,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    class_mode="categorical"
-)
 
-val_gen = datagen.flow_from_directory(
-    VAL_DIR,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    class_mode="categorical"
-)
+_, class_names, n_train = load_split("train", img_size, args.batch_size)
+val_ds, _, _ = load_split("val", img_size, args.batch_size)
+test_ds, _, _ = load_split("test", img_size, args.batch_size)
+num_classes = len(class_names)
+steps_per_epoch = math.ceil(n_train / args.batch_size)
 
-test_gen = datagen.flow_from_directory(
-    TEST_DIR,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    class_mode="categorical",
-    shuffle=False
-)
 
 # -------------------------------
-# CNN Model Architecture
+# Model Architectures
 # -------------------------------
-model = Sequential([
-    Conv2D(32, (3,3), activation="relu", input_shape=(150,150,3)),
-    MaxPooling2D(2,2),
+def build_cnn():
+    return Sequential([
+        Conv2D(32, (3,3), activation="relu", input_shape=(150,150,3)),
+        MaxPooling2D(2,2),
+
+        Conv2D(64, (3,3), activation="relu"),
+        MaxPooling2D(2,2),
+
+        Conv2D(128, (3,3), activation="relu"),
+        MaxPooling2D(2,2),
 
-    Conv2D(64, (3,3), activation="relu"),
-    MaxPooling2D(2,2),
+        Flatten(),
+        Dense(256, activation="relu"),
+        Dropout(0.5),
+        # float32 softmax keeps mixed precision numerically safe
+        Dense(num_classes, activation="softmax", dtype="float32")
+    ])
 
-    Conv2D(128, (3,3), activation="relu"),
-    MaxPooling2D(2,2),
 
-    Flatten(),
-    Dense(256, activation="relu"),
-    Dropout(0.5),
-    Dense(train_gen.num_classes, activation="softmax")
-])
+def build_mobilenet():
+    """
+    MobileNetV3-Small with global average pooling. Takes the same [0, 1]
+    images as the CNN; the Rescaling layer maps them to the backbone's [-1, 1].
+    """
+    if args.backbone_weights is None:
+        print("⚠️ No --backbone-weights given, the backbone is trained from scratch.")
+    elif not os.path.exists(args.backbone_weights):
+        parser.error(f"backbone weights not found: {args.backbone_weights}")
 
-model.compile(optimizer="adam",
-              loss="categorical_crossentropy",
-              metrics=["accuracy"])
+    backbone = tf.keras.applications.MobileNetV3Small(
+        input_shape=img_size + (3,),
+        include_top=False,
+        weights=args.backbone_weights,
+        pooling="avg",
+        include_preprocessing=False,
+    )
+    backbone.trainable = args.backbone_weights is None
+
+    inputs = tf.keras.Input(shape=img_size + (3,))
+    x = tf.keras.layers.Rescaling(2.0, offset=-1.0)(inputs)
+    # BatchNorm stays in inference mode, also while fine-tuning
+    x = backbone(x, training=False)
+    x = Dropout(0.2)(x)
+    outputs = Dense(num_classes, activation="softmax", dtype="float32")(x)
+    return tf.keras.Model(inputs, outputs, name="mobilenet_v3_small_transfer"), backbone
+
+
+if resume_model_path is not None:
+    # restores weights, optimizer slots and iteration count
+    model = tf.keras.models.load_model(resume_model_path)
+    backbone = next((l for l in model.layers if isinstance(l, tf.keras.Model)), None)
+else:
+    backbone = None
+    if args.arch == "cnn":
+        model = build_cnn()
+    else:
+        model, backbone = build_mobilenet()
+
+    model.compile(optimizer="adam",
+                  loss="categorical_crossentropy",
+                  metrics=["accuracy"])
+
+# a resumed model keeps the dtype policy it was built with
+precision = next(l for l in model.layers if l.weights).dtype_policy.name
 
 # -------------------------------
 # Callbacks
 # -------------------------------
-checkpoint = ModelCheckpoint(MODEL_PATH, save_best_only=True, monitor="val_accuracy", mode="max")
-earlystop = EarlyStopping(patience=5, restore_best_weights=True)
+checkpoint = ModelCheckpoint(model_path, save_best_only=True, monitor="val_accuracy", mode="max",
+                             initial_value_threshold=state.get("best_val_accuracy"))
+run_info = {
+    "arch": args.arch,
+    "img_size": img_size[0],
+    "batch_size": args.batch_size,
+    "inter_op_threads": args.inter_op_threads,
+    "intra_op_threads": args.intra_op_threads,
+    "onednn": args.onednn,
+    "precision": precision,
+}
+throughput = ThroughputLogger(n_train, os.path.join(checkpoint_dir, "epoch_timing.csv"), run_info)
+resumable = TrainingCheckpoint(checkpoint_dir, state)
+# patience left and best epoch so far are part of the resumable state
+earlystop = ResumableEarlyStopping(resumable, patience=5, restore_best_weights=True)
+callbacks = [throughput, earlystop, resumable, checkpoint]
 
 # -------------------------------
 # Training
 # -------------------------------
-history = model.fit(
-    train_gen,
-    validation_data=val_gen,
-    epochs=EPOCHS,
-    callbacks=[checkpoint, earlystop]
-)
+phase = state.get("phase", "head")
+head_stop = initial_epoch
+if phase == "head" and initial_epoch < args.epochs:
+    history = model.fit(
+        train_stream(initial_epoch, args.epochs),
+        validation_data=val_ds,
+        initial_epoch=initial_epoch,
+        epochs=args.epochs,
+        steps_per_epoch=steps_per_epoch,
+        callbacks=callbacks
+    )
+    head_stop = initial_epoch + len(history.epoch)
+
+if backbone is not None and args.fine_tune_epochs > 0 and (phase == "fine_tune" or not backbone.trainable):
+    if phase != "fine_tune":
+        backbone.trainable = True
+        model.compile(optimizer=tf.keras.optimizers.Adam(FINE_TUNE_LR),
+                      loss="categorical_crossentropy",
+                      metrics=["accuracy"])
+        resumable.state.update({"phase": "fine_tune", "fine_tune_start": head_stop})
+        # fine-tuning starts its own patience, as a fresh fit would
+        resumable.state.pop("early_stopping", None)
+        resumable.save_state()
+    first = max(resumable.state["epoch"], resumable.state["fine_tune_start"])
+    last = resumable.state["fine_tune_start"] + args.fine_tune_epochs
+    if first < last:
+        model.fit(
+            train_stream(first, last),
+            validation_data=val_ds,
+            initial_epoch=first,
+            epochs=last,
+            steps_per_epoch=steps_per_epoch,
+            callbacks=callbacks
+        )
 
 # -------------------------------
 # Save class labels
 # -------------------------------
-class_labels = list(train_gen.class_indices.keys())
+class_labels = class_names
 
 with open(LABELS_PATH, "w") as f:
     json.dump(class_labels, f)
 
-print("Training complete. Model saved at:", MODEL_PATH)
+print("Training complete. Model saved at:", model_path)
 print("Labels saved at:", LABELS_PATH)
+print("Per-epoch timing saved at:", os.path.join(checkpoint_dir, "epoch_timing.csv"))
 
 # -------------------------------
 # Evaluate on test set
 # -------------------------------
-test_loss, test_acc = model.evaluate(test_gen)
+test_loss, test_acc = model.evaluate(test_ds)
 print(f"Test Accuracy: {test_acc:.2f}")
+
+# -------------------------------
+# Compare against the current model
+# -------------------------------
+if args.arch == "mobilenet":
+    rows = [benchmark(model, model_path)]
+    if os.path.exists(MODEL_PATH):
+        try:
+            baseline = tf.keras.models.load_model(MODEL_PATH, compile=False)
+            rows.append(benchmark(baseline, MODEL_PATH))
+        except Exception as e:
+            print(f"⚠️ Could not load {MODEL_PATH} for comparison: {e}")
+    print()
+    print_report(rows)
+    print(f"\nServe it with: DISEASE_MODEL_PATH={model_path} streamlit run app.py")
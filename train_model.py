@@ -1,8 +1,12 @@
 # train_model.py
 """
 Train a RandomForest-based crop recommendation pipeline from Crop_recommendation.csv.
+Labelled field samples collected with update_model.py (field_observations.csv)
+are added to the training split when present.
 Exports:
   - crop_recommender_rf.joblib
+  - crop_recommender_flat/ (memory-mapped copy for prefork_server.py)
+  - crop_neighbors.joblib (KD-tree over the training rows for "similar farms")
   - model_metadata.json
 """
 
@@ -17,8 +21,11 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, accuracy_score, top_k_accuracy_score
 from joblib import dump
 import json
+from flat_forest import export_flat_forest
+from crop_predictor import NeighborIndex
 
 DATA_PATH = Path("Crop_recommendation.csv")
+FIELD_DATA_PATH = Path("field_observations.csv")
 EXPORT_DIR = Path("export_model")
 EXPORT_DIR.mkdir(exist_ok=True)
 
@@ -48,6 +55,14 @@ X_train, X_test, y_train, y_test = train_test_split(
     X, y, test_size=0.2, random_state=42, stratify=y
 )
 
+# field observations never go to the test split, so the holdout stays comparable
+# with the one update_model.py evaluates on
+if FIELD_DATA_PATH.exists():
+    field_df = pd.read_csv(FIELD_DATA_PATH)
+    X_train = pd.concat([X_train, field_df[numeric_features]], ignore_index=True)
+    y_train = pd.concat([y_train, field_df["label"]], ignore_index=True)
+    print(f"Added {len(field_df)} field observations to the training split.")
+
 print("Training model...")
 pipe.fit(X_train, y_train)
 
@@ -70,15 +85,27 @@ feat_importances = dict(zip(numeric_features, rf_model.feature_importances_.toli
 model_path = EXPORT_DIR / "crop_recommender_rf.joblib"
 dump(pipe, model_path)
 print("Saved model to:", model_path)
+print("Saved flat forest to:", export_flat_forest(pipe, EXPORT_DIR / "crop_recommender_flat"))
+
+# nearest-neighbour index on the same scaled features the forest sees
+neighbors = NeighborIndex.from_pipeline(pipe, X_train, y_train)
+neighbors_path = EXPORT_DIR / "crop_neighbors.joblib"
+dump(neighbors, neighbors_path)
+print("Saved neighbour index to:", neighbors_path)
 
 # save metadata
 meta = {
+    "version": "1.0",
     "features": numeric_features,
     "n_classes": len(pipe.classes_),
     "classes": pipe.classes_.tolist(),
     "feature_importances": feat_importances,
     "test_accuracy": float(acc),
-    "test_top3_accuracy": float(top3)
+    "test_top3_accuracy": float(top3),
+    "n_estimators": rf_model.n_estimators,
+    "n_training_rows": len(X_train),
+    "ood_threshold": neighbors.ood_threshold,
+    "updates": []
 }
 meta_path = EXPORT_DIR / "model_metadata.json"
 meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
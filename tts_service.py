@@ -0,0 +1,251 @@
+"""
+Text-to-speech for AgriBot replies.
+
+TTSService turns (text, lang) into MP3 bytes off the request path: HTML is
+stripped, synthesis runs in a background worker, and the audio is cached on
+disk under a hash of language and text, evicting the least recently used
+files once the cache grows past its size limit. Static texts such as the
+disease remedies can be pre-generated at startup.
+
+The backend is pluggable: gTTS by default, or StubTTSBackend (no network)
+when AGRIBOT_TTS_BACKEND=stub.
+"""
+
+import hashlib
+import html
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+TTS_CACHE_DIR = "tts_cache"
+MAX_CACHE_BYTES = 100 * 1024 * 1024
+TTS_BACKEND_ENV = "AGRIBOT_TTS_BACKEND"
+
+_BREAKS = re.compile(r"<br\s*/?>|</(?:div|p|li|h\d)>", re.IGNORECASE)
+_TAGS = re.compile(r"<[^>]+>")
+_MARKDOWN = re.compile(r"[#*_`]+")
+# emoji and pictographs are read out by name, which is just noise
+_SYMBOLS = re.compile("[\U0001F000-\U0001FAFF☀-➿️]")
+_BLANKS = re.compile(r"[ \t]+")
+_NEWLINES = re.compile(r"\s*\n\s*")
+
+
+def strip_html(text):
+    """
+    Plain speakable text from a chat message (HTML, Markdown and emoji removed).
+    """
+    text = _BREAKS.sub("\n", text)
+    text = html.unescape(_TAGS.sub(" ", text))
+    text = _SYMBOLS.sub("", _MARKDOWN.sub("", text)).replace("•", "")
+    text = _NEWLINES.sub("\n", _BLANKS.sub(" ", text))
+    return text.strip()
+
+
+def audio_key(text, lang):
+    return hashlib.sha1(f"{lang}\0{text}".encode("utf-8")).hexdigest()
+
+
+class GTTSBackend:
+    """
+    Google Translate TTS through gTTS (network call).
+    """
+
+    name = "gtts"
+
+    def synthesize(self, text, lang):
+        import io
+        from gtts import gTTS
+
+        audio = io.BytesIO()
+        gTTS(text=text, lang=lang).write_to_fp(audio)
+        return audio.getvalue()
+
+
+class StubTTSBackend:
+    """
+    Offline stand-in: returns a deterministic fake MP3 payload immediately.
+    """
+
+    name = "stub"
+
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize(self, text, lang):
+        self.calls += 1
+        return b"ID3" + audio_key(text, lang).encode("ascii")
+
+
+def make_tts_backend():
+    """
+    StubTTSBackend when AGRIBOT_TTS_BACKEND=stub, otherwise gTTS.
+    """
+    if os.environ.get(TTS_BACKEND_ENV) == "stub":
+        return StubTTSBackend()
+    return GTTSBackend()
+
+
+class AudioCache:
+    """
+    MP3 files named by audio_key() in cache_dir. File mtimes track recency;
+    the oldest files are removed once the total size exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._sizes = {}
+        for name in os.listdir(cache_dir):
+            if name.endswith(".mp3"):
+                self._sizes[name[:-4]] = os.path.getsize(os.path.join(cache_dir, name))
+        self._total = sum(self._sizes.values())
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".mp3")
+
+    def __contains__(self, key):
+        return key in self._sizes
+
+    def get(self, key):
+        if key not in self._sizes:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            os.utime(self._path(key))
+            return data
+        except OSError:
+            with self._lock:
+                self._total -= self._sizes.pop(key, 0)
+            return None
+
+    def put(self, key, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._total += len(data) - self._sizes.get(key, 0)
+            self._sizes[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        by_age = sorted(self._sizes, key=lambda k: self._mtime(k))
+        for key in by_age:
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self._total -= self._sizes.pop(key)
+
+    def _mtime(self, key):
+        try:
+            return os.path.getmtime(self._path(key))
+        except OSError:
+            return 0.0
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+
+class TTSService:
+    """
+    Background synthesis with a disk cache.
+
+    request() returns a key immediately and queues synthesis unless the audio
+    is already cached; get()/status() look the result up later.
+    """
+
+    def __init__(self, backend=None, cache=None, workers=1):
+        self.backend = backend if backend is not None else make_tts_backend()
+        self.cache = cache if cache is not None else AudioCache()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self._pending = {}
+        self._failed = set()
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "cache_hits": 0, "synthesized": 0, "failures": 0}
+
+    def request(self, text, lang):
+        """
+        Queue speech for a chat message; returns its key, or None if there is nothing to say.
+        """
+        speech = strip_html(text)
+        if not speech:
+            return None
+        key = audio_key(speech, lang)
+        with self._lock:
+            self._counts["requests"] += 1
+            if key in self.cache:
+                self._counts["cache_hits"] += 1
+                return key
+            if key not in self._pending:
+                self._failed.discard(key)
+                self._pending[key] = self._executor.submit(self._synthesize, key, speech, lang)
+        return key
+
+    def _synthesize(self, key, speech, lang):
+        try:
+            self.cache.put(key, self.backend.synthesize(speech, lang))
+            outcome = "synthesized"
+        except Exception:
+            outcome = "failures"
+            with self._lock:
+                self._failed.add(key)
+        with self._lock:
+            self._counts[outcome] += 1
+            self._pending.pop(key, None)
+
+    def status(self, key):
+        """
+        "ready", "pending", "failed" or "unknown".
+        """
+        if key in self.cache:
+            return "ready"
+        with self._lock:
+            if key in self._pending:
+                return "pending"
+            if key in self._failed:
+                return "failed"
+        return "unknown"
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def wait(self, key, timeout=None):
+        """
+        Block until a queued request has finished; returns the audio or None.
+        """
+        with self._lock:
+            future = self._pending.get(key)
+        if future is not None:
+            future.result(timeout)
+        return self.get(key)
+
+    def pregenerate(self, texts):
+        """
+        Queue (text, lang) pairs, e.g. static answers, so they are cached before anyone asks.
+        """
+        return [self.request(text, lang) for text, lang in texts]
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            counts["pending"] = len(self._pending)
+        counts["cache_bytes"] = self.cache.total_bytes
+        return counts
+
+
+def remedy_texts(remedies):
+    """
+    (text, lang) pairs for every entry of a DISEASE_REMEDIES-style dict.
+    """
+    return [(text, lang) for entry in remedies.values() for lang, text in entry.items()]
@@ -0,0 +1,181 @@
+# update_model.py
+"""
+Incrementally update the crop recommendation pipeline with new labelled field samples.
+
+Instead of refitting all trees, the RandomForest exported by train_model.py is
+grown with warm_start: the new rows are appended to field_observations.csv and
+only a few extra trees are fitted on the training split plus all field data.
+The scaler is kept as-is so the existing trees stay valid.
+
+Usage:
+  python update_model.py new_samples.csv [--trees 40]
+
+Exports:
+  - crop_recommender_rf.joblib (latest, loaded by the apps)
+  - crop_recommender_rf.v<version>.joblib (versioned copy)
+  - crop_recommender_flat/ (memory-mapped copy for prefork_server.py)
+  - crop_neighbors.joblib (neighbour index, rebuilt with the field rows)
+  - model_metadata.json (updated, with a drift report per update)
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import dump, load
+from sklearn.metrics import accuracy_score, top_k_accuracy_score
+from sklearn.model_selection import train_test_split
+
+from crop_predictor import NeighborIndex
+from flat_forest import FLAT_DIR, export_flat_forest
+
+DATA_PATH = Path("Crop_recommendation.csv")
+FIELD_DATA_PATH = Path("field_observations.csv")
+EXPORT_DIR = Path("export_model")
+MODEL_PATH = EXPORT_DIR / "crop_recommender_rf.joblib"
+META_PATH = EXPORT_DIR / "model_metadata.json"
+NEIGHBORS_PATH = EXPORT_DIR / "crop_neighbors.joblib"
+
+FEATURES = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+DEFAULT_NEW_TREES = 40
+
+
+def bump_version(version):
+    """
+    Bump the minor part of a "major.minor" version string.
+    """
+    major, _, minor = str(version).partition(".")
+    return f"{major}.{int(minor or 0) + 1}"
+
+
+def drift_report(old_proba, new_proba, classes):
+    """
+    Summarise how predictions moved between the old and updated model.
+    """
+    old_top = np.argmax(old_proba, axis=1)
+    new_top = np.argmax(new_proba, axis=1)
+    changed = old_top != new_top
+    # total variation distance between the two probability vectors per row
+    tvd = 0.5 * np.abs(new_proba - old_proba).sum(axis=1)
+
+    flips = {}
+    for i, j in zip(old_top[changed], new_top[changed]):
+        key = f"{classes[i]}->{classes[j]}"
+        flips[key] = flips.get(key, 0) + 1
+
+    return {
+        "n_rows": int(len(old_top)),
+        "top1_agreement": float(1.0 - changed.mean()),
+        "mean_tvd": float(tvd.mean()),
+        "max_tvd": float(tvd.max()),
+        "top1_flips": dict(sorted(flips.items(), key=lambda kv: -kv[1])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grow the crop model with new field observations.")
+    parser.add_argument("new_samples", type=Path, help="CSV with N,P,K,temperature,humidity,ph,rainfall,label")
+    parser.add_argument("--trees", type=int, default=DEFAULT_NEW_TREES, help="number of trees to add")
+    args = parser.parse_args()
+
+    assert MODEL_PATH.exists(), f"{MODEL_PATH} not found. Run train_model.py first."
+    new_df = pd.read_csv(args.new_samples)
+    expected_cols = set(FEATURES) | {"label"}
+    if not expected_cols.issubset(set(new_df.columns)):
+        raise SystemExit(f"CSV missing required columns. Found: {new_df.columns.tolist()}")
+    new_df = new_df[FEATURES + ["label"]].dropna()
+    if new_df.empty:
+        raise SystemExit("No usable rows in the new samples file.")
+
+    pipe = load(MODEL_PATH)
+    meta = json.loads(META_PATH.read_text(encoding="utf-8")) if META_PATH.exists() else {}
+    classes = pipe.classes_.tolist()
+
+    # warm_start can only add trees for the classes the forest already knows
+    unknown = sorted(set(new_df["label"]) - set(classes))
+    if unknown:
+        raise SystemExit(f"Unknown crop labels {unknown}; run train_model.py for a full retrain.")
+
+    # same holdout as train_model.py; field observations always go to training
+    base_df = pd.read_csv(DATA_PATH)
+    X_train, X_test, y_train, y_test = train_test_split(
+        base_df[FEATURES], base_df["label"], test_size=0.2, random_state=42, stratify=base_df["label"]
+    )
+    field_df = pd.read_csv(FIELD_DATA_PATH) if FIELD_DATA_PATH.exists() else new_df.iloc[:0]
+    field_df = pd.concat([field_df, new_df], ignore_index=True)
+    X_fit = pd.concat([X_train, field_df[FEATURES]], ignore_index=True)
+    y_fit = pd.concat([y_train, field_df["label"]], ignore_index=True)
+
+    # predictions of the current model, used for the drift report
+    X_ref = pd.concat([X_test, new_df[FEATURES]], ignore_index=True)
+    old_proba = pipe.predict_proba(X_ref)
+    old_new_acc = accuracy_score(new_df["label"], pipe.predict(new_df[FEATURES]))
+
+    rf = pipe.named_steps["model"]
+    n_before = rf.n_estimators
+    rf.set_params(warm_start=True, n_estimators=n_before + args.trees)
+
+    print(f"Growing forest from {n_before} to {rf.n_estimators} trees on {len(X_fit)} rows...")
+    start = time.perf_counter()
+    rf.fit(pipe.named_steps["prep"].transform(X_fit), y_fit)
+    fit_seconds = time.perf_counter() - start
+    rf.set_params(warm_start=False)
+
+    new_proba = pipe.predict_proba(X_ref)
+    drift = drift_report(old_proba, new_proba, classes)
+    acc = accuracy_score(y_test, pipe.predict(X_test))
+    top3 = top_k_accuracy_score(y_test, pipe.predict_proba(X_test), k=3, labels=pipe.classes_)
+    new_acc = accuracy_score(new_df["label"], pipe.predict(new_df[FEATURES]))
+
+    print("Fit time (s):", round(fit_seconds, 2))
+    print("Accuracy (test):", acc)
+    print("Top-3 accuracy (test):", top3)
+    print(f"Accuracy on new samples: {old_new_acc:.3f} -> {new_acc:.3f}")
+    print("Top-1 agreement with previous model:", round(drift["top1_agreement"], 4))
+    print("Mean probability shift (TVD):", round(drift["mean_tvd"], 4))
+
+    # persist: field log first, then versioned + latest artifacts
+    field_df.to_csv(FIELD_DATA_PATH, index=False)
+    version = bump_version(meta.get("version", "1.0"))
+    versioned_path = EXPORT_DIR / f"crop_recommender_rf.v{version}.joblib"
+    dump(pipe, versioned_path)
+    dump(pipe, MODEL_PATH)
+    print("Saved model to:", versioned_path, "and", MODEL_PATH)
+    print("Saved flat forest to:", export_flat_forest(pipe, FLAT_DIR))
+    neighbors = NeighborIndex.from_pipeline(pipe, X_fit, y_fit)
+    dump(neighbors, NEIGHBORS_PATH)
+    print("Saved neighbour index to:", NEIGHBORS_PATH)
+
+    meta.update({
+        "version": version,
+        "features": FEATURES,
+        "n_classes": len(classes),
+        "classes": classes,
+        "feature_importances": dict(zip(FEATURES, rf.feature_importances_.tolist())),
+        "test_accuracy": float(acc),
+        "test_top3_accuracy": float(top3),
+        "n_estimators": rf.n_estimators,
+        "n_training_rows": len(X_fit),
+        "ood_threshold": neighbors.ood_threshold,
+    })
+    meta.setdefault("updates", []).append({
+        "version": version,
+        "artifact": versioned_path.name,
+        "added_rows": len(new_df),
+        "added_trees": args.trees,
+        "fit_seconds": round(fit_seconds, 3),
+        "new_samples_accuracy_before": float(old_new_acc),
+        "new_samples_accuracy_after": float(new_acc),
+        "drift": drift,
+    })
+    META_PATH.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    print("Saved metadata to:", META_PATH)
+
+    print("Update complete.")
+
+
+if __name__ == "__main__":
+    main()